@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'drf_spectacular',
@@ -47,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so that the measured total time includes the other middleware
+    'tasks.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,6 +81,18 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# DB_POOL enables the psycopg 3 connection pool (one pool per server process);
+# otherwise DB_CONN_MAX_AGE keeps a connection open between requests (0 = reconnect
+# on every request). Django does not allow both at once. DB_STATEMENT_TIMEOUT caps
+# every query in milliseconds (0 = no limit).
+
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+DB_POOL_OPTIONS = {
+    'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+    'max_size': config('DB_POOL_MAX_SIZE', default=8, cast=int),
+    # Seconds a request waits for a free connection before failing
+    'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+}
 
 DATABASES = {
     'default': {
@@ -87,8 +102,42 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST'),
         'PORT': config('DB_PORT'),
+        'CONN_MAX_AGE': 0 if DB_POOL else config('DB_CONN_MAX_AGE', default=0, cast=int),
+        # Ping reused connections (and pooled ones) before handing them out
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'OPTIONS': {
+            'connect_timeout': config('DB_CONNECT_TIMEOUT', default=10, cast=int),
+            'options': f"-c statement_timeout={config('DB_STATEMENT_TIMEOUT', default=0, cast=int)}",
+        },
     }
 }
+if DB_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = DB_POOL_OPTIONS
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Defaults to an in-process LRU cache. Multi-process deployments need a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache), otherwise
+# invalidation in one process does not reach the others. With
+# REQUIRE_SHARED_CACHE (on in config.settings_production) a LocMemCache fails
+# the system checks (tasks.E001).
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='task-management'),
+    }
+}
+if CACHES['default']['BACKEND'].endswith('LocMemCache'):
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int),
+    }
+
+# API response cache (tasks/cache.py)
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = config('API_CACHE_TIMEOUT', default=300, cast=int)
+REQUIRE_SHARED_CACHE = config('REQUIRE_SHARED_CACHE', default=False, cast=bool)
 
 
 # Password validation
@@ -135,19 +184,105 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Stateless mode trusts signed token claims instead of loading the user
+        # on every request; set JWT_STATELESS_AUTH=False to always hit the DB
+        'tasks.authentication.StatelessJWTAuthentication'
+        if config('JWT_STATELESS_AUTH', default=True, cast=bool)
+        else 'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
-        'rest_framework.filters.SearchFilter',
+        'tasks.filters.FullTextSearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    # orjson gives the same JSON as DRF's JSONRenderer, several times faster;
+    # MessagePack is served for Accept: application/msgpack or ?format=msgpack
+    'DEFAULT_RENDERER_CLASSES': [
+        'tasks.renderers.ORJSONRenderer',
+        'tasks.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'tasks.parsers.ORJSONParser',
+        'tasks.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'tasks.pagination.KeysetPagination',
+    'PAGE_SIZE': config('PAGE_SIZE', default=50, cast=int),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Largest page a client may request with ?page_size=
+PAGINATION_MAX_PAGE_SIZE = config('PAGINATION_MAX_PAGE_SIZE', default=500, cast=int)
+
+# Largest number of items accepted by one /tasks/bulk/ request
+BULK_MAX_ITEMS = config('BULK_MAX_ITEMS', default=1000, cast=int)
+
+# Latest comments embedded in the task detail; the rest are paged through
+# /tasks/{id}/comments/
+TASK_DETAIL_COMMENTS = config('TASK_DETAIL_COMMENTS', default=20, cast=int)
+
+# Rows fetched from the server-side cursor (and flushed to the client) per chunk
+# by /tasks/export/
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Change feed (/api/v1/events/, tasks/events.py)
+# Seconds between keep-alive comments on an idle stream
+EVENTS_HEARTBEAT = config('EVENTS_HEARTBEAT', default=15, cast=int)
+# Events buffered per connection before it falls back to re-reading from the DB
+EVENTS_QUEUE_SIZE = config('EVENTS_QUEUE_SIZE', default=100, cast=int)
+# Most events replayed on reconnect; with more the client gets a reset event
+EVENTS_BACKLOG_LIMIT = config('EVENTS_BACKLOG_LIMIT', default=1000, cast=int)
+# Events of the last N seconds are replayed again on reconnect, because a
+# transaction with a smaller event id may commit later
+EVENTS_RESUME_OVERLAP = config('EVENTS_RESUME_OVERLAP', default=5, cast=int)
+# Days of events kept by the prune_events command
+EVENTS_RETENTION_DAYS = config('EVENTS_RETENTION_DAYS', default=7, cast=int)
+
+# Done tasks unchanged for this many days are moved to the archive tables
+# by the archive_tasks command
+TASK_ARCHIVE_AFTER = config('TASK_ARCHIVE_AFTER', default=90, cast=int)
+
+# Admin mode for large tables (tasks/admin.py): estimated row counts, index-backed
+# search and no date hierarchy. Filtered counts stop at ADMIN_COUNT_LIMIT rows, and
+# unfiltered lists above it use the table statistics instead of COUNT(*).
+ADMIN_PERFORMANCE_MODE = config('ADMIN_PERFORMANCE_MODE', default=True, cast=bool)
+ADMIN_COUNT_LIMIT = config('ADMIN_COUNT_LIMIT', default=10000, cast=int)
+
+# Dashboard stats (/api/v1/tasks/stats/, tasks/counters.py): seconds between
+# moving newly overdue tasks into the stored counters. Tasks that became overdue
+# since then are counted on read, so this only bounds the work done per read.
+TASK_STATS_REFRESH = config('TASK_STATS_REFRESH', default=300, cast=int)
+
+# Background jobs (run_jobs worker, tasks/jobs.py)
+# Seconds before the deadline when the assignee and creator get a reminder
+TASK_REMINDER_BEFORE = config('TASK_REMINDER_BEFORE', default=86400, cast=int)
+# Jobs claimed and processed in one transaction
+JOBS_BATCH_SIZE = config('JOBS_BATCH_SIZE', default=500, cast=int)
+# Seconds an idle worker waits before looking for due jobs again
+JOBS_POLL_INTERVAL = config('JOBS_POLL_INTERVAL', default=5, cast=float)
+# Seconds a failed job is postponed before the next attempt
+JOBS_RETRY_DELAY = config('JOBS_RETRY_DELAY', default=60, cast=int)
+# Seconds of worker batches (JobBatch rows) summed by /api/v1/jobs/stats/
+JOBS_STATS_WINDOW = config('JOBS_STATS_WINDOW', default=3600, cast=int)
+
+# Request metrics (tasks/metrics.py)
+# Share of requests measured (query count, DB, render and total time); 0 turns
+# measuring off and leaves only a context variable lookup per SQL query
+REQUEST_METRICS_SAMPLE_RATE = config('REQUEST_METRICS_SAMPLE_RATE', default=1.0, cast=float)
+# Add the Server-Timing header to measured responses
+REQUEST_METRICS_SERVER_TIMING = config('REQUEST_METRICS_SERVER_TIMING', default=True, cast=bool)
+# Bearer token for the Prometheus endpoint /metrics; without it the endpoint is
+# only served with DEBUG
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Raise instead of logging a warning when a request runs more SQL queries than
+# the query_budget of its action (used by the tests)
+QUERY_BUDGET_STRICT = config('QUERY_BUDGET_STRICT', default=False, cast=bool)
+
 # drf-spectacular settings
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Task Management API',
@@ -163,4 +298,10 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': False,
     'BLACKLIST_AFTER_ROTATION': False,
     'UPDATE_LAST_LOGIN': False,
+    'TOKEN_OBTAIN_SERIALIZER': 'tasks.authentication.StatelessTokenObtainPairSerializer',
 }
+
+# How long (seconds) a token version stays in the shared cache before the user is
+# re-read from the DB. Saving a user drops it at once; changes made around the
+# model (queryset.update, raw SQL) revoke tokens within this window
+JWT_VERSION_CACHE_TTL = config('JWT_VERSION_CACHE_TTL', default=30, cast=int)
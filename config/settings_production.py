@@ -0,0 +1,36 @@
+"""
+Production settings profile.
+
+Used by the gunicorn entry point (gunicorn.conf.py) or selected explicitly with
+DJANGO_SETTINGS_MODULE=config.settings_production. Only the defaults differ from
+config.settings: every value is still read from the same environment variables.
+"""
+
+from decouple import config
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, DB_POOL_OPTIONS
+
+DEBUG = config('DEBUG', default=False, cast=bool)
+
+# Several server processes: the response cache generations and token versions
+# must live in a shared cache (CACHE_BACKEND), see tasks/checks.py
+REQUIRE_SHARED_CACHE = config('REQUIRE_SHARED_CACHE', default=True, cast=bool)
+
+# Pooled connections by default. Under ASGI every request runs its sync code in a
+# new thread, so per-thread persistent connections (CONN_MAX_AGE) are not reused;
+# the pool shares connections between threads of one worker process.
+if config('DB_POOL', default=True, cast=bool):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = DB_POOL_OPTIONS
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=60, cast=int)
+
+# A runaway query is cancelled instead of holding a connection and a worker
+DATABASES['default']['OPTIONS']['options'] = (
+    f"-c statement_timeout={config('DB_STATEMENT_TIMEOUT', default=30000, cast=int)}"
+)
+
+# Measure one request in ten; counters in /metrics cover the measured requests
+# only (see http_metrics_sample_rate)
+REQUEST_METRICS_SAMPLE_RATE = config('REQUEST_METRICS_SAMPLE_RATE', default=0.1, cast=float)
@@ -9,6 +9,7 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
     SpectacularRedocView,
 )
+from tasks.metrics import metrics_view
 
 urlpatterns = [
     # Django Admin
@@ -21,6 +22,9 @@ urlpatterns = [
     # API endpoints v1
     path('api/v1/', include('tasks.urls')),
 
+    # Prometheus metrics
+    path('metrics', metrics_view, name='metrics'),
+
     # API Documentation
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
@@ -0,0 +1,43 @@
+"""
+gunicorn entry point for production: run `gunicorn` from the project root.
+
+gunicorn manages the worker processes; each worker is a uvicorn (ASGI) worker,
+so the async /api/v1/async/ endpoints run natively and the regular viewsets run
+in per-request threads. Settings default to config.settings_production.
+"""
+
+import multiprocessing
+import os
+
+# gunicorn treats module-level names as settings (including `config`)
+import decouple
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings_production')
+
+wsgi_app = 'config.asgi:application'
+worker_class = 'uvicorn_worker.UvicornWorker'
+
+# Workers sized to the available cores. Each worker owns a connection pool, so
+# PostgreSQL sees up to workers * DB_POOL_MAX_SIZE connections.
+workers = decouple.config('WEB_CONCURRENCY', default=multiprocessing.cpu_count() * 2 + 1, cast=int)
+bind = decouple.config('GUNICORN_BIND', default='0.0.0.0:8000')
+
+# Restart a worker that stops responding, and recycle workers periodically
+timeout = decouple.config('GUNICORN_TIMEOUT', default=60, cast=int)
+graceful_timeout = 30
+keepalive = 5
+max_requests = decouple.config('GUNICORN_MAX_REQUESTS', default=2000, cast=int)
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    """Run Django system checks once in the master: refuse to start misconfigured
+    (e.g. tasks.E001, a per-process cache behind several workers)."""
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command('check')
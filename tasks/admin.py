@@ -1,18 +1,166 @@
+from collections import Counter
+
+from django.conf import settings
 from django.contrib import admin
-from .models import Task, Comment
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchQuery
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.db.models import Q
+from django.forms.models import BaseInlineFormSet
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+from .models import Task, Comment, SEARCH_CONFIG
+from . import cache, events
+
+
+def estimated_count(model):
+    """Оценка числа строк таблицы по статистике PostgreSQL (pg_class.reltuples)"""
+    if connection.vendor != 'postgresql':
+        return -1
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                       [connection.ops.quote_name(model._meta.db_table)])
+        row = cursor.fetchone()
+    # -1: таблица еще не анализировалась
+    return row[0] if row else -1
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор списка без COUNT(*) по всей таблице. Без фильтров число
+    строк берется из статистики, если оно больше ADMIN_COUNT_LIMIT; с
+    фильтрами или поиском подсчет останавливается на ADMIN_COUNT_LIMIT.
+    """
+
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_COUNT_LIMIT
+        queryset = self.object_list
+        if not queryset.query.has_filters():
+            estimate = estimated_count(queryset.model)
+            if estimate > limit:
+                return estimate
+        return queryset[:limit].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Режим больших таблиц (ADMIN_PERFORMANCE_MODE): оценочное число строк,
+    поиск по индексам (search_condition) вместо ILIKE по search_fields и
+    без навигации по датам, которая строится запросом по всей таблице.
+    """
+
+    @property
+    def show_full_result_count(self):
+        # Иначе рядом с результатами поиска выводится COUNT(*) всей таблицы
+        return not settings.ADMIN_PERFORMANCE_MODE
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        if settings.ADMIN_PERFORMANCE_MODE:
+            return EstimatedCountPaginator(queryset, per_page, orphans, allow_empty_first_page)
+        return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+
+    def get_changelist_instance(self, request):
+        changelist = super().get_changelist_instance(request)
+        if settings.ADMIN_PERFORMANCE_MODE:
+            changelist.date_hierarchy = None
+        return changelist
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not settings.ADMIN_PERFORMANCE_MODE or not term:
+            return super().get_search_results(request, queryset, search_term)
+        condition = self.search_condition(term)
+        if term.isdigit():
+            condition |= Q(pk=int(term))
+        return queryset.filter(condition), False
+
+    def search_condition(self, term):
+        """Условие поиска, которое выполняется по индексам"""
+        raise NotImplementedError
+
+
+def users_named(username):
+    """Подзапрос id пользователя по имени (уникальный индекс username)"""
+    return User.objects.filter(username=username).values('pk')
+
+
+class UsernameFilter(admin.SimpleListFilter):
+    """
+    Фильтр по имени пользователя, которое вводится в поле: фильтр по
+    связи загрузил бы в боковую панель всех пользователей.
+    """
+    template = 'admin/tasks/username_filter.html'
+    field_name = None
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{f'{self.field_name}__in': users_named(self.value())})
+        return queryset
+
+    def choices(self, changelist):
+        yield {
+            'value': self.value() or '',
+            'reset_url': changelist.get_query_string(remove=[self.parameter_name]),
+            'hidden': [
+                (name, value) for name, value in changelist.params.items()
+                if name != self.parameter_name
+            ],
+        }
+
+
+class CreatorFilter(UsernameFilter):
+    title = 'создатель'
+    parameter_name = field_name = 'creator'
+
+
+class AssigneeFilter(UsernameFilter):
+    title = 'исполнитель'
+    parameter_name = field_name = 'assignee'
+
+
+class AuthorFilter(UsernameFilter):
+    title = 'автор'
+    parameter_name = field_name = 'author'
+
+
+class LatestCommentsFormSet(BaseInlineFormSet):
+    """Только последние TASK_DETAIL_COMMENTS комментариев задачи"""
+
+    def get_queryset(self):
+        if not hasattr(self, 'latest_queryset'):
+            # Задача нужна для названия комментария (Comment.__str__)
+            self.latest_queryset = super().get_queryset() \
+                .select_related('author', 'task') \
+                .defer('task__description', 'task__search_vector') \
+                .order_by('-created_at', '-id')[:settings.TASK_DETAIL_COMMENTS]
+        return self.latest_queryset
 
 
 class CommentInline(admin.TabularInline):
-    """Inline отображение комментариев в задаче"""
+    """
+    Последние комментарии задачи, новые сверху; все комментарии - по ссылке
+    в списке комментариев с фильтром по задаче.
+    """
     model = Comment
+    formset = LatestCommentsFormSet
     extra = 0
     fields = ('author', 'text', 'created_at')
     readonly_fields = ('created_at',)
+    autocomplete_fields = ('author',)
     can_delete = True
 
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(LargeTableAdmin):
     """Админка для модели Task"""
     list_display = (
         'id',
@@ -21,6 +169,7 @@ class TaskAdmin(admin.ModelAdmin):
         'creator',
         'assignee',
         'deadline',
+        'comments_count',
         'created_at',
     )
     list_display_links = ('id', 'title')
@@ -28,6 +177,8 @@ class TaskAdmin(admin.ModelAdmin):
         'status',
         'created_at',
         'deadline',
+        CreatorFilter,
+        AssigneeFilter,
     )
     search_fields = (
         'title',
@@ -35,8 +186,10 @@ class TaskAdmin(admin.ModelAdmin):
         'creator__username',
         'assignee__username',
     )
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('comments_link', 'created_at', 'updated_at')
     date_hierarchy = 'created_at'
+    # Совпадает с индексом (-created_at, -id): без сортировки всей таблицы
+    ordering = ('-created_at', '-id')
     list_select_related = ('creator', 'assignee')
     autocomplete_fields = ('creator', 'assignee')
 
@@ -51,7 +204,7 @@ class TaskAdmin(admin.ModelAdmin):
             'fields': ('deadline',)
         }),
         ('Служебная информация', {
-            'fields': ('created_at', 'updated_at'),
+            'fields': ('comments_link', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
@@ -61,11 +214,39 @@ class TaskAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         """Оптимизация запросов"""
         qs = super().get_queryset(request)
-        return qs.select_related('creator', 'assignee').prefetch_related('comments')
+        return qs.select_related('creator', 'assignee')
+
+    def search_condition(self, term):
+        """Полнотекстовый поиск, подстрока названия (триграммы) или имя участника"""
+        users = users_named(term)
+        return (
+            Q(search_vector=SearchQuery(term, config=SEARCH_CONFIG, search_type='websearch'))
+            | Q(title__icontains=term) | Q(creator__in=users) | Q(assignee__in=users)
+        )
+
+    @admin.display(description='Комментарии')
+    def comments_link(self, obj):
+        """Число комментариев и ссылка на все комментарии задачи"""
+        url = reverse('admin:tasks_comment_changelist')
+        return format_html('<a href="{}?task__id__exact={}">{}</a>', url, obj.pk, obj.comments_count)
+
+    def save_formset(self, request, form, formset, change):
+        """Обновляем счетчик комментариев по изменениям в CommentInline"""
+        deleted_events = []
+        if formset.model is Comment:
+            deleted_events = events.comments_deleted(
+                deleted.instance for deleted in formset.deleted_forms if deleted.instance.pk
+            )
+        super().save_formset(request, form, formset, change)
+        if formset.model is Comment:
+            delta = len(formset.new_objects) - len(formset.deleted_objects)
+            if delta:
+                Task.objects.change_comments_count(form.instance.pk, delta)
+            events.publish(deleted_events)
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     """Админка для модели Comment"""
     list_display = (
         'id',
@@ -77,7 +258,7 @@ class CommentAdmin(admin.ModelAdmin):
     list_display_links = ('id', 'text_short')
     list_filter = (
         'created_at',
-        'author',
+        AuthorFilter,
     )
     search_fields = (
         'text',
@@ -86,6 +267,8 @@ class CommentAdmin(admin.ModelAdmin):
     )
     readonly_fields = ('created_at', 'updated_at')
     date_hierarchy = 'created_at'
+    # Совпадает с индексами (created_at, id) и (task, created_at, id)
+    ordering = ('-created_at', '-id')
     list_select_related = ('task', 'author')
     autocomplete_fields = ('task', 'author')
 
@@ -104,7 +287,44 @@ class CommentAdmin(admin.ModelAdmin):
         return obj.text[:50] + '...' if len(obj.text) > 50 else obj.text
     text_short.short_description = 'Текст'
 
+    def save_model(self, request, obj, form, change):
+        """Создание или перенос комментария меняет счетчики задач"""
+        old_task_id = form.initial.get('task') if change else None
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if obj.task_id != old_task_id:
+                if old_task_id is not None:
+                    Task.objects.change_comments_count(old_task_id, -1)
+                Task.objects.change_comments_count(obj.task_id, 1)
+
+    def delete_model(self, request, obj):
+        """Удаление комментария уменьшает счетчик задачи"""
+        deleted_events = events.comments_deleted([obj])
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            Task.objects.change_comments_count(obj.task_id, -1)
+            cache.invalidate_tasks([obj.task_id])
+            events.publish(deleted_events)
+
+    def delete_queryset(self, request, queryset):
+        """Массовое удаление уменьшает счетчики всех затронутых задач"""
+        with transaction.atomic():
+            deleted = Counter(queryset.values_list('task_id', flat=True))
+            deleted_events = events.comments_deleted(queryset.only('pk', 'task_id'))
+            super().delete_queryset(request, queryset)
+            events.publish(deleted_events)
+            for task_id, count in deleted.items():
+                Task.objects.change_comments_count(task_id, -count)
+            cache.invalidate_tasks(deleted)
+
     def get_queryset(self, request):
-        """Оптимизация запросов"""
+        """Оптимизация запросов: от задачи в списке нужно только название"""
         qs = super().get_queryset(request)
-        return qs.select_related('task', 'author')
+        return qs.select_related('task', 'author').defer('task__description', 'task__search_vector')
+
+    def search_condition(self, term):
+        """Полнотекстовый поиск по тексту или имя автора"""
+        return (
+            Q(search_vector=SearchQuery(term, config=SEARCH_CONFIG, search_type='websearch'))
+            | Q(author__in=users_named(term))
+        )
@@ -0,0 +1,81 @@
+"""
+Архив выполненных задач.
+
+Выполненные задачи, которые не менялись дольше TASK_ARCHIVE_AFTER дней,
+вместе с комментариями переносятся пачками в таблицы ArchivedTask и
+ArchivedComment (команда archive_tasks). Рабочие таблицы и их индексы
+содержат только активные и недавно закрытые задачи и не растут с
+историей. Архив читается только по явному ?archived=true.
+
+Перенос не меняет содержимого задач: счетчики статистики не меняются
+(rebuild считает и архив). Участники получают событие task.archived (лента
+и надгробие дельта-синхронизации) в той же транзакции, их кэш ответов
+сбрасывается.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import cache, events
+from .models import ArchivedComment, ArchivedTask, Comment, Job, Task, TaskStatus
+
+
+def columns(model):
+    """Колонки архивной модели, которые копируются из рабочей таблицы"""
+    return [
+        field.column for field in model._meta.concrete_fields
+        if not field.generated and field.name != 'archived_at'
+    ]
+
+
+def cutoff(days=None):
+    """Задачи, закрытые раньше этого времени, переносятся в архив"""
+    return timezone.now() - timedelta(days=settings.TASK_ARCHIVE_AFTER if days is None else days)
+
+
+def archivable(before):
+    """Выполненные задачи, не менявшиеся с before"""
+    return Task.objects.filter(status=TaskStatus.DONE, updated_at__lt=before)
+
+
+def archive_batch(before, batch_size):
+    """
+    Перенести в архив до batch_size задач одной транзакцией. Возвращает
+    число перенесенных задач.
+
+    Строки блокируются (SKIP LOCKED), поэтому задачу, которую сейчас
+    меняют, пропускаем; условие отбора перепроверяется после блокировки.
+    """
+    quote = connection.ops.quote_name
+    task_columns = ', '.join(map(quote, columns(ArchivedTask)))
+    comment_columns = ', '.join(map(quote, columns(ArchivedComment)))
+    with transaction.atomic():
+        rows = list(
+            archivable(before).order_by('pk')
+                              .select_for_update(skip_locked=True)
+                              .values_list('pk', 'creator_id', 'assignee_id')[:batch_size]
+        )
+        if not rows:
+            return 0
+        ids = [pk for pk, *_ in rows]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {quote(ArchivedTask._meta.db_table)} ({task_columns}, archived_at) '
+                f'SELECT {task_columns}, %s FROM {quote(Task._meta.db_table)} WHERE id = ANY(%s)',
+                [timezone.now(), ids]
+            )
+            cursor.execute(
+                f'INSERT INTO {quote(ArchivedComment._meta.db_table)} ({comment_columns}) '
+                f'SELECT {comment_columns} FROM {quote(Comment._meta.db_table)} WHERE task_id = ANY(%s)',
+                [ids]
+            )
+            # Без сигналов post_delete: это перенос, а не удаление задач
+            for model, column in ((Job, 'task_id'), (Comment, 'task_id'), (Task, 'id')):
+                cursor.execute(
+                    f'DELETE FROM {quote(model._meta.db_table)} WHERE {column} = ANY(%s)', [ids]
+                )
+        events.publish(events.tasks_archived(rows))
+        cache.invalidate_users(*(user_id for _, *users in rows for user_id in users))
+    return len(ids)
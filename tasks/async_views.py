@@ -0,0 +1,157 @@
+"""
+Асинхронные (ASGI) представления для чтения задач и комментариев.
+
+Повторяют list и retrieve TaskViewSet/CommentViewSet: те же правила
+видимости, фильтры (TaskFilter, полнотекстовый поиск, сортировка),
+keyset-пагинация и сериализаторы. Запросы к БД выполняются через async ORM,
+поэтому под ASGI-сервером ожидание PostgreSQL не занимает поток на весь
+запрос. Кэш ответов и ETag здесь не поддерживаются.
+
+Здесь же поток событий /events/ (Server-Sent Events, см. events.py).
+"""
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException, NotAuthenticated, NotFound, ValidationError
+from rest_framework.request import Request
+
+from . import events
+from .authentication import StatelessJWTAuthentication
+from .renderers import ORJSONRenderer
+from .views import TaskViewSet, CommentViewSet
+
+
+class AsyncAPIView(View):
+    """Аутентификация и ошибки в формате DRF для async-представлений"""
+    http_method_names = ['get']
+
+    async def authenticate(self, request):
+        """Пользователь и токен запроса"""
+        result = await StatelessJWTAuthentication().aauthenticate(request)
+        if result is None:
+            raise NotAuthenticated()
+        return result
+
+    def error_response(self, exc):
+        # Тело ошибки как у exception_handler DRF
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        response = HttpResponse(
+            ORJSONRenderer().render(data),
+            content_type='application/json',
+            status=exc.status_code
+        )
+        if exc.status_code == 401:
+            response['WWW-Authenticate'] = StatelessJWTAuthentication().authenticate_header(None)
+        return response
+
+
+class AsyncReadView(AsyncAPIView):
+    """
+    Базовое async-представление только для чтения.
+
+    Запрос, фильтры, пагинатор и сериализатор берутся из экземпляра
+    viewset_class (они не обращаются к БД), а сами запросы выполняются
+    асинхронно: синхронный и асинхронный пути не могут разойтись.
+    """
+    viewset_class = None
+
+    async def get(self, request, pk=None):
+        request = Request(request)
+        try:
+            request.user, request.auth = await self.authenticate(request)
+            viewset = self.viewset_class(
+                request=request,
+                action='list' if pk is None else 'retrieve',
+                args=(),
+                kwargs={} if pk is None else {'pk': pk},
+                format_kwarg=None,
+            )
+            queryset = viewset.filter_queryset(viewset.get_queryset())
+            if pk is None:
+                data = await self.list(viewset, queryset)
+            else:
+                data = await self.retrieve(viewset, queryset, pk)
+        except Http404:
+            return self.error_response(NotFound())
+        except APIException as exc:
+            return self.error_response(exc)
+        return HttpResponse(ORJSONRenderer().render(data), content_type='application/json')
+
+    async def list(self, viewset, queryset):
+        page = await viewset.paginator.apaginate_queryset(queryset, viewset.request, view=viewset)
+        serializer = viewset.get_serializer(page, many=True)
+        return viewset.get_paginated_response(serializer.data).data
+
+    async def retrieve(self, viewset, queryset, pk):
+        instance = await self.get_object(viewset, queryset, pk)
+        return viewset.get_serializer(instance).data
+
+    async def get_object(self, viewset, queryset, pk):
+        try:
+            return await queryset.aget(pk=pk)
+        except queryset.model.DoesNotExist:
+            raise Http404
+
+
+class AsyncTaskView(AsyncReadView):
+    """Список и деталь задач"""
+    viewset_class = TaskViewSet
+
+    async def get_object(self, viewset, queryset, pk):
+        """Последние комментарии (Task.latest_comments) тоже читаются асинхронно, если они в ответе"""
+        task = await super().get_object(viewset, queryset, pk)
+        if viewset.serializes('comments'):
+            task.prefetched_latest_comments = [
+                comment async for comment in task.latest_comments_queryset()
+            ]
+        return task
+
+
+class AsyncCommentView(AsyncReadView):
+    """Список и деталь комментариев"""
+    viewset_class = CommentViewSet
+
+
+class EventStreamView(AsyncAPIView):
+    """
+    Лента изменений видимых пользователю задач и комментариев (SSE).
+
+    Продолжение после разрыва - по заголовку Last-Event-ID (или параметру
+    last_event_id). Поток закрывается, когда истекает токен. Нужен
+    ASGI-сервер: под WSGI бесконечный поток занял бы рабочий поток навсегда.
+    """
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return HttpResponse(
+                ORJSONRenderer().render({'detail': 'Лента событий доступна только под ASGI-сервером.'}),
+                content_type='application/json',
+                status=501
+            )
+        request = Request(request)
+        try:
+            user, token = await self.authenticate(request)
+            last_id = self.get_last_event_id(request)
+        except APIException as exc:
+            return self.error_response(exc)
+
+        response = StreamingHttpResponse(
+            events.stream(user.pk, last_id, until=token.get('exp')),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Иначе nginx буферизует поток
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def get_last_event_id(self, request):
+        value = request.headers.get('Last-Event-ID') or request.query_params.get('last_event_id')
+        if value is None:
+            return None
+        try:
+            last_id = int(value)
+        except ValueError:
+            last_id = -1
+        if last_id < 0:
+            raise ValidationError({'last_event_id': ['Ожидался id события.']})
+        return last_id
@@ -0,0 +1,167 @@
+"""
+JWT-аутентификация без чтения пользователя из БД на каждый запрос.
+
+Токен содержит id, флаги пользователя и версию - HMAC от хэша пароля и
+флагов. Пользователь собирается из этих claims как экземпляр User с
+отложенными остальными полями (username, email и т.п. читаются из БД только
+при обращении): данные, которые выводятся в ответах, из токена не берутся,
+поэтому переименование видно сразу, без отзыва токенов.
+
+Чтобы смена пароля, блокировка или снятие прав отзывали выданные токены,
+текущая версия пользователя сверяется с токеном через общий кэш
+(API_CACHE_ALIAS, в production - Redis): БД читается не чаще раза в
+JWT_VERSION_CACHE_TTL секунд на пользователя, а сохранение пользователя
+сбрасывает версию сразу во всех процессах.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import router
+from django.utils.crypto import salted_hmac
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from . import cache
+
+VERSION_CLAIM = 'ver'
+USER_CLAIMS = ('is_active', 'is_staff', 'is_superuser')
+
+
+def token_version(user):
+    """Версия токенов пользователя: меняется при смене пароля и флагов"""
+    value = f'{user.password}|{user.is_active}|{user.is_staff}|{user.is_superuser}'
+    return salted_hmac('tasks.authentication.token_version', value).hexdigest()[:16]
+
+
+class VersionCache:
+    """Текущие версии токенов в общем кэше с TTL"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+
+    def key(self, user_id):
+        return f'{cache.KEY_PREFIX}:jwtver:{user_id}'
+
+    def get(self, user_id):
+        return cache.get_cache().get(self.key(user_id))
+
+    async def aget(self, user_id):
+        return await cache.get_cache().aget(self.key(user_id))
+
+    def set(self, user_id, version):
+        cache.get_cache().set(self.key(user_id), version, timeout=self.ttl)
+
+    async def aset(self, user_id, version):
+        await cache.get_cache().aset(self.key(user_id), version, timeout=self.ttl)
+
+    def delete(self, user_id):
+        cache.get_cache().delete(self.key(user_id))
+
+
+versions = VersionCache(settings.JWT_VERSION_CACHE_TTL)
+
+
+def _version_queryset(user_id):
+    return User.objects.filter(pk=user_id).only('password', 'is_active', 'is_staff', 'is_superuser')
+
+
+def current_version(user_id):
+    """Текущая версия токенов пользователя или '' для удаленного пользователя"""
+    version = versions.get(user_id)
+    if version is None:
+        user = _version_queryset(user_id).first()
+        version = token_version(user) if user is not None else ''
+        versions.set(user_id, version)
+    return version
+
+
+def load_deferred(user):
+    """
+    Загрузить отложенные поля пользователя из токена одним запросом, если
+    он попадет в ответ (создатель, автор): иначе каждое поле читается
+    отдельным запросом.
+    """
+    deferred = user.get_deferred_fields()
+    if deferred:
+        user.refresh_from_db(fields=deferred)
+    return user
+
+
+async def acurrent_version(user_id):
+    """Асинхронный вариант current_version"""
+    version = await versions.aget(user_id)
+    if version is None:
+        user = await _version_queryset(user_id).afirst()
+        version = token_version(user) if user is not None else ''
+        await versions.aset(user_id, version)
+    return version
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    Аутентификация по claims токена без запроса пользователя к БД.
+
+    Токены без версии (выданные до включения режима) проверяются штатно,
+    с загрузкой пользователя.
+    """
+
+    def get_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        user_id, claims = self.get_claims(validated_token)
+        return self.build_user(validated_token, user_id, claims, current_version(user_id))
+
+    async def aauthenticate(self, request):
+        """
+        Асинхронный вариант authenticate для async-представлений: при
+        попадании в кэш версий обходится без запросов к БД.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        if VERSION_CLAIM not in validated_token:
+            user = await sync_to_async(super().get_user)(validated_token)
+        else:
+            user_id, claims = self.get_claims(validated_token)
+            version = await acurrent_version(user_id)
+            user = self.build_user(validated_token, user_id, claims, version)
+        return user, validated_token
+
+    def get_claims(self, validated_token):
+        try:
+            user_id = User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+            return user_id, [validated_token[claim] for claim in USER_CLAIMS]
+        except Exception:
+            raise InvalidToken('Токен не содержит данных пользователя')
+
+    def build_user(self, validated_token, user_id, claims, version):
+        if not version:
+            raise AuthenticationFailed('Пользователь не найден', code='user_not_found')
+        if version != validated_token[VERSION_CLAIM]:
+            raise AuthenticationFailed('Токен отозван', code='token_revoked')
+        if not validated_token['is_active']:
+            raise AuthenticationFailed('Пользователь заблокирован', code='user_inactive')
+
+        # Остальные поля User отложены и загрузятся из БД только при обращении
+        return User.from_db(
+            router.db_for_read(User), ['id', *USER_CLAIMS], [user_id, *claims]
+        )
+
+
+class StatelessTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Выдача токенов с claims для StatelessJWTAuthentication"""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        token[VERSION_CLAIM] = token_version(user)
+        return token
@@ -0,0 +1,211 @@
+"""
+Кэш ответов API на уровне пользователя.
+
+Каждому пользователю соответствует счетчик поколения (generation). Он входит
+в ключ каждого закэшированного ответа, поэтому для инвалидации достаточно
+увеличить счетчик: старые записи перестают находиться и вытесняются по TTL
+или LRU. Счетчики увеличиваются при изменении задач и комментариев для
+создателя и исполнителя задачи.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework.response import Response
+
+from .models import ArchivedComment, ArchivedTask, Comment, Task
+
+KEY_PREFIX = 'tasks'
+# Поля пользователя, которые выводятся в ответах (создатель, исполнитель, автор)
+USER_FIELDS = ('username', 'email', 'first_name', 'last_name')
+STATS = ('hits', 'misses', 'fills', 'fill_time_us', 'invalidations', 'invalidated_users')
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def _incr(key, delta=1):
+    cache = get_cache()
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Ключа нет: add атомарен, поэтому из параллельных процессов
+        # значение создаст только один
+        if cache.add(key, delta, timeout=None):
+            return delta
+        return cache.incr(key, delta)
+
+
+def record(stat, delta=1):
+    """Увеличить счетчик статистики кэша"""
+    _incr(f'{KEY_PREFIX}:stats:{stat}', delta)
+
+
+def get_stats():
+    """Текущие значения счетчиков статистики кэша"""
+    values = get_cache().get_many([f'{KEY_PREFIX}:stats:{stat}' for stat in STATS])
+    stats = {stat: values.get(f'{KEY_PREFIX}:stats:{stat}', 0) for stat in STATS}
+    requests = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / requests if requests else 0.0
+    stats['avg_fill_time_ms'] = stats['fill_time_us'] / stats['fills'] / 1000 if stats['fills'] else 0.0
+    return stats
+
+
+def get_generation(user_id):
+    """
+    Текущее поколение кэша пользователя.
+
+    Начальное значение берется из времени, а не 1: если ключ поколения
+    вытеснен из кэша, новое поколение не совпадет ни с одним старым. Без
+    кэша (DummyCache) поколение новое на каждый запрос.
+    """
+    cache = get_cache()
+    key = f'{KEY_PREFIX}:gen:{user_id}'
+    generation = cache.get(key)
+    if generation is None:
+        initial = time.time_ns() // 1000
+        cache.add(key, initial, timeout=None)
+        generation = cache.get(key, initial)
+    return generation
+
+
+def _bump_generations(user_ids):
+    cache = get_cache()
+    for user_id in user_ids:
+        try:
+            cache.incr(f'{KEY_PREFIX}:gen:{user_id}')
+        except ValueError:
+            # Поколение еще не создано - у пользователя нет записей в кэше
+            pass
+
+
+def invalidate_users(*user_ids):
+    """
+    Сбросить закэшированные ответы пользователей.
+
+    Внутри транзакции поколения увеличиваются еще раз после коммита: иначе
+    параллельный запрос мог бы между сбросом и коммитом закэшировать старые
+    данные уже под новым поколением.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+    _bump_generations(user_ids)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump_generations(user_ids))
+    record('invalidations')
+    record('invalidated_users', len(user_ids))
+
+
+def invalidate_tasks(task_ids):
+    """
+    Сбросить кэш участников задач (например, после удаления комментариев).
+
+    Удаление комментариев обрабатывается явными вызовами, а не post_delete:
+    обработчик post_delete на Comment отключил бы быстрое каскадное удаление
+    комментариев вместе с задачей.
+    """
+    users = Task.objects.filter(pk__in=task_ids).values_list('creator_id', 'assignee_id')
+    invalidate_users(*(user_id for pair in users for user_id in pair))
+
+
+def tasks_showing_user(task_model, comment_model, user_id):
+    """
+    Задачи (рабочие или архивные), в ответах по которым выводится
+    пользователь: создатель, исполнитель или автор комментария. Ветки
+    UNION ALL, как в visible_ids: каждая читается по своему индексу.
+    """
+    commented = comment_model.objects.order_by().filter(author_id=user_id).values('task_id')
+    ids = task_model.objects.visible_ids(user_id).union(commented, all=True)
+    return task_model.objects.filter(pk__in=ids).order_by()
+
+
+def user_audience(user_id):
+    """
+    Все, в чьих ответах выводится пользователь: участники его задач и задач
+    с его комментариями (в том числе архивных) и он сам.
+    """
+    audience = {user_id}
+    for task_model, comment_model in ((Task, Comment), (ArchivedTask, ArchivedComment)):
+        tasks = tasks_showing_user(task_model, comment_model, user_id)
+        for users in tasks.values_list('creator_id', 'assignee_id').distinct():
+            audience.update(users)
+    return audience - {None}
+
+
+def invalidate_user(user_id, audience=None):
+    """
+    Сбросить кэш аудитории пользователя (user_audience). Вызывается при
+    изменении USER_FIELDS и удалении пользователя.
+    """
+    invalidate_users(*(user_audience(user_id) if audience is None else audience))
+
+
+def response_key(request):
+    """Ключ ответа: пользователь, его поколение, путь и все параметры запроса"""
+    user_id = request.user.pk
+    query = sorted(request.query_params.lists())
+    digest = hashlib.sha256(f'{request.get_host()}{request.path}?{query}'.encode()).hexdigest()
+    return f'{KEY_PREFIX}:resp:{user_id}:{get_generation(user_id)}:{digest}'
+
+
+def format_etag(request, digest):
+    """
+    ETag ответа в выбранном для запроса формате: тела JSON и MessagePack
+    различаются, поэтому сильный ETag у каждого формата свой.
+    """
+    renderer = getattr(request, 'accepted_renderer', None)
+    return quote_etag(f'{digest}-{renderer.format}' if renderer else digest)
+
+
+class CachedResponseMixin:
+    """
+    Кэширует данные ответов list и retrieve (до рендеринга, поэтому
+    одна запись подходит для любого формата ответа) вместе с Last-Modified
+    и основой ETag: ETag строится для формата каждого запроса, и при
+    попадании в кэш условный GET отвечает 304 без обращения к БД.
+    """
+    cached_headers = ('Last-Modified', 'Vary')
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = get_cache()
+        key = response_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            record('hits')
+            data, headers, digest = cached
+            etag = format_etag(request, digest) if digest else None
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = Response(data)
+            for name, value in headers.items():
+                response[name] = value
+            if etag:
+                response['ETag'] = etag
+            response['X-Cache'] = 'HIT'
+            return response
+
+        record('misses')
+        started = time.perf_counter()
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            headers = {
+                name: response[name] for name in self.cached_headers if name in response
+            }
+            digest = getattr(response, 'etag_digest', None)
+            cache.set(key, (response.data, headers, digest), timeout=settings.API_CACHE_TIMEOUT)
+            record('fills')
+            record('fill_time_us', int((time.perf_counter() - started) * 1_000_000))
+        response['X-Cache'] = 'MISS'
+        return response
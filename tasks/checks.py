@@ -0,0 +1,25 @@
+"""
+Проверки конфигурации (manage.py check, запуск gunicorn и run_jobs).
+
+Поколения кэша ответов, версии токенов JWT и счетчики кэша должны быть
+общими для всех процессов: с кэшем в памяти процесса инвалидация в одном
+процессе не доходит до остальных, и они отдают устаревшие ответы и 304.
+"""
+from django.conf import settings
+from django.core.checks import Error, register
+
+PROCESS_LOCAL_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+@register()
+def shared_cache(app_configs, **kwargs):
+    """tasks.E001: при REQUIRE_SHARED_CACHE кэш не может быть в памяти процесса"""
+    backend = settings.CACHES[settings.API_CACHE_ALIAS]['BACKEND']
+    if not settings.REQUIRE_SHARED_CACHE or backend not in PROCESS_LOCAL_BACKENDS:
+        return []
+    return [Error(
+        f'Кэш {settings.API_CACHE_ALIAS!r} ({backend}) хранится в памяти процесса.',
+        hint='Задайте общий кэш: CACHE_BACKEND=django.core.cache.backends.redis.RedisCache '
+             'и CACHE_LOCATION=redis://...; REQUIRE_SHARED_CACHE=False - только для одного процесса.',
+        id='tasks.E001',
+    )]
@@ -0,0 +1,89 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from . import cache
+
+
+class ConditionalGetMixin:
+    """
+    ETag и Last-Modified для list и retrieve.
+
+    ETag списка строится из поколения кэша пользователя (cache.py): оно
+    меняется при любом изменении видимых ему задач и комментариев, поэтому
+    список не агрегирует всю видимую выборку и 304 отдается без запросов
+    к БД. Валидаторы детали считаются одним агрегирующим запросом
+    (max(updated_at) и количество строк) без загрузки объектов и
+    сериализации. Если клиент прислал совпадающий If-None-Match, сразу
+    возвращается 304.
+
+    etag_related - связи, изменения в которых тоже видны в детальном
+    ответе (например, комментарии задачи); выражение для каждой связи
+    задает get_related_last_modified.
+    """
+    etag_related = ()
+
+    def list(self, request, *args, **kwargs):
+        # Last-Modified у списка нет: max(updated_at) уменьшается при
+        # удалении строк, а его расчет требует агрегата по всей выборке
+        state = {'generation': cache.get_generation(request.user.pk)}
+        return self.conditional_response(super().list, state, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).order_by().filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        state = queryset.aggregate(
+            last_modified=Max('updated_at'),
+            count=Count('pk', distinct=True),
+            **{
+                f'{related}_last_modified': self.get_related_last_modified(related)
+                for related in self.etag_related
+            }
+        )
+        if not state['count']:
+            # Объект не найден: 404 вернет обычный обработчик
+            return super().retrieve(request, *args, **kwargs)
+        related_modified = [
+            state[f'{related}_last_modified'] for related in self.etag_related
+        ]
+        state['last_modified'] = max(
+            value for value in [state['last_modified'], *related_modified] if value
+        )
+        return self.conditional_response(super().retrieve, state, request, *args, **kwargs)
+
+    def get_related_last_modified(self, related):
+        """Время последнего изменения связанных объектов (агрегат для retrieve)"""
+        return Max(f'{related}__updated_at')
+
+    def conditional_response(self, handler, state, request, *args, **kwargs):
+        digest = self.compute_digest(request, state)
+        etag = cache.format_etag(request, digest)
+        last_modified = state['last_modified'].timestamp() if state.get('last_modified') else None
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(last_modified) if last_modified else None,
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            # Кэш ответов хранит данные без формата и строит ETag по digest
+            response.etag_digest = digest
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+            # Ответы зависят от пользователя и формата
+            patch_vary_headers(response, ['Authorization', 'Accept'])
+        return response
+
+    def compute_digest(self, request, state):
+        """Основа ETag без формата: пользователь, URL с параметрами и состояние выборки"""
+        source = '|'.join(str(part) for part in (
+            request.user.pk,
+            request.get_full_path(),
+            *sorted(state.items()),
+        ))
+        return hashlib.sha256(source.encode()).hexdigest()
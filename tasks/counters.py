@@ -0,0 +1,215 @@
+"""
+Статистика задач для дашборда (/tasks/stats/).
+
+Вместо GROUP BY по всем задачам пользователя при каждом запросе хранятся
+счетчики TaskCounter по ключу (создатель, исполнитель, статус). Каждое
+изменение задачи превращается в изменения счетчиков: -1 для прежнего
+ключа и +1 для нового, которые записываются в той же транзакции. Чтение
+статистики - это строки пользователя в TaskCounter, их число зависит от
+числа исполнителей и статусов, а не от числа задач.
+
+Просроченность меняется со временем без изменения задач, поэтому overdue
+хранится на момент checked_at, а задачи группы, срок которых истек
+позже, досчитываются при чтении по индексу (creator, status, deadline)
+открытых задач. Раз в TASK_STATS_REFRESH секунд checked_at сдвигается, и это окно
+остается коротким.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ArchivedTask, Task, TaskCounter, TaskStatus
+
+# Поля задачи, от которых зависят счетчики
+FIELDS = ('creator_id', 'assignee_id', 'status', 'deadline')
+
+# Строки счетчиков создаются заранее: UPDATE ниже меняет только существующие
+INSERT_SQL = """
+    INSERT INTO {counters} (creator_id, assignee_id, status, count, overdue, checked_at)
+    SELECT DISTINCT key.creator_id, key.assignee_id, key.status, 0, 0, %s
+    FROM unnest(%s::integer[], %s::integer[], %s::text[])
+        AS key(creator_id, assignee_id, status)
+    ON CONFLICT (creator_id, assignee_id, status) DO NOTHING
+"""
+
+# Просроченность задачи сравнивается с checked_at самой строки в момент
+# UPDATE, поэтому параллельный сдвиг checked_at (refresh) ее не исказит
+UPDATE_SQL = """
+    UPDATE {counters} AS counter
+    SET count = counter.count + delta.count,
+        overdue = counter.overdue + (
+            SELECT coalesce(sum(task.sign), 0)
+            FROM unnest(delta.deadlines, delta.signs) AS task(deadline, sign)
+            WHERE counter.status <> %s AND task.deadline < counter.checked_at
+        )
+    FROM (
+        SELECT creator_id, assignee_id, status, sum(sign) AS count,
+               array_agg(deadline) AS deadlines, array_agg(sign) AS signs
+        FROM unnest(%s::integer[], %s::integer[], %s::text[], %s::timestamptz[], %s::integer[])
+            AS task(creator_id, assignee_id, status, deadline, sign)
+        GROUP BY creator_id, assignee_id, status
+    ) AS delta
+    WHERE counter.creator_id = delta.creator_id
+      AND counter.assignee_id IS NOT DISTINCT FROM delta.assignee_id
+      AND counter.status = delta.status
+"""
+
+
+def task_changes(task, created=False, deleted=False):
+    """
+    Изменения счетчиков для задачи: [((creator_id, assignee_id, status,
+    deadline), +1 или -1)]. Прежние значения берутся из loaded_values.
+    """
+    current = tuple(getattr(task, field) for field in FIELDS)
+    previous = None if created else tuple(
+        task.loaded_values.get(field, value) for field, value in zip(FIELDS, current)
+    )
+    if deleted:
+        return [(previous, -1)]
+    if previous == current:
+        return []
+    return ([(previous, -1)] if previous else []) + [(current, 1)]
+
+
+def apply(changes):
+    """Записать изменения счетчиков (task_changes) двумя запросами"""
+    if not changes:
+        return
+    table = connection.ops.quote_name(TaskCounter._meta.db_table)
+    added = {key[:3] for key, sign in changes if sign > 0}
+    with connection.cursor() as cursor:
+        if added:
+            creators, assignees, statuses = zip(*added)
+            cursor.execute(INSERT_SQL.format(counters=table), [
+                timezone.now(), list(creators), list(assignees), list(statuses)
+            ])
+        creators, assignees, statuses, deadlines = zip(*(key for key, sign in changes))
+        cursor.execute(UPDATE_SQL.format(counters=table), [
+            TaskStatus.DONE, list(creators), list(assignees), list(statuses),
+            list(deadlines), [sign for key, sign in changes],
+        ])
+
+
+def due_tasks(now):
+    """
+    Подзапрос для строки TaskCounter: сколько открытых задач ее группы
+    просрочено после checked_at и до now.
+    """
+    return Coalesce(Subquery(
+        Task.objects.order_by()
+                    .exclude(status=TaskStatus.DONE)
+                    .filter(
+                        creator=OuterRef('creator_id'),
+                        status=OuterRef('status'),
+                        deadline__gte=OuterRef('checked_at'),
+                        deadline__lt=now,
+                    )
+                    .alias(assignee_key=Coalesce('assignee_id', 0))
+                    .filter(assignee_key=Coalesce(OuterRef('assignee_id'), 0))
+                    .values('creator')
+                    .annotate(count=Count('pk'))
+                    .values('count')
+    ), 0)
+
+
+def user_counters(user):
+    """Строки счетчиков задач, которые видит пользователь"""
+    return TaskCounter.objects.filter(Q(creator_id=user.pk) | Q(assignee_id=user.pk))
+
+
+def refresh(user, now):
+    """
+    Перенести в overdue задачи, просроченные с последней проверки, для
+    строк, проверенных раньше TASK_STATS_REFRESH секунд назад.
+
+    Строки, которые сейчас меняет другая транзакция, пропускаются (SKIP
+    LOCKED) и будут обновлены при следующем чтении. UPDATE выполняется
+    после блокировки и видит все задачи, закоммиченные до нее.
+    """
+    stale = user_counters(user).exclude(status=TaskStatus.DONE).filter(
+        count__gt=0, checked_at__lt=now - timedelta(seconds=settings.TASK_STATS_REFRESH)
+    )
+    with transaction.atomic():
+        ids = list(stale.select_for_update(skip_locked=True).values_list('pk', flat=True))
+        if ids:
+            TaskCounter.objects.filter(pk__in=ids).update(
+                overdue=F('overdue') + due_tasks(now), checked_at=now
+            )
+
+
+def summary(user, now=None):
+    """
+    Статистика задач пользователя: по статусам и просроченные среди всех
+    видимых задач, а также по исполнителям задач, которые он создал.
+    """
+    now = now or timezone.now()
+    refresh(user, now)
+    rows = user_counters(user).filter(count__gt=0).annotate(
+        overdue_now=F('overdue') + due_tasks(now)
+    ).values_list('creator_id', 'assignee_id', 'status', 'count', 'overdue_now')
+
+    def empty():
+        return {'total': 0, 'overdue': 0, 'by_status': dict.fromkeys(TaskStatus.values, 0)}
+
+    stats = empty()
+    assignees = {}
+    for creator_id, assignee_id, status, count, overdue in rows:
+        groups = [stats]
+        if creator_id == user.pk:
+            groups.append(assignees.setdefault(assignee_id, empty()))
+        for group in groups:
+            group['total'] += count
+            group['overdue'] += overdue
+            group['by_status'][status] += count
+
+    stats['by_assignee'] = [
+        dict(assignees[assignee_id], assignee_id=assignee_id)
+        for assignee_id in sorted(assignees, key=lambda pk: (pk is None, pk))
+    ]
+    return stats
+
+
+def rebuild(creator_ids):
+    """
+    Пересчитать счетчики создателей по таблице задач и архиву (архивные
+    задачи выполнены и остаются в статистике). Возвращает число строк
+    счетчиков.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        TaskCounter.objects.filter(creator_id__in=creator_ids).delete()
+        counters = {}
+        for model in (Task, ArchivedTask):
+            rows = model.objects.filter(creator_id__in=creator_ids) \
+                                .order_by() \
+                                .values_list('creator_id', 'assignee_id', 'status') \
+                                .annotate(
+                                    count=Count('pk'),
+                                    overdue=Count('pk', filter=Q(deadline__lt=now) & ~Q(status=TaskStatus.DONE)),
+                                )
+            for creator_id, assignee_id, status, count, overdue in rows:
+                counter = counters.setdefault((creator_id, assignee_id, status), [0, 0])
+                counter[0] += count
+                counter[1] += overdue
+        return len(TaskCounter.objects.bulk_create(
+            TaskCounter(
+                creator_id=creator_id, assignee_id=assignee_id, status=status,
+                count=count, overdue=overdue, checked_at=now,
+            )
+            for (creator_id, assignee_id, status), (count, overdue) in counters.items()
+        ))
+
+
+def user_deleted(user_id):
+    """
+    Задачи удаленного пользователя удалены, а задачи, где он исполнитель,
+    остались без исполнителя без сигналов: пересчитать их создателей.
+    """
+    creators = set(
+        TaskCounter.objects.filter(assignee_id=user_id).values_list('creator_id', flat=True)
+    )
+    rebuild(creators | {user_id})
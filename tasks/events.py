@@ -0,0 +1,383 @@
+"""
+Лента изменений задач и комментариев (Server-Sent Events).
+
+Каждое изменение записывается в таблицу TaskEvent в той же транзакции и
+публикуется через PostgreSQL NOTIFY, который доставляется только после
+коммита. В каждом процессе сервера одно соединение слушает канал (LISTEN) и
+раскладывает события по очередям подписчиков, которым они видны, поэтому
+простаивающее подключение клиента - это только очередь и ожидающая
+корутина, без потока и соединения с БД.
+
+При переподключении клиент передает Last-Event-ID и получает пропущенные
+события из таблицы; если их слишком много или они уже удалены
+(prune_events), приходит событие reset - клиенту нужно перечитать списки.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+import psycopg
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, connections, router
+from django.db.models import Q
+from django.utils import timezone
+from psycopg import sql
+from psycopg.conninfo import make_conninfo
+
+from . import cache
+from .models import EventAction, EventKind, Task, TaskEvent
+from .renderers import datetime_formatter
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'task_events'
+# Предел NOTIFY - 8000 байт; более крупные события читаются слушателем из БД
+MAX_PAYLOAD = 7900
+RETRY_MS = 3000
+RECONNECT_DELAY = 5
+
+TASK_FIELDS = (
+    'id', 'title', 'status', 'creator_id', 'assignee_id', 'deadline',
+    'created_at', 'updated_at', 'comments_count'
+)
+COMMENT_FIELDS = ('id', 'task_id', 'author_id', 'text', 'created_at', 'updated_at')
+
+# Сигнал подписчику: дочитать события из БД (очередь переполнена или
+# слушатель переподключался и мог пропустить уведомления)
+RESYNC = None
+
+
+def snapshot(instance, fields):
+    """Данные события в формате ответов API"""
+    convert = datetime_formatter()
+    return {field: convert(getattr(instance, field)) for field in fields}
+
+
+def _events(kind, action, instance, users, previous_users, data, deleted_data):
+    users = set(users) - {None}
+    events = [TaskEvent(
+        kind=kind, action=action, object_id=instance.pk, users=sorted(users),
+        data=deleted_data if action == EventAction.DELETED else data
+    )]
+    # Кто перестал видеть объект, получает для него удаление
+    gone = set(previous_users) - users - {None}
+    if gone and action != EventAction.DELETED:
+        events.append(TaskEvent(
+            kind=kind, action=EventAction.DELETED, object_id=instance.pk,
+            users=sorted(gone), data=deleted_data
+        ))
+    return events
+
+
+def task_events(task, action, previous_users=()):
+    """События изменения задачи для ее создателя и исполнителя"""
+    return _events(
+        EventKind.TASK, action, task, (task.creator_id, task.assignee_id), previous_users,
+        data=snapshot(task, TASK_FIELDS) if action != EventAction.DELETED else None,
+        deleted_data={'id': task.pk},
+    )
+
+
+def comment_events(comment, action, users, previous_users=()):
+    """События изменения комментария для участников задачи"""
+    return _events(
+        EventKind.COMMENT, action, comment, users, previous_users,
+        data=snapshot(comment, COMMENT_FIELDS) if action != EventAction.DELETED else None,
+        deleted_data={'id': comment.pk, 'task_id': comment.task_id},
+    )
+
+
+def tasks_archived(rows):
+    """
+    События переноса задач в архив: (id, creator_id, assignee_id). Задача
+    пропадает из рабочих списков, но доступна через ?archived=true.
+    """
+    return [
+        TaskEvent(
+            kind=EventKind.TASK, action=EventAction.ARCHIVED, object_id=pk,
+            users=sorted({creator_id, assignee_id} - {None}), data={'id': pk},
+        )
+        for pk, creator_id, assignee_id in rows
+    ]
+
+
+def user_events(user, audience):
+    """Изменение имени или email пользователя для всех, кому он виден"""
+    return [TaskEvent(
+        kind=EventKind.USER, action=EventAction.UPDATED, object_id=user.pk,
+        users=sorted(audience), data=snapshot(user, ('id', *cache.USER_FIELDS)),
+    )]
+
+
+def comments_deleted(comments):
+    """
+    События удаления комментариев. Строятся до удаления: после delete() у
+    экземпляров уже нет id.
+    """
+    comments = list(comments)
+    users = task_users({comment.task_id for comment in comments})
+    return [
+        event for comment in comments
+        for event in comment_events(comment, EventAction.DELETED, users[comment.task_id])
+    ]
+
+
+def task_users(task_ids):
+    """Создатель и исполнитель каждой задачи: {task_id: {user_id, ...}}"""
+    users = defaultdict(set)
+    rows = Task.objects.filter(pk__in=task_ids).values_list('pk', 'creator_id', 'assignee_id')
+    for pk, creator_id, assignee_id in rows:
+        users[pk].update({creator_id, assignee_id} - {None})
+    return users
+
+
+def publish(events):
+    """
+    Записать события и отправить уведомления.
+
+    Внутри транзакции NOTIFY доставляется слушателям только после коммита,
+    при откате не доставляется вместе с самими событиями.
+    """
+    if not events:
+        return
+    TaskEvent.objects.bulk_create(events)
+    payloads = [json.dumps(message_payload(event), ensure_ascii=False) for event in events]
+    payloads = [
+        payload if len(payload.encode()) <= MAX_PAYLOAD
+        else json.dumps({'id': event.pk, 'users': event.users})
+        for event, payload in zip(events, payloads)
+    ]
+    # Один JSON-массив вместо text[]: экранирование элементов массива при
+    # большой пачке (bulk-операции, run_jobs) заметно дороже. Тип json, в
+    # отличие от jsonb, сохраняет текст элементов без изменений
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_notify(%s, payload::text) FROM json_array_elements(%s::json) AS payload',
+            [CHANNEL, '[' + ','.join(payloads) + ']']
+        )
+
+
+def message_payload(event):
+    return {
+        'id': event.pk, 'users': event.users,
+        'event': f'{event.kind}.{event.action}', 'data': event.data,
+    }
+
+
+def format_message(event_id, event, data):
+    """Сообщение SSE"""
+    return f'id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+class EventBus:
+    """
+    Доставка уведомлений подписчикам процесса.
+
+    Слушатель запускается в цикле событий сервера при первой подписке и
+    переподключается к БД при обрыве соединения.
+    """
+
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+        self.listener = None
+        self.ready = None
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+        self.subscribers[user_id].add(queue)
+        self.start()
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        queues = self.subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[user_id]
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self.listener is None or self.listener.done() or self.listener.get_loop() is not loop:
+            self.ready = asyncio.Event()
+            self.listener = loop.create_task(self.listen())
+
+    async def stop(self):
+        """Остановить слушатель и закрыть его соединение"""
+        if self.listener is not None:
+            self.listener.cancel()
+            try:
+                await self.listener
+            except asyncio.CancelledError:
+                pass
+            self.listener = None
+
+    async def wait_ready(self):
+        """Дождаться LISTEN: события после этого момента не будут пропущены"""
+        try:
+            await asyncio.wait_for(self.ready.wait(), RECONNECT_DELAY)
+        except TimeoutError:
+            logger.warning('Слушатель ленты событий не подключился к БД')
+
+    async def listen(self):
+        reconnect = False
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    listen_conninfo(), autocommit=True
+                ) as conn:
+                    await conn.execute(sql.SQL('LISTEN {}').format(sql.Identifier(CHANNEL)))
+                    self.ready.set()
+                    if reconnect:
+                        self.resync()
+                    async for notify in conn.notifies():
+                        try:
+                            await self.dispatch(json.loads(notify.payload))
+                        except Exception:
+                            logger.exception('Не удалось доставить событие ленты')
+            except psycopg.Error:
+                logger.exception('Соединение слушателя ленты событий потеряно')
+            self.ready.clear()
+            reconnect = True
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def dispatch(self, message):
+        if not any(user_id in self.subscribers for user_id in message['users']):
+            return
+        if 'data' not in message:
+            message = message_payload(await _load_event(message['id']))
+        for user_id in message['users']:
+            for queue in self.subscribers.get(user_id, ()):
+                self.put(queue, message)
+
+    def put(self, queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Медленный клиент: отбрасываем очередь и дочитываем из БД
+            self.reset_queue(queue)
+
+    def resync(self):
+        for queues in self.subscribers.values():
+            for queue in queues:
+                self.reset_queue(queue)
+
+    def reset_queue(self, queue):
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(RESYNC)
+
+
+bus = EventBus()
+
+
+def listen_conninfo():
+    db = connections[router.db_for_read(TaskEvent)].settings_dict
+    params = {
+        'dbname': db['NAME'], 'user': db['USER'], 'password': db['PASSWORD'],
+        'host': db['HOST'], 'port': db['PORT'],
+        'connect_timeout': db['OPTIONS'].get('connect_timeout'),
+    }
+    return make_conninfo(**{key: value for key, value in params.items() if value})
+
+
+def _release_connections():
+    """
+    Подключение клиента живет долго: соединения с БД, открытые для него,
+    закрываются (возвращаются в пул) сразу, если не идет транзакция.
+    """
+    for conn in connections.all(initialized_only=True):
+        if not conn.in_atomic_block:
+            conn.close()
+
+
+@sync_to_async
+def _load_event(pk):
+    try:
+        return TaskEvent.objects.get(pk=pk)
+    finally:
+        _release_connections()
+
+
+@sync_to_async
+def _backlog(user_id, last_id):
+    """
+    События пользователя после last_id и признак, что продолжить ленту
+    нельзя. События последних EVENTS_RESUME_OVERLAP секунд отдаются
+    повторно: транзакция с меньшим id могла закоммититься позже.
+    """
+    try:
+        oldest = TaskEvent.objects.values_list('pk', flat=True).first()
+        if oldest is not None and last_id < oldest - 1:
+            return [], True
+        since = timezone.now() - timedelta(seconds=settings.EVENTS_RESUME_OVERLAP)
+        events = list(
+            TaskEvent.objects.filter(users__contains=[user_id])
+            .filter(Q(pk__gt=last_id) | Q(created_at__gte=since))
+            .order_by('pk')[:settings.EVENTS_BACKLOG_LIMIT + 1]
+        )
+        if len(events) > settings.EVENTS_BACKLOG_LIMIT:
+            return [], True
+        return events, False
+    finally:
+        _release_connections()
+
+
+@sync_to_async
+def _latest_id():
+    try:
+        return TaskEvent.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    finally:
+        _release_connections()
+
+
+async def stream(user_id, last_id=None, until=None):
+    """
+    Сообщения SSE для пользователя.
+
+    until - время (timestamp), после которого поток закрывается: обычно
+    истечение токена, после чего клиент переподключается с новым.
+    """
+    queue = bus.subscribe(user_id)
+    try:
+        await bus.wait_ready()
+        yield f'retry: {RETRY_MS}\n\n'
+
+        seen = set()
+        if last_id is None:
+            last_id = await _latest_id()
+            yield format_message(last_id, 'ready', {})
+        else:
+            queue.put_nowait(RESYNC)
+
+        while True:
+            timeout = settings.EVENTS_HEARTBEAT
+            if until is not None:
+                timeout = min(timeout, until - timezone.now().timestamp())
+                if timeout <= 0:
+                    return
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout)
+            except TimeoutError:
+                yield ': ping\n\n'
+                continue
+
+            if message is RESYNC:
+                events, reset = await _backlog(user_id, last_id)
+                if reset:
+                    last_id = await _latest_id()
+                    seen = set()
+                    yield format_message(last_id, 'reset', {})
+                    continue
+                # Уведомления, пришедшие во время чтения, не повторяем
+                seen = {event.pk for event in events}
+                for event in events:
+                    last_id = max(last_id, event.pk)
+                    yield format_message(last_id, f'{event.kind}.{event.action}', event.data)
+            elif message['id'] not in seen:
+                last_id = max(last_id, message['id'])
+                yield format_message(last_id, message['event'], message['data'])
+    finally:
+        bus.unsubscribe(user_id, queue)
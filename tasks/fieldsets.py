@@ -0,0 +1,112 @@
+"""
+Выборочные поля ответа: ?fields= и ?expand=.
+
+fields - поля через запятую (без параметра - все поля), expand - вложенные
+объекты, которые выводятся целиком (пользователи, комментарии). Связь без
+expand выводится своим id. Без обоих параметров ответ не меняется.
+
+Запрос к БД сужается до тех же полей: .only() по колонкам выбранных полей
+и select_related только для раскрытых связей.
+"""
+from collections import namedtuple
+from functools import cached_property
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+class Fieldset(namedtuple('Fieldset', ['fields', 'expand'])):
+    """Выбранные поля (None - все) и раскрываемые вложенные объекты"""
+
+    def selects(self, name):
+        return self.fields is None or name in self.fields or name in self.expand
+
+
+def parse_names(request, param):
+    """Имена через запятую из параметра запроса или None без параметра"""
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return [name for name in (part.strip() for part in value.split(',')) if name]
+
+
+def get_fieldset(request, serializer_class):
+    """Fieldset по параметрам запроса или None; неизвестные имена - 400"""
+    fields, expand = parse_names(request, 'fields'), parse_names(request, 'expand')
+    if fields is None and expand is None:
+        return None
+
+    readable = {
+        name: field for name, field in serializer_class().fields.items() if not field.write_only
+    }
+    nested = [name for name, field in readable.items() if isinstance(field, serializers.BaseSerializer)]
+    errors = {}
+    unknown = [name for name in fields or () if name not in readable]
+    if unknown:
+        errors['fields'] = [f'Неизвестные поля: {", ".join(unknown)}. Доступны: {", ".join(readable)}.']
+    unknown = [name for name in expand or () if name not in nested]
+    if unknown:
+        errors['expand'] = [f'Нельзя раскрыть: {", ".join(unknown)}. Доступны: {", ".join(nested)}.']
+    if errors:
+        raise ValidationError(errors)
+    return Fieldset(
+        fields=None if fields is None else frozenset(fields),
+        expand=frozenset(expand or ()),
+    )
+
+
+def is_column(model, name):
+    try:
+        return model._meta.get_field(name).concrete
+    except FieldDoesNotExist:
+        return False
+
+
+class FieldsetMixin:
+    """
+    ?fields= и ?expand= для чтения (fieldset_actions). Представление
+    пропускает свой queryset через restrict_fields; поля сортировки
+    (ordering_fields) загружаются всегда - по ним строится курсор страницы.
+    """
+    fieldset_actions = ('list', 'retrieve')
+
+    @cached_property
+    def fieldset(self):
+        if self.action not in self.fieldset_actions:
+            return None
+        return get_fieldset(self.request, self.get_serializer_class())
+
+    def get_serializer(self, *args, **kwargs):
+        if self.fieldset is not None:
+            kwargs.setdefault('fieldset', self.fieldset)
+        return super().get_serializer(*args, **kwargs)
+
+    def serializes(self, name):
+        """Попадет ли поле name в ответ"""
+        return self.fieldset is None or self.fieldset.selects(name)
+
+    def restrict_fields(self, queryset):
+        """Загружать только колонки полей ответа (без выборочных полей - queryset как есть)"""
+        if self.fieldset is None:
+            return queryset
+        model = queryset.model
+        only = {model._meta.pk.name, *(name for name in self.ordering_fields if is_column(model, name))}
+        related = []
+        for field in self.get_serializer_class()(fieldset=self.fieldset).fields.values():
+            # Комментарии задачи читаются отдельным запросом (Task.latest_comments)
+            if isinstance(field, serializers.ListSerializer) or not is_column(model, field.source):
+                continue
+            only.add(field.source)
+            if isinstance(field, serializers.ModelSerializer):
+                related.append(field.source)
+                related_model = model._meta.get_field(field.source).related_model
+                only.update(
+                    f'{field.source}__{nested.source}' for nested in field.fields.values()
+                    if is_column(related_model, nested.source)
+                )
+        # select_related() без аргументов присоединил бы все связи
+        queryset = queryset.select_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*only)
@@ -1,5 +1,13 @@
+from functools import reduce
+from operator import or_
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Cast
 from django_filters import FilterSet, CharFilter, NumberFilter, DateTimeFilter
-from .models import Task
+from rest_framework.filters import SearchFilter
+
+from .models import ArchivedTask, Task, SEARCH_CONFIG
 
 
 class TaskFilter(FilterSet):
@@ -13,3 +21,52 @@ class TaskFilter(FilterSet):
     class Meta:
         model = Task
         fields = ['status', 'assignee', 'creator', 'deadline_from', 'deadline_to']
+
+
+class ArchivedTaskFilter(TaskFilter):
+    """Те же фильтры для архива выполненных задач"""
+
+    class Meta(TaskFilter.Meta):
+        model = ArchivedTask
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Полнотекстовый поиск PostgreSQL по ?search=.
+
+    Если у представления задан search_vector_field, запрос ищется в этом
+    tsvector-поле по GIN-индексу вместо ILIKE '%term%' по каждому из
+    search_fields. Поля из search_substring_fields дополнительно ищутся как
+    подстрока (ускоряется триграммным индексом). Релевантность доступна в
+    аннотации search_rank: ?ordering=-search_rank.
+
+    Представления без search_vector_field работают как обычный SearchFilter.
+    """
+    rank_annotation = 'search_rank'
+
+    def filter_queryset(self, request, queryset, view):
+        vector_field = getattr(view, 'search_vector_field', None)
+        if vector_field is None:
+            return super().filter_queryset(request, queryset, view)
+
+        terms = ' '.join(self.get_search_terms(request))
+        if not terms:
+            # Сортировка по search_rank без поиска не должна падать
+            return queryset.annotate(**{self.rank_annotation: Value(0.0)})
+
+        query = SearchQuery(terms, config=SEARCH_CONFIG, search_type='websearch')
+        conditions = [Q(**{vector_field: query})] + [
+            Q(**{f'{field}__icontains': terms})
+            for field in getattr(view, 'search_substring_fields', [])
+        ]
+        return queryset.filter(reduce(or_, conditions)) \
+                       .annotate(**{self.rank_annotation: self.get_rank(request, view)})
+
+    def get_rank(self, request, view):
+        """Выражение релевантности для аннотации search_rank (0 без поиска)"""
+        terms = ' '.join(self.get_search_terms(request))
+        if not terms:
+            return Value(0.0)
+        query = SearchQuery(terms, config=SEARCH_CONFIG, search_type='websearch')
+        # float8, чтобы значение без потерь проходило через курсор пагинации
+        return Cast(SearchRank(F(view.search_vector_field), query), FloatField())
@@ -0,0 +1,170 @@
+"""
+Фоновые задачи по срокам: напоминание о приближении срока и уведомление о
+просрочке.
+
+Для каждой открытой задачи таблица Job хранит отложенные задачи со временем
+выполнения run_at. Они создаются, переносятся и удаляются в той же
+транзакции, что и изменение срока или статуса задачи, поэтому воркер не
+сканирует таблицу задач: он читает только наступившие Job по индексу
+(run_at, id), и его работа зависит от числа сработавших сроков, а не от
+числа задач.
+
+Воркеры (команда run_jobs) забирают пачки через SELECT ... FOR UPDATE SKIP
+LOCKED: строки, заблокированные другим воркером, пропускаются, поэтому
+несколько процессов работают параллельно без повторной обработки. Пачка
+обрабатывается и удаляется в одной транзакции. При ошибке задачи пачки
+выполняются по одной, а сбойная переносится на JOBS_RETRY_DELAY секунд.
+
+Уведомления публикуются в ленту изменений (events.py) как task.reminder и
+task.overdue. Каждая пачка записывается в JobBatch: метрики /jobs/stats/
+собираются из БД, общей для воркеров и веб-процессов.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min, Sum
+from django.utils import timezone
+
+from . import events
+from .models import EventAction, Job, JobBatch, JobKind, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = {
+    JobKind.REMINDER: EventAction.REMINDER,
+    JobKind.OVERDUE: EventAction.OVERDUE,
+}
+
+
+def planned_jobs(task, now):
+    """Отложенные задачи, нужные задаче: {kind: run_at}"""
+    if task.status == TaskStatus.DONE:
+        return {}
+    jobs = {JobKind.OVERDUE: task.deadline}
+    if task.deadline > now:
+        # Срок уже ближе, чем за TASK_REMINDER_BEFORE: напоминаем сразу
+        remind_at = task.deadline - timedelta(seconds=settings.TASK_REMINDER_BEFORE)
+        jobs[JobKind.REMINDER] = max(remind_at, now)
+    return jobs
+
+
+def deadline_changed(task):
+    """
+    Изменился срок, или задача закрыта либо открыта заново. Смена статуса
+    между открытыми статусами напоминания не повторяет.
+    """
+    previous = task.loaded_values
+    if 'deadline' not in previous or 'status' not in previous:
+        return True
+    was_done = previous['status'] == TaskStatus.DONE
+    return previous['deadline'] != task.deadline or was_done != (task.status == TaskStatus.DONE)
+
+
+def schedule(tasks, created=False):
+    """
+    Создать, перенести или удалить отложенные задачи для задач, у которых
+    изменился срок или статус выполнения. Вызывается в транзакции
+    изменения задач.
+    """
+    changed = [task for task in tasks if created or deadline_changed(task)]
+    if not changed:
+        return
+    if not created:
+        Job.objects.filter(task__in=[task.pk for task in changed]).delete()
+    now = timezone.now()
+    Job.objects.bulk_create(
+        Job(task=task, kind=kind, run_at=run_at)
+        for task in changed
+        for kind, run_at in planned_jobs(task, now).items()
+    )
+
+
+def handle(jobs):
+    """Опубликовать уведомления по задачам, которые еще не выполнены"""
+    events.publish([
+        event for job in jobs if job.task.status != TaskStatus.DONE
+        for event in events.task_events(job.task, ACTIONS[job.kind])
+    ])
+
+
+def _run(queryset, limit):
+    """Забрать до limit задач, обработать и удалить их в одной транзакции"""
+    with transaction.atomic():
+        jobs = list(
+            queryset.select_related('task')
+                    .defer('task__search_vector')
+                    .select_for_update(skip_locked=True, of=('self',))[:limit]
+        )
+        if jobs:
+            handle(jobs)
+            Job.objects.filter(pk__in=[job.pk for job in jobs]).delete()
+    return jobs
+
+
+def _postpone(pk, now, error):
+    Job.objects.filter(pk=pk).update(
+        attempts=F('attempts') + 1,
+        run_at=now + timedelta(seconds=settings.JOBS_RETRY_DELAY),
+        last_error=repr(error),
+    )
+
+
+def run_batch(batch_size):
+    """
+    Обработать пачку наступивших задач (не больше batch_size). Возвращает
+    обработанные задачи.
+    """
+    started = time.perf_counter()
+    now = timezone.now()
+    due = Job.objects.filter(run_at__lte=now).order_by('run_at', 'pk')
+    failed = 0
+    try:
+        jobs = _run(due, batch_size)
+    except Exception:
+        logger.exception('Не удалось обработать пачку фоновых задач, выполняем по одной')
+        jobs = []
+        for pk in due.values_list('pk', flat=True)[:batch_size]:
+            try:
+                jobs += _run(Job.objects.filter(pk=pk, run_at__lte=now), 1)
+            except Exception as error:
+                logger.exception('Фоновая задача %s не выполнена', pk)
+                _postpone(pk, now, error)
+                failed += 1
+
+    if jobs or failed:
+        JobBatch.objects.create(
+            processed=len(jobs), failed=failed,
+            busy_us=int((time.perf_counter() - started) * 1_000_000),
+            lag_ms=int(sum((now - job.run_at).total_seconds() for job in jobs) * 1000),
+        )
+    return jobs
+
+
+def get_stats():
+    """
+    Метрики очереди: сколько задач ждет и насколько отстает самая старая
+    (по индексу run_at), а также счетчики воркеров за последние
+    JOBS_STATS_WINDOW секунд (JobBatch).
+    """
+    now = timezone.now()
+    totals = JobBatch.objects.filter(
+        finished_at__gte=now - timedelta(seconds=settings.JOBS_STATS_WINDOW)
+    ).aggregate(
+        batches=Count('pk'), processed=Sum('processed'), failed=Sum('failed'),
+        busy_us=Sum('busy_us'), lag_ms=Sum('lag_ms'),
+    )
+    stats = {stat: value or 0 for stat, value in totals.items()}
+    due = Job.objects.filter(run_at__lte=now)
+    oldest = due.aggregate(oldest=Min('run_at'))['oldest']
+    stats.update(
+        window_seconds=settings.JOBS_STATS_WINDOW,
+        due=due.count(),
+        lag_seconds=(now - oldest).total_seconds() if oldest else 0.0,
+        next_run_at=Job.objects.filter(run_at__gt=now).aggregate(next=Min('run_at'))['next'],
+        throughput_per_s=stats['processed'] / stats['busy_us'] * 1_000_000 if stats['busy_us'] else 0.0,
+        avg_lag_seconds=stats['lag_ms'] / stats['processed'] / 1000 if stats['processed'] else 0.0,
+    )
+    return stats
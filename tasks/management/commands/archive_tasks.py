@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from tasks import archive
+
+
+class Command(BaseCommand):
+    help = 'Перенос давно выполненных задач с комментариями в архив пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.TASK_ARCHIVE_AFTER,
+            help='Сколько дней выполненная задача не менялась'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество задач, переносимых в одной транзакции'
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            help='Остановиться после стольких пачек (ограничить время запуска из cron)'
+        )
+
+    def handle(self, *args, days, batch_size, max_batches, **kwargs):
+        before = archive.cutoff(days)
+        archived = batches = 0
+        while max_batches is None or batches < max_batches:
+            # Короткие транзакции не держат блокировки строк долго
+            moved = archive.archive_batch(before, batch_size)
+            if not moved:
+                break
+            archived += moved
+            batches += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Перенесено в архив задач: {archived}'))
@@ -0,0 +1,271 @@
+import http.client
+import json
+import math
+import random
+import threading
+import time
+from base64 import urlsafe_b64decode
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Типичный трафик: сценарий и его доля в процентах
+MIX = {
+    'list': 35,
+    'filter': 15,
+    'search': 10,
+    'retrieve': 25,
+    'comment': 10,
+    'complete': 5,
+}
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест API: типичный трафик пользователей generate_data, пропускная способность и перцентили'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000', help='Адрес запущенного сервера')
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Количество одновременных клиентов (потоков с keep-alive соединением)'
+        )
+        parser.add_argument('--duration', type=float, default=30, help='Длительность замера, секунд')
+        parser.add_argument('--warmup', type=float, default=5, help='Прогрев перед замером, секунд')
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=50,
+            help='Сколько пользователей generate_data входят в систему'
+        )
+        parser.add_argument('--prefix', default='load', help='Префикс имен пользователей generate_data')
+        parser.add_argument('--password', default='load123', help='Пароль пользователей generate_data')
+        parser.add_argument(
+            '--population',
+            type=int,
+            default=1000,
+            help='Сколько пользователей создал generate_data (из них выбираются --users)'
+        )
+        parser.add_argument(
+            '--mix',
+            default=','.join(f'{name}={share}' for name, share in MIX.items()),
+            help='Доли сценариев: list=35,filter=15,...'
+        )
+        parser.add_argument('--seed', type=int, default=1, help='Зерно выбора пользователей и сценариев')
+        parser.add_argument('--output', help='Записать результат в JSON-файл (базовая линия для сравнения)')
+
+    def handle(self, *args, url, concurrency, duration, warmup, users, prefix, password, population,
+               mix, seed, output, **kwargs):
+        target = urlsplit(url)
+        if target.scheme not in ('http', 'https') or not target.hostname:
+            raise CommandError('Неверный --url')
+        weights = self.parse_mix(mix)
+        rng = random.Random(seed)
+
+        # Пользователи с разным объемом задач: выбор по номерам generate_data
+        numbers = rng.sample(range(1, population + 1), min(users, population))
+        clients = []
+        for number in numbers:
+            client = Client(target)
+            client.login(f'{prefix}{number}', password)
+            client.prepare()
+            clients.append(client)
+        self.stdout.write(f'Пользователи: {len(clients)}, задач на первых страницах: '
+                          f'{sum(len(client.tasks) for client in clients)}')
+
+        results = []
+        lock = threading.Lock()
+        start = time.monotonic() + warmup
+        stop = start + duration
+
+        def worker(number):
+            worker_rng = random.Random(f'{seed}:{number}')
+            client = Client(target)
+            local = []
+            while (now := time.monotonic()) < stop:
+                user = worker_rng.choice(clients)
+                scenario = worker_rng.choices(list(weights), weights=list(weights.values()))[0]
+                sample = client.run(scenario, user, worker_rng)
+                if now >= start:
+                    local.append(sample)
+            client.close()
+            with lock:
+                results.extend(local)
+
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        report = self.report(results, duration)
+        if output:
+            with open(output, 'w') as file:
+                json.dump({
+                    'url': url, 'concurrency': concurrency, 'duration': duration, 'users': len(clients),
+                    'mix': weights, 'seed': seed, 'scenarios': report,
+                }, file, ensure_ascii=False, indent=2)
+
+    def parse_mix(self, mix):
+        try:
+            weights = {name: int(share) for name, share in (item.split('=') for item in mix.split(','))}
+        except ValueError:
+            raise CommandError('Неверный --mix, ожидается list=35,filter=15,...')
+        unknown = set(weights) - set(MIX)
+        if unknown or not any(weights.values()):
+            raise CommandError(f'Неверный --mix, сценарии: {", ".join(MIX)}')
+        return {name: share for name, share in weights.items() if share > 0}
+
+    def report(self, results, duration):
+        """Таблица по сценариям и итог: req/s, ошибки, перцентили, SQL из Server-Timing"""
+        self.stdout.write(
+            f'{"scenario":>10} {"requests":>9} {"errors":>7} {"req/s":>8} {"p50, ms":>8} '
+            f'{"p90, ms":>8} {"p99, ms":>8} {"max, ms":>8} {"queries":>8} {"db, ms":>7}'
+        )
+        report = {}
+        groups = {}
+        for sample in results:
+            groups.setdefault(sample[0], []).append(sample)
+        for scenario, samples in [*sorted(groups.items()), ('total', results)]:
+            if not samples:
+                continue
+            timings = sorted(sample[1] for sample in samples)
+            timed = [sample for sample in samples if sample[3] is not None]
+            row = {
+                'requests': len(samples),
+                'errors': sum(1 for sample in samples if not sample[2]),
+                'rps': len(samples) / duration,
+                'p50_ms': percentile(timings, 50) * 1000,
+                'p90_ms': percentile(timings, 90) * 1000,
+                'p99_ms': percentile(timings, 99) * 1000,
+                'max_ms': timings[-1] * 1000,
+                'queries': sum(sample[3] for sample in timed) / len(timed) if timed else None,
+                'db_ms': sum(sample[4] for sample in timed) / len(timed) if timed else None,
+            }
+            report[scenario] = row
+            queries = '-' if row['queries'] is None else f'{row["queries"]:.1f}'
+            db = '-' if row['db_ms'] is None else f'{row["db_ms"]:.1f}'
+            line = (
+                f'{scenario:>10} {row["requests"]:>9} {row["errors"]:>7} {row["rps"]:>8.1f} '
+                f'{row["p50_ms"]:>8.1f} {row["p90_ms"]:>8.1f} {row["p99_ms"]:>8.1f} '
+                f'{row["max_ms"]:>8.1f} {queries:>8} {db:>7}'
+            )
+            self.stdout.write(self.style.ERROR(line) if row['errors'] else line)
+        return report
+
+
+def percentile(timings, share):
+    """Перцентиль отсортированного списка (ближайший ранг)"""
+    return timings[max(math.ceil(len(timings) * share / 100) - 1, 0)]
+
+
+class Client:
+    """HTTP-клиент одного потока: keep-alive соединение и сценарии трафика"""
+
+    def __init__(self, target):
+        self.target = target
+        self.connection = None
+        self.token = None
+        self.tasks = []
+        self.open_tasks = []
+        self.words = []
+
+    def request(self, method, path, body=None, token=None):
+        """(status, тело, секунды, число SQL-запросов, время БД в мс) по Server-Timing"""
+        if self.connection is None:
+            factory = http.client.HTTPSConnection if self.target.scheme == 'https' else http.client.HTTPConnection
+            self.connection = factory(self.target.hostname, self.target.port, timeout=60)
+        headers = {'Accept': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        started = time.perf_counter()
+        try:
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            # Соединение оборвалось: следующий запрос откроет новое
+            self.close()
+            return 0, b'', time.perf_counter() - started, None, None
+        elapsed = time.perf_counter() - started
+        queries, db = server_timing(response.getheader('Server-Timing'))
+        return response.status, content, elapsed, queries, db
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def login(self, username, password):
+        status, content, *_ = self.request(
+            'POST', '/api/v1/token/', {'username': username, 'password': password}
+        )
+        if status != 200:
+            raise CommandError(f'Не удалось войти как {username} ({status}): запустите generate_data')
+        self.token = json.loads(content)['access']
+
+    def prepare(self):
+        """Задачи пользователя для retrieve/comment/complete и слова для поиска"""
+        tasks = self.fetch('/api/v1/tasks/?page_size=100')
+        self.tasks = [task['id'] for task in tasks]
+        self.words = sorted({word for task in tasks for word in task['title'].split()[:2]}) or ['отчет']
+        # Закрыть можно только свои открытые задачи
+        self.open_tasks = [
+            task['id'] for task in self.fetch(f'/api/v1/tasks/?creator={self.user_id}&page_size=100')
+            if task['status'] != 'done'
+        ]
+        self.close()
+
+    def fetch(self, path):
+        status, content, *_ = self.request('GET', path, token=self.token)
+        return json.loads(content)['results'] if status == 200 else []
+
+    @property
+    def user_id(self):
+        # Без проверки подписи: id нужен только для выбора своих задач
+        payload = self.token.split('.')[1]
+        return json.loads(urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))['user_id']
+
+    def run(self, scenario, user, rng):
+        """
+        Выполнить сценарий от имени user: (сценарий, секунды, успех,
+        SQL-запросы, время БД). Если пользователю нечего открыть или закрыть,
+        выполняется list.
+        """
+        if scenario == 'list':
+            method, path, body = 'GET', '/api/v1/tasks/', None
+        elif scenario == 'filter':
+            params = {'status': rng.choice(['new', 'in_progress', 'review', 'done']),
+                      'ordering': rng.choice(['deadline', '-created_at'])}
+            method, path, body = 'GET', f'/api/v1/tasks/?{urlencode(params)}', None
+        elif scenario == 'search':
+            method, path, body = 'GET', f'/api/v1/tasks/?{urlencode({"search": rng.choice(user.words)})}', None
+        elif scenario == 'retrieve' and user.tasks:
+            method, path, body = 'GET', f'/api/v1/tasks/{rng.choice(user.tasks)}/', None
+        elif scenario == 'comment' and user.tasks:
+            method, path, body = 'POST', '/api/v1/comments/', {
+                'task': rng.choice(user.tasks), 'text': 'Комментарий нагрузочного теста'
+            }
+        elif scenario == 'complete' and user.open_tasks:
+            method, path, body = 'POST', f'/api/v1/tasks/{user.open_tasks.pop()}/complete/', None
+        else:
+            scenario, method, path, body = 'list', 'GET', '/api/v1/tasks/', None
+        status, _, elapsed, queries, db = self.request(method, path, body, token=user.token)
+        return scenario, elapsed, 200 <= status < 300, queries, db
+
+
+def server_timing(header):
+    """Число SQL-запросов и время БД из заголовка Server-Timing (tasks/metrics.py)"""
+    if not header:
+        return None, None
+    for entry in header.split(','):
+        name, *params = entry.strip().split(';')
+        if name == 'db':
+            values = dict(param.split('=', 1) for param in params)
+            queries = int(values.get('desc', '"0').strip('"').split()[0])
+            return queries, float(values.get('dur', 0))
+    return None, None
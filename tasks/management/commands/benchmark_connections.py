@@ -0,0 +1,141 @@
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+MODES = {
+    # Как без настроек: новое соединение на каждый запрос
+    'reconnect': {'CONN_MAX_AGE': 0},
+    # Постоянное соединение в каждом потоке (DB_CONN_MAX_AGE)
+    'persistent': {'CONN_MAX_AGE': 600},
+    # Пул psycopg 3 на процесс (DB_POOL)
+    'pool': {'CONN_MAX_AGE': 0, 'pool': True},
+}
+
+
+class Command(BaseCommand):
+    help = 'Сравнение стоимости соединений с БД: переподключение, постоянные соединения и пул'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=16,
+            help='Количество параллельных потоков (одновременных запросов)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Количество запросов на поток'
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=3,
+            help='Количество SQL-запросов на один HTTP-запрос'
+        )
+        parser.add_argument(
+            '--modes',
+            nargs='+',
+            choices=list(MODES),
+            default=list(MODES),
+            help='Сравниваемые режимы'
+        )
+
+    def handle(self, *args, threads, requests, queries, modes, **kwargs):
+        self.stdout.write(
+            f'{"mode":>10} {"req/s":>8} {"avg, ms":>8} {"p99, ms":>8} {"connects":>9}'
+        )
+        for mode in modes:
+            alias = f'benchmark_{mode}'
+            connections.settings[alias] = self.database_settings(mode, threads)
+            try:
+                rps, timings, connects = self.run(alias, threads, requests, queries)
+            finally:
+                if mode == 'pool':
+                    connections[alias].close_pool()
+                del connections.settings[alias]
+
+            timings.sort()
+            avg = sum(timings) / len(timings)
+            p99 = timings[int(len(timings) * 0.99) - 1]
+            self.stdout.write(
+                f'{mode:>10} {rps:>8.0f} {avg * 1000:>8.2f} {p99 * 1000:>8.2f} {connects:>9}'
+            )
+
+    def database_settings(self, mode, threads):
+        options = MODES[mode]
+        database = copy.deepcopy(settings.DATABASES['default'])
+        database['CONN_MAX_AGE'] = options['CONN_MAX_AGE']
+        database['OPTIONS'].pop('pool', None)
+        if options.get('pool'):
+            # Пул не меньше числа потоков: измеряется стоимость соединения, а не ожидание
+            database['OPTIONS']['pool'] = {
+                **settings.DB_POOL_OPTIONS,
+                'max_size': max(settings.DB_POOL_OPTIONS['max_size'], threads),
+            }
+        return database
+
+    def run(self, alias, threads, requests, queries):
+        timings = []
+        connects = []
+        lock = threading.Lock()
+        ready = threading.Barrier(threads + 1)
+        start = threading.Barrier(threads + 1)
+
+        def count_connect(sender, connection, **kwargs):
+            if connection.alias == alias and not connection.pool:
+                with lock:
+                    connects.append(1)
+
+        def worker():
+            # Первый запрос вне замера: прогрев пула и постоянного соединения
+            self.request(alias, queries)
+            ready.wait()
+            start.wait()
+            local = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                self.request(alias, queries)
+                local.append(time.perf_counter() - started)
+            connections[alias].close()
+            with lock:
+                timings.extend(local)
+
+        connection_created.connect(count_connect)
+        try:
+            workers = [threading.Thread(target=worker) for _ in range(threads)]
+            for thread in workers:
+                thread.start()
+            ready.wait()
+            connects.clear()
+            start.wait()
+            started = time.perf_counter()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(count_connect)
+
+        connection = connections[alias]
+        if connection.pool:
+            # Физические соединения пула, а не выдачи соединения запросам
+            total = connection.pool.get_stats().get('connections_num', 0)
+        else:
+            total = len(connects)
+        return threads * requests / elapsed, timings, total
+
+    def request(self, alias, queries):
+        """Один HTTP-запрос: как в Django, соединение проверяется в начале и конце"""
+        connection = connections[alias]
+        connection.close_if_unusable_or_obsolete()
+        with connection.cursor() as cursor:
+            for _ in range(queries):
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+        connection.close_if_unusable_or_obsolete()
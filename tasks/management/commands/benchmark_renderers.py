@@ -0,0 +1,76 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from tasks.models import Task, TaskStatus
+from tasks.renderers import MessagePackRenderer, ORJSONRenderer
+from tasks.serializers import TaskListSerializer
+
+
+class Command(BaseCommand):
+    help = 'Сравнение скорости и размера ответа рендереров для страницы списка задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[100, 1000, 10000],
+            help='Размеры страниц'
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=50,
+            help='Количество разных пользователей (создатели и исполнители)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Количество повторов, берется лучшее время'
+        )
+
+    def handle(self, *args, sizes, users, repeat, **kwargs):
+        # Объекты в памяти, без БД: сериализуется один раз, измеряется рендеринг
+        now = timezone.now()
+        pool = [
+            User(id=i, username=f'user{i}', email=f'user{i}@example.com',
+                 first_name='Имя', last_name='Фамилия')
+            for i in range(1, users + 1)
+        ]
+        statuses = list(TaskStatus.values)
+        renderers = [JSONRenderer(), ORJSONRenderer(), MessagePackRenderer()]
+
+        self.stdout.write(f'{"size":>8} {"renderer":>12} {"ms":>8} {"KB":>8} {"speedup":>8}')
+        for size in sizes:
+            tasks = [
+                Task(id=i, title=f'Задача {i}', status=statuses[i % len(statuses)],
+                     creator=pool[i % users], assignee=pool[i * 7 % users] if i % 3 else None,
+                     deadline=now, created_at=now, comments_count=i % 10)
+                for i in range(1, size + 1)
+            ]
+            page = {
+                'next': 'http://testserver/api/v1/tasks/?cursor=cD0yMDI2', 'previous': None,
+                'results': TaskListSerializer(tasks, many=True).data,
+            }
+            baseline = None
+            for renderer in renderers:
+                elapsed = self.measure(lambda: renderer.render(page), repeat)
+                baseline = baseline or elapsed
+                body = renderer.render(page)
+                name = type(renderer).__name__.removesuffix('Renderer')
+                line = (f'{size:>8} {name:>12} {elapsed * 1000:>8.1f} '
+                        f'{len(body) / 1024:>8.1f} {baseline / elapsed:>7.1f}x')
+                same = not isinstance(renderer, ORJSONRenderer) or body == renderers[0].render(page)
+                self.stdout.write(line if same else self.style.ERROR(f'{line}  (вывод различается!)'))
+
+    def measure(self, render, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            render()
+            best = min(best, time.perf_counter() - started)
+        return best
@@ -0,0 +1,71 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from tasks.models import Task, TaskStatus
+from tasks.serializers import TaskListSerializer
+
+
+class Command(BaseCommand):
+    help = 'Сравнение скорости обычной и быстрой сериализации списка задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[100, 1000, 10000],
+            help='Размеры страниц'
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=50,
+            help='Количество разных пользователей (создатели и исполнители)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Количество повторов, берется лучшее время'
+        )
+
+    def handle(self, *args, sizes, users, repeat, **kwargs):
+        # Объекты в памяти, без БД: измеряется только сериализация
+        now = timezone.now()
+        pool = [
+            User(id=i, username=f'user{i}', email=f'user{i}@example.com',
+                 first_name='Имя', last_name='Фамилия')
+            for i in range(1, users + 1)
+        ]
+        statuses = list(TaskStatus.values)
+
+        self.stdout.write(f'{"size":>8} {"drf, ms":>10} {"fast, ms":>10} {"speedup":>8}')
+        for size in sizes:
+            tasks = [
+                Task(id=i, title=f'Задача {i}', status=statuses[i % len(statuses)],
+                     creator=pool[i % users], assignee=pool[i * 7 % users] if i % 3 else None,
+                     deadline=now, created_at=now, comments_count=i % 10)
+                for i in range(1, size + 1)
+            ]
+            drf = self.measure(
+                lambda: serializers.ListSerializer(tasks, child=TaskListSerializer()).data, repeat
+            )
+            fast = self.measure(lambda: TaskListSerializer(tasks, many=True).data, repeat)
+
+            renderer = JSONRenderer()
+            same = renderer.render(serializers.ListSerializer(tasks, child=TaskListSerializer()).data) \
+                == renderer.render(TaskListSerializer(tasks, many=True).data)
+            line = f'{size:>8} {drf * 1000:>10.1f} {fast * 1000:>10.1f} {drf / fast:>7.1f}x'
+            self.stdout.write(line if same else self.style.ERROR(f'{line}  (вывод различается!)'))
+
+    def measure(self, serialize, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            serialize()
+            best = min(best, time.perf_counter() - started)
+        return best
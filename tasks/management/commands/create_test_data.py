@@ -105,6 +105,7 @@ class Command(BaseCommand):
                 author=user1,
                 text='Начал работу над API, уже реализовал базовые endpoints'
             )
+            Task.objects.change_comments_count(task1.id, 1)
             self.stdout.write(f'  ✓ Создан комментарий к задаче: {task1.title}')
 
         if not Comment.objects.filter(task=task1, author=admin).exists():
@@ -113,6 +114,7 @@ class Command(BaseCommand):
                 author=admin,
                 text='Отлично! Не забудь про валидацию и обработку ошибок'
             )
+            Task.objects.change_comments_count(task1.id, 1)
             self.stdout.write(f'  ✓ Создан комментарий к задаче: {task1.title}')
 
         if not Comment.objects.filter(task=task3, author=user1).exists():
@@ -121,6 +123,7 @@ class Command(BaseCommand):
                 author=user1,
                 text='Тесты готовы, покрытие 85%. Прошу проверить'
             )
+            Task.objects.change_comments_count(task3.id, 1)
             self.stdout.write(f'  ✓ Создан комментарий к задаче: {task3.title}')
 
         if not Comment.objects.filter(task=task3, author=admin).exists():
@@ -129,6 +132,7 @@ class Command(BaseCommand):
                 author=admin,
                 text='Проверил, всё отлично! Переводи в Done'
             )
+            Task.objects.change_comments_count(task3.id, 1)
             self.stdout.write(f'  ✓ Создан комментарий к задаче: {task3.title}')
 
         self.stdout.write('')
@@ -0,0 +1,286 @@
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from tasks import counters
+from tasks.models import Comment, Job, Task, TaskStatus
+
+WORDS = (
+    'отчет', 'релиз', 'сервер', 'клиент', 'дизайн', 'макет', 'база', 'данных', 'миграция',
+    'тест', 'ошибка', 'исправить', 'обновить', 'проверить', 'документация', 'встреча',
+    'бюджет', 'договор', 'поставщик', 'интеграция', 'платеж', 'счет', 'аналитика',
+    'дашборд', 'метрики', 'логи', 'мониторинг', 'резервная', 'копия', 'доступ', 'права',
+    'пароль', 'почта', 'рассылка', 'баннер', 'сайт', 'приложение', 'мобильное', 'android',
+    'ios', 'api', 'кэш', 'индекс', 'запрос', 'оптимизация', 'скорость', 'нагрузка',
+    'очередь', 'уведомление', 'календарь', 'срок', 'план', 'квартал', 'презентация',
+    'обучение', 'онбординг', 'найм', 'вакансия', 'собеседование', 'ревью', 'код',
+)
+
+# Доли статусов задач
+STATUS_WEIGHTS = {
+    TaskStatus.NEW: 20, TaskStatus.IN_PROGRESS: 25, TaskStatus.REVIEW: 10, TaskStatus.DONE: 45,
+}
+
+TASK_COLUMNS = (
+    'id', 'title', 'description', 'status', 'creator_id', 'assignee_id', 'deadline',
+    'created_at', 'updated_at', 'comments_count', 'comments_updated_at',
+)
+COMMENT_COLUMNS = ('id', 'task_id', 'author_id', 'text', 'created_at', 'updated_at')
+USER_COLUMNS = (
+    'id', 'password', 'is_superuser', 'username', 'first_name', 'last_name', 'email',
+    'is_staff', 'is_active', 'date_joined',
+)
+
+
+class Command(BaseCommand):
+    help = 'Генерация больших наборов пользователей, задач и комментариев для нагрузочных тестов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Количество пользователей')
+        parser.add_argument('--tasks', type=int, default=100_000, help='Количество задач')
+        parser.add_argument('--comments', type=int, default=300_000, help='Количество комментариев')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Количество параллельных процессов записи'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50_000,
+            help='Количество задач (с их комментариями) в одной транзакции COPY'
+        )
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=2.0,
+            help='Перекос распределения: чем больше, тем больше задач у немногих '
+                 'пользователей и комментариев у немногих задач (1 - равномерно)'
+        )
+        parser.add_argument('--days', type=int, default=365, help='За сколько дней созданы задачи')
+        parser.add_argument('--seed', type=int, default=1, help='Зерно генератора (воспроизводимость)')
+        parser.add_argument(
+            '--prefix',
+            default='load',
+            help='Префикс имен пользователей: load1, load2, ...'
+        )
+        parser.add_argument('--password', default='load123', help='Пароль всех пользователей')
+
+    def handle(self, *args, users, tasks, comments, workers, chunk_size, skew, days, seed,
+               prefix, password, **kwargs):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Генератор использует COPY и работает только с PostgreSQL')
+        if users < 1 or tasks < 0 or comments < 0 or chunk_size < 1 or skew < 1:
+            raise CommandError('Неверные параметры набора данных')
+        if comments and not tasks:
+            raise CommandError('Комментариям нужны задачи')
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f'Пользователи с префиксом "{prefix}" уже есть, укажите другой --prefix')
+
+        started = time.perf_counter()
+        now = timezone.now()
+        first_user = reserve_ids(User, users)
+        first_task = reserve_ids(Task, tasks)
+        first_comment = reserve_ids(Comment, comments)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            with cursor.copy(copy_sql(User, USER_COLUMNS)) as copy:
+                hashed = make_password(password)
+                for index in range(users):
+                    number = index + 1
+                    copy.write_row((
+                        first_user + index, hashed, False, f'{prefix}{number}',
+                        'Пользователь', str(number), f'{prefix}{number}@example.com',
+                        False, True, now,
+                    ))
+        self.stdout.write(f'Пользователи: {users} ({time.perf_counter() - started:.1f} с)')
+
+        # Части задач с пропорциональной долей комментариев
+        chunks = []
+        for start in range(0, tasks, chunk_size):
+            end = min(start + chunk_size, tasks)
+            comment_start, comment_end = comments * start // tasks, comments * end // tasks
+            chunks.append((
+                len(chunks), first_task + start, end - start,
+                first_comment + comment_start, comment_end - comment_start,
+            ))
+        params = (seed, now, first_user, users, skew, days)
+
+        written = time.perf_counter()
+        if workers > 1 and len(chunks) > 1:
+            # Соединения не наследуются дочерними процессами: каждый откроет свое
+            connections.close_all()
+            with ProcessPoolExecutor(workers, mp_context=get_context('fork')) as pool:
+                for done, _ in enumerate(pool.map(write_chunk, chunks, [params] * len(chunks)), 1):
+                    self.progress(done, len(chunks), written)
+        else:
+            for done, chunk in enumerate(chunks, 1):
+                write_chunk(chunk, params)
+                self.progress(done, len(chunks), written)
+        elapsed = time.perf_counter() - written
+        self.stdout.write(
+            f'Задачи: {tasks}, комментарии: {comments} ({elapsed:.1f} с, '
+            f'{(tasks + comments) / elapsed if elapsed else 0:.0f} строк/с)'
+        )
+
+        # Производные данные: счетчики статистики и отложенные задачи по срокам
+        user_ids = list(range(first_user, first_user + users))
+        for start in range(0, users, 1000):
+            counters.rebuild(user_ids[start:start + 1000])
+        if tasks:
+            schedule_jobs(first_task, first_task + tasks - 1)
+        with connection.cursor() as cursor:
+            for model in (User, Task, Comment, Job):
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - started:.1f} с. '
+            f'Пользователи {prefix}1..{prefix}{users}, пароль {password}'
+        ))
+
+    def progress(self, done, total, started):
+        self.stdout.write(f'  частей {done}/{total} ({time.perf_counter() - started:.1f} с)')
+
+
+def reserve_ids(model, count):
+    """
+    Зарезервировать count идущих подряд id в последовательности таблицы и
+    вернуть первый. Блокировка таблицы не дает вставкам приложения взять
+    id из середины диапазона.
+    """
+    if not count:
+        return 0
+    table = model._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {connection.ops.quote_name(table)} IN EXCLUSIVE MODE')
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+            "nextval(pg_get_serial_sequence(%s, 'id')) + %s - 1)",
+            [table, table, count]
+        )
+        return cursor.fetchone()[0] - count + 1
+
+
+def copy_sql(model, columns):
+    quote = connection.ops.quote_name
+    return f'COPY {quote(model._meta.db_table)} ({", ".join(map(quote, columns))}) FROM STDIN'
+
+
+def skewed(rng, size, skew):
+    """Индекс от 0 до size - 1, малые индексы выпадают чаще (степенной закон)"""
+    return int(size * rng.random() ** skew)
+
+
+def phrases(rng, count, low, high):
+    """Набор случайных фраз: выбор готовой фразы дешевле генерации слов для каждой строки"""
+    return [' '.join(rng.choices(WORDS, k=rng.randint(low, high))) for _ in range(count)]
+
+
+def copy_rows(cursor, model, columns, rows):
+    """
+    COPY в текстовом формате блоками строк. Значения генератора не содержат
+    табуляций, переводов строк и обратных слешей, поэтому не экранируются.
+    """
+    with cursor.copy(copy_sql(model, columns)) as copy:
+        block = []
+        for row in rows:
+            block.append('\t'.join(row))
+            if len(block) == 5000:
+                copy.write('\n'.join(block) + '\n')
+                block = []
+        if block:
+            copy.write('\n'.join(block) + '\n')
+
+
+def write_chunk(chunk, params):
+    """
+    Сгенерировать и записать часть задач с ее комментариями одной
+    транзакцией COPY. Строки зависят только от зерна и номера части,
+    поэтому результат не зависит от числа процессов.
+    """
+    index, first_task, task_count, first_comment, comment_count = chunk
+    seed, now, first_user, users, skew, days = params
+    rng = random.Random(f'{seed}:{index}')
+    span = days * 86400
+    titles, descriptions = phrases(rng, 4096, 2, 5), phrases(rng, 4096, 8, 30)
+    statuses, weights = list(STATUS_WEIGHTS), []
+    for weight in STATUS_WEIGHTS.values():
+        weights.append((weights[-1] if weights else 0) + weight)
+
+    # Комментарии распределяются заранее: comments_count и время последнего
+    # комментария (доля от created_at до now) пишутся вместе с задачей
+    commented = [skewed(rng, task_count, skew) for _ in range(comment_count)]
+    fractions = [rng.random() for _ in commented]
+    comments_count, last_fraction = [0] * task_count, [None] * task_count
+    for offset, fraction in zip(commented, fractions):
+        comments_count[offset] += 1
+        last_fraction[offset] = max(fraction, last_fraction[offset] or 0)
+
+    participants, created = [], []
+
+    def tasks():
+        for offset in range(task_count):
+            creator = first_user + skewed(rng, users, skew)
+            # Каждая десятая задача без исполнителя; частые исполнители - не частые создатели
+            assignee = None if rng.random() < 0.1 else \
+                first_user + (skewed(rng, users, skew) + users // 2) % users
+            status = rng.choices(statuses, cum_weights=weights)[0]
+            # Свежих задач больше, чем старых
+            created_at = now - timedelta(seconds=span * rng.random() ** 2)
+            deadline = created_at + timedelta(seconds=rng.uniform(3600, 60 * 86400))
+            updated_at = created_at + (now - created_at) * rng.random()
+            fraction = last_fraction[offset]
+            participants.append((creator, assignee or creator))
+            created.append(created_at)
+            yield (
+                str(first_task + offset), f'{rng.choice(titles).capitalize()} {first_task + offset}',
+                rng.choice(descriptions), status, str(creator),
+                '\\N' if assignee is None else str(assignee),
+                deadline.isoformat(), created_at.isoformat(), updated_at.isoformat(),
+                str(comments_count[offset]),
+                '\\N' if fraction is None else (created_at + (now - created_at) * fraction).isoformat(),
+            )
+
+    def comments():
+        for number, offset in enumerate(commented):
+            created_at = (created[offset] + (now - created[offset]) * fractions[number]).isoformat()
+            yield (
+                str(first_comment + number), str(first_task + offset),
+                str(rng.choice(participants[offset])), rng.choice(descriptions), created_at, created_at,
+            )
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # GIN-индексы поиска пополняются через список ожидания: больший список
+        # переносится в индекс реже и крупнее
+        cursor.execute("SET LOCAL gin_pending_list_limit = '64MB'")
+        cursor.execute('SET LOCAL synchronous_commit = off')
+        copy_rows(cursor, Task, TASK_COLUMNS, tasks())
+        copy_rows(cursor, Comment, COMMENT_COLUMNS, comments())
+
+
+def schedule_jobs(first_id, last_id):
+    """Отложенные задачи открытых задач с будущим сроком, как в миграции 0009"""
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {quote(Job._meta.db_table)} (kind, task_id, run_at, attempts, last_error)
+            SELECT kind, id, run_at, 0, ''
+            FROM {quote(Task._meta.db_table)},
+                 LATERAL (VALUES
+                     ('overdue', deadline),
+                     ('reminder', greatest(deadline - make_interval(secs => %s), now()))
+                 ) AS job(kind, run_at)
+            WHERE id BETWEEN %s AND %s AND status <> %s AND deadline > now()
+            """,
+            [settings.TASK_REMINDER_BEFORE, first_id, last_id, TaskStatus.DONE]
+        )
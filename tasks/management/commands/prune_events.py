@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from tasks.models import JobBatch, TaskEvent
+
+
+class Command(BaseCommand):
+    help = 'Удаление старых событий ленты изменений пачками и метрик воркеров старше JOBS_STATS_WINDOW'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.EVENTS_RETENTION_DAYS,
+            help='Сколько дней хранить события'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Количество строк, удаляемых одним запросом'
+        )
+
+    def handle(self, *args, days, batch_size, **kwargs):
+        now = timezone.now()
+        deleted = self.prune(TaskEvent.objects.filter(created_at__lt=now - timedelta(days=days)), batch_size)
+        self.stdout.write(self.style.SUCCESS(f'Удалено событий: {deleted}'))
+
+        # Метрики /jobs/stats/ - отдельный шаг со своим сроком хранения
+        batches = JobBatch.objects.filter(finished_at__lt=now - timedelta(seconds=settings.JOBS_STATS_WINDOW))
+        deleted = self.prune(batches, batch_size)
+        self.stdout.write(self.style.SUCCESS(f'Удалено пачек метрик воркеров: {deleted}'))
+
+    def prune(self, queryset, batch_size):
+        """Удалить строки запроса пачками; возвращает их число"""
+        deleted = 0
+        while True:
+            # Каждый DELETE - не больше batch_size строк по первичному ключу
+            # (id = ANY(...)), поэтому блокировки держатся недолго
+            batch = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                return deleted
+            deleted += queryset.model.objects.filter(pk__in=batch).delete()[0]
@@ -0,0 +1,38 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from tasks import counters
+from tasks.models import TaskCounter
+
+
+class Command(BaseCommand):
+    help = 'Пересчет счетчиков статистики задач (TaskCounter) по создателям пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Количество создателей, пересчитываемых в одной транзакции'
+        )
+
+    def handle(self, *args, batch_size, **kwargs):
+        users = rows = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                User.objects.filter(pk__gt=last_pk)
+                            .order_by('pk')
+                            .values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            rows += counters.rebuild(batch)
+            users += len(batch)
+            last_pk = batch[-1]
+
+        # Счетчики пользователей, которых уже нет
+        TaskCounter.objects.exclude(creator_id__in=User.objects.values('pk')).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано пользователей: {users}. Строк счетчиков: {rows}'
+        ))
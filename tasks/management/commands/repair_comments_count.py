@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Now
+from tasks import cache
+from tasks.models import Task, Comment
+
+
+class Command(BaseCommand):
+    help = 'Пересчет счетчиков комментариев задач (comments_count) пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество задач, проверяемых одним запросом'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать расхождения, ничего не исправляя'
+        )
+
+    def handle(self, *args, batch_size, dry_run, **kwargs):
+        actual_count = Coalesce(Subquery(
+            Comment.objects.filter(task=OuterRef('pk'))
+                           .order_by()
+                           .values('task')
+                           .annotate(count=Count('pk'))
+                           .values('count')
+        ), 0)
+
+        checked = drifted = 0
+        last_pk = 0
+        while True:
+            # Границы пачки по первичному ключу: каждый запрос читает
+            # не больше batch_size задач, без OFFSET по большой таблице
+            batch = list(
+                Task.objects.filter(pk__gt=last_pk)
+                            .order_by('pk')
+                            .values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+
+            stale = Task.objects.filter(pk__gt=last_pk, pk__lte=batch[-1]) \
+                                .exclude(comments_count=actual_count)
+            if dry_run:
+                drifted += stale.count()
+            else:
+                # Один UPDATE на пачку: сравнение и исправление атомарны
+                fixed = stale.update(comments_count=actual_count, updated_at=Now())
+                if fixed:
+                    # UPDATE без сигналов: кэш и ETag участников сбрасываем явно
+                    cache.invalidate_tasks(batch)
+                drifted += fixed
+
+            checked += len(batch)
+            last_pk = batch[-1]
+
+        action = 'Найдено расхождений' if dry_run else 'Исправлено счетчиков'
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено задач: {checked}. {action}: {drifted}'
+        ))
@@ -0,0 +1,79 @@
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.utils import timezone
+from tasks import jobs
+
+
+class Command(BaseCommand):
+    help = 'Воркер фоновых задач: напоминания о сроках и уведомления о просрочке'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.JOBS_BATCH_SIZE,
+            help='Количество задач, обрабатываемых в одной транзакции'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help='Пауза в секундах, когда наступивших задач нет'
+        )
+        parser.add_argument(
+            '--stats-interval',
+            type=float,
+            default=60,
+            help='Как часто (в секундах) выводить пропускную способность и отставание'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Обработать наступившие задачи и завершиться (для cron и тестов)'
+        )
+
+    def handle(self, *args, batch_size, poll_interval, stats_interval, once, **kwargs):
+        stop = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            # Остановка по SIGTERM/SIGINT после текущей пачки
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, lambda *args: stop.set())
+
+        total = processed = 0
+        max_lag = 0.0
+        reported = time.monotonic()
+        try:
+            while not stop.is_set():
+                # Как между запросами: соединение проверяется и при обрыве открывается заново
+                close_old_connections()
+                done = jobs.run_batch(batch_size)
+                now = timezone.now()
+                processed += len(done)
+                total += len(done)
+                max_lag = max([max_lag, *((now - job.run_at).total_seconds() for job in done)])
+
+                elapsed = time.monotonic() - reported
+                if elapsed >= stats_interval:
+                    self.report(processed, elapsed, max_lag)
+                    processed, max_lag, reported = 0, 0.0, time.monotonic()
+
+                if len(done) < batch_size:
+                    if once:
+                        break
+                    stop.wait(poll_interval)
+        finally:
+            connections.close_all()
+
+        self.stdout.write(self.style.SUCCESS(f'Обработано задач: {total}'))
+
+    def report(self, processed, elapsed, max_lag):
+        stats = jobs.get_stats()
+        self.stdout.write(
+            f'{processed / elapsed:.1f} задач/с, максимальное отставание {max_lag:.1f} с, '
+            f'в очереди {stats["due"]} (старейшая ждет {stats["lag_seconds"]:.1f} с)'
+        )
@@ -0,0 +1,267 @@
+"""
+Метрики запросов: число SQL-запросов, время в БД, время рендеринга ответа
+(сериализация в JSON/CSV) и общее время.
+
+Замеры выполняет RequestMetricsMiddleware для доли запросов
+REQUEST_METRICS_SAMPLE_RATE. SQL-запросы считает обертка execute_wrapper,
+которая ставится на каждое соединение один раз и берет метрики текущего
+запроса из contextvar, поэтому учитываются и запросы асинхронных
+представлений из потоков sync_to_async. Для запроса вне выборки обертка
+только читает contextvar.
+
+Результат отдается клиенту в заголовке Server-Timing и накапливается в
+процессе для /metrics (формат Prometheus). Представления задают бюджеты
+запросов по действиям (query_budget); превышение пишется в лог и
+метрики, а при QUERY_BUDGET_STRICT (в тестах) вызывает исключение.
+"""
+import hmac
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы общего времени, секунды
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """Запрос выполнил больше SQL-запросов, чем разрешает бюджет действия"""
+
+
+class RequestMetrics:
+    """Замеры одного запроса"""
+    __slots__ = ('started', 'queries', 'db_time', 'render_started', 'render_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_started = None
+        self.render_time = 0.0
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """Обертка соединения: считает запросы и время, если запрос в выборке"""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def install(connection):
+    """Поставить обертку на соединение (сигнал connection_created)"""
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+def endpoint(request):
+    """
+    Имя маршрута, действие и бюджет запросов. Для незнакомых путей одно
+    имя, чтобы число серий метрик не росло от сканеров.
+    """
+    match = request.resolver_match
+    if match is None:
+        return 'unmatched', None, None
+    view = match.func
+    actions = getattr(view, 'actions', None)
+    action = actions.get(request.method.lower()) if actions else request.method.lower()
+    budget = getattr(getattr(view, 'cls', None), 'query_budget', {}).get(action)
+    return match.view_name or match.route, action, budget
+
+
+class Registry:
+    """Накопленные метрики процесса"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = {}
+            self.series = {}
+
+    def observe(self, view, method, status, metrics, total, exceeded):
+        status_class = f'{status // 100}xx'
+        with self.lock:
+            key = (view, method, status_class)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            series = self.series.get((view, method))
+            if series is None:
+                series = self.series[(view, method)] = {
+                    'buckets': [0] * len(BUCKETS), 'count': 0, 'duration': 0.0,
+                    'queries': 0, 'db': 0.0, 'render': 0.0, 'budget_exceeded': 0,
+                }
+            for index, bound in enumerate(BUCKETS):
+                if total <= bound:
+                    series['buckets'][index] += 1
+            series['count'] += 1
+            series['duration'] += total
+            series['queries'] += metrics.queries
+            series['db'] += metrics.db_time
+            series['render'] += metrics.render_time
+            series['budget_exceeded'] += exceeded
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus"""
+        with self.lock:
+            requests = dict(self.requests)
+            series = {key: dict(value, buckets=list(value['buckets']))
+                      for key, value in self.series.items()}
+
+        lines = [
+            '# HELP http_metrics_sample_rate Share of requests that are measured.',
+            '# TYPE http_metrics_sample_rate gauge',
+            f'http_metrics_sample_rate {settings.REQUEST_METRICS_SAMPLE_RATE}',
+            '# HELP http_requests_total Measured requests.',
+            '# TYPE http_requests_total counter',
+        ]
+        for (view, method, status), count in sorted(requests.items()):
+            lines.append(f'http_requests_total{labels(view=view, method=method, status=status)} {count}')
+
+        lines += [
+            '# HELP http_request_duration_seconds Total request time.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for (view, method), value in sorted(series.items()):
+            for bound, count in zip(BUCKETS, value['buckets']):
+                lines.append(
+                    f'http_request_duration_seconds_bucket'
+                    f'{labels(view=view, method=method, le=bound)} {count}'
+                )
+            lines += [
+                f'http_request_duration_seconds_bucket{labels(view=view, method=method, le="+Inf")} {value["count"]}',
+                f'http_request_duration_seconds_sum{labels(view=view, method=method)} {value["duration"]}',
+                f'http_request_duration_seconds_count{labels(view=view, method=method)} {value["count"]}',
+            ]
+
+        for name, field, help_text in (
+            ('http_request_db_queries_total', 'queries', 'SQL queries executed.'),
+            ('http_request_db_seconds_total', 'db', 'Time spent in SQL queries.'),
+            ('http_request_render_seconds_total', 'render', 'Time spent rendering responses.'),
+            ('http_request_query_budget_exceeded_total', 'budget_exceeded',
+             'Requests over the query budget of their action.'),
+        ):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for (view, method), value in sorted(series.items()):
+                lines.append(f'{name}{labels(view=view, method=method)} {value[field]}')
+        return '\n'.join(lines) + '\n'
+
+
+def labels(**values):
+    escaped = (
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in values.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+registry = Registry()
+
+
+class RequestMetricsMiddleware:
+    """
+    Замер запросов: Server-Timing в ответе, метрики процесса для /metrics и
+    проверка бюджета запросов действия. Ставится первым в MIDDLEWARE, чтобы
+    общее время включало остальные middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = self.sample()
+        if metrics is None:
+            return self.get_response(request)
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = self.sample()
+        if metrics is None:
+            return await self.get_response(request)
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def sample(self):
+        rate = settings.REQUEST_METRICS_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return None
+        return RequestMetrics()
+
+    def process_template_response(self, request, response):
+        """Ответы DRF рендерятся после представления: замеряем рендеринг"""
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.render_started = time.perf_counter()
+
+            def rendered(response):
+                metrics.render_time = time.perf_counter() - metrics.render_started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started
+        view, action, budget = endpoint(request)
+        exceeded = budget is not None and metrics.queries > budget
+        registry.observe(view, request.method, response.status_code, metrics, total, exceeded)
+
+        if settings.REQUEST_METRICS_SERVER_TIMING:
+            app = max(total - metrics.db_time - metrics.render_time, 0.0)
+            response['Server-Timing'] = (
+                f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} queries", '
+                f'render;dur={metrics.render_time * 1000:.2f}, '
+                f'app;dur={app * 1000:.2f}, '
+                f'total;dur={total * 1000:.2f}'
+            )
+
+        if exceeded:
+            message = f'{view} ({action}): {metrics.queries} SQL-запросов при бюджете {budget}'
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning('Превышен бюджет запросов: %s', message)
+        return response
+
+
+def metrics_view(request):
+    """
+    Метрики процесса в формате Prometheus. Доступ по METRICS_TOKEN
+    (Authorization: Bearer), без токена - только при DEBUG.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        expected = f'Bearer {token}'
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+            return HttpResponseForbidden()
+    elif not settings.DEBUG:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
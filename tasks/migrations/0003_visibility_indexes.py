@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='tasks_task_creator_b6157f_idx',
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['creator', '-created_at', '-id'], name='tasks_task_creator_ab83a4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assignee', '-created_at', '-id'], name='tasks_task_assigne_1dc76f_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-17 05:03
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_comments_count(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    Comment = apps.get_model('tasks', 'Comment')
+    Task.objects.update(comments_count=Coalesce(Subquery(
+        Comment.objects.filter(task=OuterRef('pk'))
+                       .order_by()
+                       .values('task')
+                       .annotate(count=Count('pk'))
+                       .values('count')
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_visibility_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.RunPython(fill_comments_count, migrations.RunPython.noop),
+    ]
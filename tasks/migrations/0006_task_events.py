@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-17 06:08
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_full_text_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('task', 'Задача'), ('comment', 'Комментарий')], max_length=10, verbose_name='Объект')),
+                ('action', models.CharField(choices=[('created', 'Создание'), ('updated', 'Изменение'), ('deleted', 'Удаление')], max_length=10, verbose_name='Изменение')),
+                ('object_id', models.BigIntegerField(verbose_name='id объекта')),
+                ('users', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), size=None, verbose_name='Получатели')),
+                ('data', models.JSONField(default=dict, verbose_name='Данные')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Событие',
+                'verbose_name_plural': 'События',
+                'ordering': ['id'],
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['users'], name='tasks_taske_users_f986bd_gin'), models.Index(fields=['created_at'], name='tasks_taske_created_6015cf_idx')],
+            },
+        ),
+    ]
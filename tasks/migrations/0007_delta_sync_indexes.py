@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-17 06:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_task_events'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['updated_at', 'id'], name='tasks_comme_updated_fa8ed9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['creator', 'updated_at', 'id'], name='tasks_task_creator_e8ab5d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assignee', 'updated_at', 'id'], name='tasks_task_assigne_0d21d1_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-17 06:27
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.utils import timezone
+
+
+def fill_task_counters(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    TaskCounter = apps.get_model('tasks', 'TaskCounter')
+    now = timezone.now()
+    rows = Task.objects.order_by() \
+                       .values('creator_id', 'assignee_id', 'status') \
+                       .annotate(
+                           count=Count('pk'),
+                           overdue=Count('pk', filter=Q(deadline__lt=now) & ~Q(status='done')),
+                       )
+    TaskCounter.objects.bulk_create(
+        (TaskCounter(**row, checked_at=now) for row in rows.iterator()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_delta_sync_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('creator_id', models.IntegerField(verbose_name='Создатель')),
+                ('assignee_id', models.IntegerField(null=True, verbose_name='Исполнитель')),
+                ('status', models.CharField(choices=[('new', 'Новая'), ('in_progress', 'В работе'), ('review', 'На проверке'), ('done', 'Выполнено')], max_length=20, verbose_name='Статус')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество задач')),
+                ('overdue', models.IntegerField(default=0, verbose_name='Просрочено на момент проверки')),
+                ('checked_at', models.DateTimeField(verbose_name='Время проверки сроков')),
+            ],
+            options={
+                'verbose_name': 'Счетчик задач',
+                'verbose_name_plural': 'Счетчики задач',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'done'), _negated=True), fields=['creator', 'deadline'], name='tasks_task_open_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskcounter',
+            index=models.Index(fields=['assignee_id'], name='tasks_taskc_assigne_243bb3_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='taskcounter',
+            constraint=models.UniqueConstraint(fields=('creator_id', 'assignee_id', 'status'), name='tasks_taskcounter_key', nulls_distinct=False),
+        ),
+        migrations.RunPython(fill_task_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-17 06:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def schedule_open_tasks(apps, schema_editor):
+    """
+    Отложенные задачи для открытых задач с будущим сроком; о задачах,
+    просроченных до появления воркера, уведомления не отправляются.
+    """
+    Task = apps.get_model('tasks', 'Task')
+    Job = apps.get_model('tasks', 'Job')
+    schema_editor.execute(
+        f"""
+        INSERT INTO {Job._meta.db_table} (kind, task_id, run_at, attempts, last_error)
+        SELECT kind, id, run_at, 0, ''
+        FROM {Task._meta.db_table},
+             LATERAL (VALUES
+                 ('overdue', deadline),
+                 ('reminder', greatest(deadline - make_interval(secs => %s), now()))
+             ) AS job(kind, run_at)
+        WHERE status <> 'done' AND deadline > now()
+        """,
+        [settings.TASK_REMINDER_BEFORE]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_task_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='taskevent',
+            name='action',
+            field=models.CharField(choices=[('created', 'Создание'), ('updated', 'Изменение'), ('deleted', 'Удаление'), ('reminder', 'Приближается срок'), ('overdue', 'Срок истек')], max_length=10, verbose_name='Изменение'),
+        ),
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('reminder', 'Напоминание о сроке'), ('overdue', 'Просрочка')], max_length=20, verbose_name='Вид')),
+                ('run_at', models.DateTimeField(verbose_name='Время выполнения')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Неудачных попыток')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='tasks.task', verbose_name='Задача')),
+            ],
+            options={
+                'verbose_name': 'Фоновая задача',
+                'verbose_name_plural': 'Фоновые задачи',
+                'indexes': [models.Index(fields=['run_at', 'id'], name='tasks_job_run_at_632840_idx')],
+                'constraints': [models.UniqueConstraint(fields=('task', 'kind'), name='tasks_job_task_kind')],
+            },
+        ),
+        migrations.RunPython(schedule_open_tasks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0011_task_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Новые индексы создаются до удаления тех, которые они заменяют
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['creator', 'deadline', 'id'], name='tasks_task_creator_a5f763_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assignee', 'deadline', 'id'], name='tasks_task_assigne_6c39ec_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['creator', 'status', 'id'], name='tasks_task_creator_37dce0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assignee', 'status', 'id'], name='tasks_task_assigne_187865_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['creator', 'status', '-created_at', '-id'], name='tasks_task_creator_9f9a50_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assignee', 'status', '-created_at', '-id'], name='tasks_task_assigne_ac9b68_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'done'), _negated=True), fields=['creator', 'status', 'deadline', 'id'], name='tasks_task_creator_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'done'), _negated=True), fields=['assignee', 'status', 'deadline', 'id'], name='tasks_task_assignee_open_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='tasks_task_assigne_7928f6_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='tasks_task_deadlin_736196_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='tasks_task_open_deadline_idx',
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-17 09:47
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def fill_comments_updated_at(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    Comment = apps.get_model('tasks', 'Comment')
+    Task.objects.update(comments_updated_at=Subquery(
+        Comment.objects.filter(task=OuterRef('pk'))
+                       .order_by()
+                       .values('task')
+                       .annotate(last=Max('updated_at'))
+                       .values('last')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0012_task_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='assigned_at',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Дата назначения'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='comments_updated_at',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Изменение комментариев'),
+        ),
+        migrations.RunPython(fill_comments_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['task', 'updated_at', 'id'], name='tasks_comme_task_id_42cf75_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['creator', 'comments_updated_at'], name='tasks_task_creator_26009a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assignee', 'comments_updated_at'], name='tasks_task_assigne_80e32e_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='tasks_comme_updated_fa8ed9_idx',
+        ),
+    ]
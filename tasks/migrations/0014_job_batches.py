@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-17 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0013_sync_comments_stream'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('processed', models.PositiveIntegerField(verbose_name='Обработано')),
+                ('failed', models.PositiveIntegerField(verbose_name='С ошибкой')),
+                ('busy_us', models.BigIntegerField(verbose_name='Время обработки, мкс')),
+                ('lag_ms', models.BigIntegerField(verbose_name='Суммарное отставание, мс')),
+                ('finished_at', models.DateTimeField(auto_now_add=True, verbose_name='Время завершения')),
+            ],
+            options={
+                'verbose_name': 'Пачка фоновых задач',
+                'verbose_name_plural': 'Пачки фоновых задач',
+                'indexes': [models.Index(fields=['finished_at'], name='tasks_jobba_finishe_c9ad10_idx')],
+            },
+        ),
+    ]
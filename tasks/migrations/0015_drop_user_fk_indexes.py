@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-17 10:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Индексы, которые Django создал для внешних ключей: их заменяют составные
+# (creator|assignee, ...). AlterField пересоздал бы и ограничения FOREIGN KEY
+# с проверкой всей таблицы, поэтому удаляются только индексы
+INDEXES = (
+    ('tasks_task', 'creator_id', 'tasks_task_creator_id_ca3b6762'),
+    ('tasks_task', 'assignee_id', 'tasks_task_assignee_id_2c3ca866'),
+    ('tasks_archivedtask', 'creator_id', 'tasks_archivedtask_creator_id_b1437147'),
+    ('tasks_archivedtask', 'assignee_id', 'tasks_archivedtask_assignee_id_58244a75'),
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0014_job_batches'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    f'DROP INDEX IF EXISTS "{name}"',
+                    f'CREATE INDEX "{name}" ON "{table}" ("{column}")',
+                )
+                for table, column, name in INDEXES
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='archivedtask',
+                    name='assignee',
+                    field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assigned_%(class)ss', to=settings.AUTH_USER_MODEL, verbose_name='Исполнитель'),
+                ),
+                migrations.AlterField(
+                    model_name='archivedtask',
+                    name='creator',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='created_%(class)ss', to=settings.AUTH_USER_MODEL, verbose_name='Создатель'),
+                ),
+                migrations.AlterField(
+                    model_name='task',
+                    name='assignee',
+                    field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assigned_%(class)ss', to=settings.AUTH_USER_MODEL, verbose_name='Исполнитель'),
+                ),
+                migrations.AlterField(
+                    model_name='task',
+                    name='creator',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='created_%(class)ss', to=settings.AUTH_USER_MODEL, verbose_name='Создатель'),
+                ),
+            ],
+        ),
+    ]
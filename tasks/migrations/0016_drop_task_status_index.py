@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-17 10:28
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0015_drop_user_fk_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='tasks_task_status_2add5e_idx',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0016_drop_task_status_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='taskevent',
+            name='kind',
+            field=models.CharField(choices=[('task', 'Задача'), ('comment', 'Комментарий'), ('user', 'Пользователь')], max_length=10, verbose_name='Объект'),
+        ),
+    ]
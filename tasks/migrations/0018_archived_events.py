@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 10:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0017_user_events'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='taskevent',
+            name='action',
+            field=models.CharField(choices=[('created', 'Создание'), ('updated', 'Изменение'), ('deleted', 'Удаление'), ('reminder', 'Приближается срок'), ('overdue', 'Срок истек'), ('archived', 'Перенос в архив')], max_length=10, verbose_name='Изменение'),
+        ),
+    ]
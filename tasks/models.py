@@ -1,5 +1,40 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, router, transaction
+from django.db.models import F, Prefetch, Q, Value
+from django.db.models.functions import Greatest, Now, Upper
 from django.contrib.auth.models import User
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.utils import timezone
+
+# Конфигурация russian стеммит русские слова (russian_stem), а слова
+# латиницей - английским стеммером (english_stem), что подходит для
+# смешанных русско-английских данных
+SEARCH_CONFIG = 'russian'
+
+
+def build_search_vector(*weighted_fields):
+    """tsvector по полям с весами: build_search_vector(('title', 'A'), ...)"""
+    vector = None
+    for field, weight in weighted_fields:
+        field_vector = SearchVector(field, config=SEARCH_CONFIG, weight=weight)
+        vector = field_vector if vector is None else vector + field_vector
+    return vector
+
+
+class LoadedValuesMixin:
+    """
+    Запоминает значения полей, прочитанные из БД, чтобы при сохранении
+    знать прежние значения (например, прежнего исполнителя задачи).
+    """
+    loaded_values = {}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.loaded_values = dict(zip(field_names, values))
+        return instance
 
 
 class TaskStatus(models.TextChoices):
@@ -10,8 +45,94 @@ class TaskStatus(models.TextChoices):
     DONE = 'done', 'Выполнено'
 
 
-class Task(models.Model):
-    """Модель задачи"""
+class SearchVectorManager(models.Manager):
+    """Менеджер, не загружающий tsvector в обычных запросах"""
+
+    def get_queryset(self):
+        return super().get_queryset().defer('search_vector')
+
+
+class TaskQuerySet(models.QuerySet):
+    """QuerySet задач с правилами видимости"""
+
+    def visible_ids(self, user):
+        """
+        id задач, где пользователь создатель или исполнитель.
+
+        Вместо OR по двум колонкам (bitmap-OR или seq scan в PostgreSQL)
+        объединяем через UNION ALL две ветки, каждая из которых читается
+        index-only scan по индексам (creator, -created_at, -id) и
+        (assignee, -created_at, -id). Дубликаты для IN (...) не важны.
+        """
+        tasks = self.model._default_manager.order_by()
+        created = tasks.filter(creator=user).values('pk')
+        assigned = tasks.filter(assignee=user).values('pk')
+        return created.union(assigned, all=True)
+
+    def visible_to(self, user):
+        """Задачи, которые видит пользователь"""
+        return self.filter(pk__in=self.visible_ids(user))
+
+    def visible_page_ids(self, user, limit):
+        """
+        id первых limit видимых пользователю задач отфильтрованного и
+        отсортированного запроса (не больше 2 * limit, с повторами).
+
+        Фильтры, сортировка и LIMIT применяются в каждой ветке visible_ids,
+        поэтому ветка - range scan по индексу (creator|assignee, ...) не
+        дальше limit строк, а не выборка всех задач пользователя с
+        сортировкой. Какие индексы нужны веткам - см. Task.Meta.indexes.
+        """
+        branches = [self.filter(**{field: user}).values('pk')[:limit] for field in ('creator', 'assignee')]
+        return branches[0].union(branches[1], all=True)
+
+    def with_latest_comments(self):
+        """
+        Предзагрузить последние TASK_DETAIL_COMMENTS комментариев каждой
+        задачи (Task.latest_comments). Срез prefetch выполняется оконной
+        функцией по индексу (task, created_at, id) и не читает остальные
+        комментарии.
+        """
+        comment_model = self.model._meta.get_field('comments').related_model
+        return self.prefetch_related(Prefetch(
+            'comments',
+            queryset=comment_model.objects.select_related('author')
+                                    .order_by('-created_at', '-id')[:settings.TASK_DETAIL_COMMENTS],
+            to_attr='prefetched_latest_comments',
+        ))
+
+    def change_comments_count(self, task_id, delta):
+        """
+        Атомарно изменить счетчик комментариев задачи на delta.
+
+        Счетчик не опускается ниже нуля, даже если он уже разошелся с
+        реальным числом комментариев (исправляет repair_comments_count).
+        updated_at тоже обновляется: comments_count входит в представление
+        задачи, и по updated_at клиенты узнают об изменении.
+        """
+        return self.filter(pk=task_id).update(
+            comments_count=Greatest(F('comments_count') + delta, 0),
+            updated_at=Now()
+        )
+
+    def comments_changed(self, task_id, changed_at):
+        """Отметить изменение комментария задачи (Task.comments_updated_at)"""
+        # GREATEST в PostgreSQL пропускает NULL
+        return self.filter(pk=task_id).update(
+            comments_updated_at=Greatest('comments_updated_at', Value(changed_at))
+        )
+
+
+class CommentQuerySet(models.QuerySet):
+    """QuerySet комментариев с правилами видимости"""
+
+    def visible_to(self, user):
+        """Комментарии к задачам, которые видит пользователь"""
+        return self.filter(task__in=Task.objects.visible_ids(user))
+
+
+class AbstractTask(LoadedValuesMixin, models.Model):
+    """Поля и поведение задачи, общие для рабочей таблицы и архива"""
     title = models.CharField('Название', max_length=255)
     description = models.TextField('Описание')
     status = models.CharField(
@@ -20,45 +141,160 @@ class Task(models.Model):
         choices=TaskStatus.choices,
         default=TaskStatus.NEW
     )
+    # Отдельные индексы по creator и assignee не нужны: их заменяют
+    # составные (creator|assignee, ...) в Meta.indexes наследников
     creator = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='created_tasks',
-        verbose_name='Создатель'
+        related_name='created_%(class)ss',
+        verbose_name='Создатель',
+        db_index=False
     )
     assignee = models.ForeignKey(
         User,
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
-        related_name='assigned_tasks',
-        verbose_name='Исполнитель'
+        related_name='assigned_%(class)ss',
+        verbose_name='Исполнитель',
+        db_index=False
     )
     deadline = models.DateTimeField('Срок выполнения')
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('Дата обновления', auto_now=True)
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False
+    )
+    # Поддерживается самой БД при каждом INSERT/UPDATE
+    search_vector = models.GeneratedField(
+        expression=build_search_vector(('title', 'A'), ('description', 'B')),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = SearchVectorManager.from_queryset(TaskQuerySet)()
 
     class Meta:
+        abstract = True
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.title
+
+    @property
+    def latest_comments(self):
+        """
+        Последние TASK_DETAIL_COMMENTS комментариев в порядке создания: из
+        with_latest_comments или одним запросом. Все комментарии задачи
+        отдает /tasks/{id}/comments/ с пагинацией.
+        """
+        comments = getattr(self, 'prefetched_latest_comments', None)
+        if comments is None:
+            comments = self.prefetched_latest_comments = list(self.latest_comments_queryset())
+        return comments[::-1]
+
+    def latest_comments_queryset(self):
+        """Последние комментарии от новых к старым: обратный проход по индексу с LIMIT"""
+        return self.comments.select_related('author').order_by(
+            '-created_at', '-id'
+        )[:settings.TASK_DETAIL_COMMENTS]
+
+
+class Task(AbstractTask):
+    """Модель задачи"""
+    # Для дельта-синхронизации (sync.changed_comments): время последнего
+    # изменения комментариев задачи (comments_changed) и смены исполнителя
+    comments_updated_at = models.DateTimeField('Изменение комментариев', null=True, editable=False)
+    assigned_at = models.DateTimeField('Дата назначения', null=True, editable=False)
+
+    class Meta(AbstractTask.Meta):
         verbose_name = 'Задача'
         verbose_name_plural = 'Задачи'
-        ordering = ['-created_at']
+        # Ветки списка (TaskQuerySet.visible_page_ids) для каждой пары фильтр x
+        # сортировка из TaskFilter и ordering_fields: ведущая колонка - ветка,
+        # дальше фильтр на равенство и ключ сортировки с id. Фильтр по другому
+        # участнику выбирает ветку по его индексу, диапазон deadline - индекс
+        # с deadline. Покрытие проверяет TaskFilterPlanTest.
         indexes = [
-            models.Index(fields=['assignee', 'status']),
-            models.Index(fields=['creator']),
-            models.Index(fields=['deadline']),
+            # Ветки UNION в TaskQuerySet.visible_ids и их сортировка по дате
+            models.Index(fields=['creator', '-created_at', '-id']),
+            models.Index(fields=['assignee', '-created_at', '-id']),
+            # ?ordering=deadline и диапазон deadline_from/deadline_to
+            models.Index(fields=['creator', 'deadline', 'id']),
+            models.Index(fields=['assignee', 'deadline', 'id']),
+            # ?ordering=status
+            models.Index(fields=['creator', 'status', 'id']),
+            models.Index(fields=['assignee', 'status', 'id']),
+            # ?status= с сортировкой по умолчанию
+            models.Index(fields=['creator', 'status', '-created_at', '-id']),
+            models.Index(fields=['assignee', 'status', '-created_at', '-id']),
+            # ?status= открытых задач со сортировкой или диапазоном по сроку;
+            # по нему же досчитываются просроченные задачи (counters.due_tasks)
+            models.Index(
+                fields=['creator', 'status', 'deadline', 'id'],
+                condition=~Q(status=TaskStatus.DONE),
+                name='tasks_task_creator_open_idx'
+            ),
+            models.Index(
+                fields=['assignee', 'status', 'deadline', 'id'],
+                condition=~Q(status=TaskStatus.DONE),
+                name='tasks_task_assignee_open_idx'
+            ),
+            # Те же ветки в дельта-синхронизации (sync.changed_tasks и changed_comments)
+            models.Index(fields=['creator', 'updated_at', 'id']),
+            models.Index(fields=['assignee', 'updated_at', 'id']),
+            models.Index(fields=['creator', 'comments_updated_at']),
+            models.Index(fields=['assignee', 'comments_updated_at']),
+            # Обход всей таблицы по ключу сортировки (админка). archive.archivable
+            # идет по первичному ключу: пакетной задаче отдельный индекс не нужен
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['deadline', 'id']),
+            GinIndex(fields=['search_vector']),
+            # Поиск подстроки: icontains строится как UPPER(title) LIKE UPPER(%s)
+            GinIndex(
+                OpClass(Upper('title'), name='gin_trgm_ops'),
+                name='tasks_task_title_trgm_idx'
+            ),
         ]
 
-    def __str__(self):
-        return self.title
+    def save(self, *args, **kwargs):
+        """
+        comments_count и comments_updated_at меняются только запросами
+        change_comments_count и comments_changed, поэтому при обновлении
+        задачи не перезаписываем их прочитанными ранее значениями (иначе
+        параллельно добавленный комментарий потеряется).
+
+        При смене исполнителя запоминается assigned_at. Сохранение и
+        обработчики post_save (счетчики статистики, события) выполняются
+        в одной транзакции.
+        """
+        update_fields = kwargs.get('update_fields')
+        if self.assignee_id != self.loaded_values.get('assignee_id', self.assignee_id):
+            self.assigned_at = timezone.now()
+            if update_fields is not None:
+                kwargs['update_fields'] = [*update_fields, 'assigned_at']
+        if not self._state.adding and update_fields is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and not field.generated
+                and field.name not in ('comments_count', 'comments_updated_at')
+            ]
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
 
 
-class Comment(models.Model):
+class Comment(LoadedValuesMixin, models.Model):
     """Модель комментария к задаче"""
+    # Отдельный индекс по task не нужен: его заменяет (task, created_at, id)
     task = models.ForeignKey(
         Task,
         on_delete=models.CASCADE,
         related_name='comments',
-        verbose_name='Задача'
+        verbose_name='Задача',
+        db_index=False
     )
     author = models.ForeignKey(
         User,
@@ -69,11 +305,229 @@ class Comment(models.Model):
     text = models.TextField('Текст комментария')
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('Дата обновления', auto_now=True)
+    search_vector = models.GeneratedField(
+        expression=build_search_vector(('text', 'A')),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = SearchVectorManager.from_queryset(CommentQuerySet)()
 
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            # Комментарии задачи: /tasks/{id}/comments/ и последние в детали задачи
+            models.Index(fields=['task', 'created_at', 'id']),
+            # Дельта-синхронизация (sync.changed_comments)
+            models.Index(fields=['task', 'updated_at', 'id']),
+            GinIndex(fields=['search_vector']),
+        ]
 
     def __str__(self):
         return f'Комментарий от {self.author.username} к задаче {self.task.title}'
+
+
+class ArchivedTask(AbstractTask):
+    """
+    Выполненная задача, перенесенная из рабочей таблицы (tasks/archive.py).
+
+    Архив только читается (?archived=true), поэтому индексов меньше, чем у
+    Task: видимость пользователю с сортировкой по дате и поиск. id
+    сохраняется, у задачи и ее архивной копии он один и тот же.
+    """
+    archived_at = models.DateTimeField('Дата архивации')
+
+    class Meta(AbstractTask.Meta):
+        verbose_name = 'Архивная задача'
+        verbose_name_plural = 'Архивные задачи'
+        indexes = [
+            models.Index(fields=['creator', '-created_at', '-id']),
+            models.Index(fields=['assignee', '-created_at', '-id']),
+            GinIndex(fields=['search_vector']),
+        ]
+
+
+class ArchivedComment(models.Model):
+    """Комментарий архивной задачи"""
+    task = models.ForeignKey(
+        ArchivedTask,
+        on_delete=models.CASCADE,
+        related_name='comments',
+        verbose_name='Задача',
+        db_index=False
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+        verbose_name='Автор'
+    )
+    text = models.TextField('Текст комментария')
+    created_at = models.DateTimeField('Дата создания')
+    updated_at = models.DateTimeField('Дата обновления')
+
+    class Meta:
+        verbose_name = 'Архивный комментарий'
+        verbose_name_plural = 'Архивные комментарии'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['task', 'created_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f'Комментарий от {self.author.username} к задаче {self.task.title}'
+
+
+class EventKind(models.TextChoices):
+    """Объекты ленты изменений"""
+    TASK = 'task', 'Задача'
+    COMMENT = 'comment', 'Комментарий'
+    # Изменились имя или email участника (cache.USER_FIELDS)
+    USER = 'user', 'Пользователь'
+
+
+class EventAction(models.TextChoices):
+    """Виды изменений в ленте"""
+    CREATED = 'created', 'Создание'
+    UPDATED = 'updated', 'Изменение'
+    DELETED = 'deleted', 'Удаление'
+    # Уведомления фоновых задач (tasks/jobs.py)
+    REMINDER = 'reminder', 'Приближается срок'
+    OVERDUE = 'overdue', 'Срок истек'
+    # Перенос выполненной задачи в архив (tasks/archive.py)
+    ARCHIVED = 'archived', 'Перенос в архив'
+
+
+class TaskEvent(models.Model):
+    """
+    Событие ленты изменений задач и комментариев.
+
+    users - пользователи, которым событие доставляется (создатель и
+    исполнитель задачи на момент изменения). Объекты не связаны внешними
+    ключами, чтобы события об удалении пережили сами объекты.
+    """
+    kind = models.CharField('Объект', max_length=10, choices=EventKind.choices)
+    action = models.CharField('Изменение', max_length=10, choices=EventAction.choices)
+    object_id = models.BigIntegerField('id объекта')
+    users = ArrayField(models.IntegerField(), verbose_name='Получатели')
+    data = models.JSONField('Данные', default=dict)
+    created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Событие'
+        verbose_name_plural = 'События'
+        ordering = ['id']
+        indexes = [
+            # События пользователя при возобновлении ленты: users @> ARRAY[id]
+            GinIndex(fields=['users']),
+            # Очистка старых событий (prune_events)
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}.{self.action} #{self.object_id}'
+
+
+class TaskCounter(models.Model):
+    """
+    Число задач создателя с данным исполнителем и статусом - основа
+    статистики /tasks/stats/ (tasks/counters.py).
+
+    Счетчики меняются в той же транзакции, что и задачи, а команда
+    rebuild_task_stats пересчитывает их заново. overdue - сколько задач
+    группы просрочено на момент checked_at; задачи, срок которых истек
+    позже, досчитываются при чтении. Пользователи не связаны внешними
+    ключами: при удалении исполнителя задачи не отправляют сигналов, и
+    счетчики его создателей пересчитываются отдельно.
+    """
+    creator_id = models.IntegerField('Создатель')
+    assignee_id = models.IntegerField('Исполнитель', null=True)
+    status = models.CharField('Статус', max_length=20, choices=TaskStatus.choices)
+    count = models.IntegerField('Количество задач', default=0)
+    overdue = models.IntegerField('Просрочено на момент проверки', default=0)
+    checked_at = models.DateTimeField('Время проверки сроков')
+
+    class Meta:
+        verbose_name = 'Счетчик задач'
+        verbose_name_plural = 'Счетчики задач'
+        constraints = [
+            # Ключ для INSERT ... ON CONFLICT, задачи без исполнителя - одна группа
+            models.UniqueConstraint(
+                fields=['creator_id', 'assignee_id', 'status'],
+                nulls_distinct=False,
+                name='tasks_taskcounter_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['assignee_id']),
+        ]
+
+    def __str__(self):
+        return f'{self.creator_id}/{self.assignee_id}/{self.status}: {self.count}'
+
+
+class JobKind(models.TextChoices):
+    """Виды фоновых задач"""
+    REMINDER = 'reminder', 'Напоминание о сроке'
+    OVERDUE = 'overdue', 'Просрочка'
+
+
+class Job(models.Model):
+    """
+    Отложенная фоновая задача по задаче пользователя (tasks/jobs.py).
+
+    Для каждой открытой задачи есть не более одной задачи каждого вида;
+    при изменении срока или статуса она переносится или удаляется в той же
+    транзакции. Воркер run_jobs выбирает наступившие по индексу run_at.
+    """
+    kind = models.CharField('Вид', max_length=20, choices=JobKind.choices)
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        related_name='jobs',
+        verbose_name='Задача'
+    )
+    run_at = models.DateTimeField('Время выполнения')
+    attempts = models.PositiveIntegerField('Неудачных попыток', default=0)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'kind'], name='tasks_job_task_kind'),
+        ]
+        indexes = [
+            # Выборка наступивших задач воркером
+            models.Index(fields=['run_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.task_id} @ {self.run_at}'
+
+
+class JobBatch(models.Model):
+    """
+    Пачка, обработанная воркером run_jobs: основа метрик /jobs/stats/.
+    Воркеры и веб - разные процессы, поэтому метрики хранятся в БД, а не
+    в кэше процесса. Старые строки удаляет prune_events.
+    """
+    processed = models.PositiveIntegerField('Обработано')
+    failed = models.PositiveIntegerField('С ошибкой')
+    busy_us = models.BigIntegerField('Время обработки, мкс')
+    lag_ms = models.BigIntegerField('Суммарное отставание, мс')
+    finished_at = models.DateTimeField('Время завершения', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Пачка фоновых задач'
+        verbose_name_plural = 'Пачки фоновых задач'
+        indexes = [
+            # Метрики за окно JOBS_STATS_WINDOW и очистка
+            models.Index(fields=['finished_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.processed} @ {self.finished_at}'
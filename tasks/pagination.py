@@ -0,0 +1,213 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import BooleanField, F, Func, Q, Value
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+from rest_framework.utils.urls import replace_query_param
+
+Cursor = namedtuple('Cursor', ['reverse', 'position'])
+
+
+class RowCompare(Func):
+    """Сравнение строк (a, b, ...) >= (x, y, ...) - условие индекса по составному ключу"""
+    output_field = BooleanField()
+
+    def __init__(self, fields, operator, values):
+        self.operator, self.size = operator, len(fields)
+        super().__init__(*fields, *(Value(value) for value in values))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        parts, params = [], []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            parts.append(sql)
+            params.extend(expression_params)
+        left, right = ', '.join(parts[:self.size]), ', '.join(parts[self.size:])
+        return f'({left}) {self.operator} ({right})', params
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset-пагинация по составному ключу (поля сортировки + id).
+
+    Курсор хранит значения всех полей сортировки последней строки страницы,
+    поэтому следующая страница выбирается условием WHERE по индексу, без
+    OFFSET: стоимость запроса O(page_size) на любой глубине, а вставка новых
+    строк между запросами не сдвигает уже выданные страницы.
+    """
+    ordering = ('-created_at',)
+    page_size_query_param = 'page_size'
+    max_page_size = settings.PAGINATION_MAX_PAGE_SIZE
+    tiebreaker = 'id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Асинхронный вариант paginate_queryset для async-представлений"""
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([obj async for obj in queryset])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """Запрос страницы (без выполнения) или None, если пагинация отключена"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request, queryset.model)
+        self.reverse = self.cursor is not None and self.cursor.reverse
+
+        keyset = self.get_keyset_filter(self.cursor) if self.cursor is not None else Q()
+        ordering = _reverse_ordering(self.ordering) if self.reverse else self.ordering
+
+        # Берем на одну строку больше, чтобы узнать, есть ли следующая страница.
+        # Представление может само построить запрос страницы по условию
+        # курсора и сортировке (TaskViewSet.get_page_queryset)
+        limit = self.page_size + 1
+        if hasattr(view, 'get_page_queryset'):
+            return view.get_page_queryset(keyset, ordering, limit)
+        return queryset.filter(keyset).order_by(*ordering)[:limit]
+
+    def set_page(self, results):
+        """Страница и ссылки на соседние страницы по строкам запроса страницы"""
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = bool(self.page)
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None and bool(self.page)
+
+        if self.page:
+            self.previous_position = self._get_position_from_instance(self.page[0], self.ordering)
+            self.next_position = self._get_position_from_instance(self.page[-1], self.ordering)
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Сортировка из OrderingFilter, дополненная уникальным id.
+
+        id добавляется в том же направлении, что и последнее поле, чтобы
+        ключ был уникальным и обходился одним индексом в любую сторону.
+        """
+        ordering = super().get_ordering(request, queryset, view)
+        if not any(field.lstrip('-') in (self.tiebreaker, 'pk') for field in ordering):
+            direction = '-' if ordering[-1].startswith('-') else ''
+            ordering += (direction + self.tiebreaker,)
+        return ordering
+
+    def get_keyset_filter(self, cursor):
+        """
+        Условие "строго после позиции курсора" для составного ключа.
+
+        Если все поля сортируются в одну сторону и ключ заканчивается id,
+        это сравнение строк (a, id) >= (x, y + 1), равносильное
+        (a, id) > (x, y) для целого id: PostgreSQL использует его как
+        условие индекса, а число строк оценивает по первой колонке (a >= x).
+        Строгое a > x для последнего значения status дало бы оценку в ноль
+        строк и выбор чужого индекса. Для разных направлений -
+        (a > x) OR (a = x AND b > y) OR ... с дополнительным условием на
+        первое поле (a >= x), чтобы планировщик выполнил range scan по
+        ведущей колонке индекса.
+        """
+        descending = {field.startswith('-') != cursor.reverse for field in self.ordering}
+        if len(descending) == 1 and self.ordering[-1].lstrip('-') in (self.tiebreaker, 'pk'):
+            *position, last_id = cursor.position
+            if descending.pop():
+                operator, last_id = '<=', last_id - 1
+            else:
+                operator, last_id = '>=', last_id + 1
+            key = [F(field.lstrip('-')) for field in self.ordering]
+            return RowCompare(key, operator, (*position, last_id))
+
+        conditions = []
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != cursor.reverse else 'gt'
+            equal = {
+                previous.lstrip('-'): value
+                for previous, value in zip(self.ordering[:index], cursor.position)
+            }
+            conditions.append(Q(**equal, **{f'{name}__{lookup}': cursor.position[index]}))
+
+        first = self.ordering[0]
+        lookup = 'lte' if first.startswith('-') != cursor.reverse else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{lookup}': cursor.position[0]}) & reduce(or_, conditions)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            tokens = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            reverse = bool(tokens.get('r', 0))
+            values = tokens['p']
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            position = [
+                self._position_value_from_json(model, field.lstrip('-'), value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, KeyError, AttributeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        tokens = {'p': cursor.position}
+        if cursor.reverse:
+            tokens['r'] = 1
+        encoded = urlsafe_b64encode(json.dumps(tokens).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(reverse=True, position=self.previous_position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for field in ordering:
+            name = field.lstrip('-')
+            try:
+                position.append(instance._meta.get_field(name).value_to_string(instance))
+            except FieldDoesNotExist:
+                # Аннотация (например, search_rank) - JSON-совместимое значение
+                position.append(getattr(instance, name))
+        return position
+
+    def _position_value_from_json(self, model, name, value):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            if not isinstance(value, (int, float, str)):
+                raise ValueError
+            return value
+        return field.to_python(value)
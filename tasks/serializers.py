@@ -1,7 +1,146 @@
+from operator import attrgetter
+
 from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.settings import ISO_8601, api_settings
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import models
 from django.utils import timezone
+from .authentication import load_deferred
 from .models import Task, Comment, TaskStatus
+from .renderers import datetime_formatter
+
+# to_representation, которые не меняют значение, загруженное из БД
+PASSTHROUGH_REPRESENTATIONS = {
+    serializers.CharField.to_representation,
+    serializers.IntegerField.to_representation,
+    serializers.ChoiceField.to_representation,
+}
+
+
+def compile_representation(serializer, nested_cache):
+    """
+    Собрать функцию instance -> dict, повторяющую to_representation
+    сериализатора без обхода полей DRF для каждой строки.
+
+    Геттеры полей строятся один раз: простые поля читаются атрибутом,
+    дата и время форматируются как в DateTimeField с ISO 8601, вложенные
+    сериализаторы моделей собираются рекурсивно и кэшируются в nested_cache
+    по pk (один пользователь сериализуется один раз на ответ). Остальные
+    поля обрабатываются штатным to_representation.
+    """
+    convert_datetime = datetime_formatter()
+    getters = []
+    for field in serializer._readable_fields:
+        if len(field.source_attrs) != 1:
+            getters.append((field.field_name, _drf_getter(field)))
+        elif isinstance(field, serializers.ModelSerializer):
+            getters.append((field.field_name, _cached_nested_getter(
+                attrgetter(field.source),
+                compile_representation(field, nested_cache),
+                nested_cache.setdefault(field.Meta.model, {})
+            )))
+        elif isinstance(field, serializers.DateTimeField) and _is_iso_datetime(field):
+            getters.append((field.field_name, _datetime_getter(attrgetter(field.source), convert_datetime)))
+        elif type(field).to_representation in PASSTHROUGH_REPRESENTATIONS:
+            getters.append((field.field_name, attrgetter(field.source)))
+        else:
+            getters.append((field.field_name, _drf_getter(field)))
+
+    def represent(instance):
+        ret = {}
+        for name, get in getters:
+            try:
+                ret[name] = get(instance)
+            except SkipField:
+                pass
+        return ret
+    return represent
+
+
+def _is_iso_datetime(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    return (
+        isinstance(output_format, str) and output_format.lower() == ISO_8601
+        and not hasattr(field, 'timezone') and settings.USE_TZ
+    )
+
+
+def _datetime_getter(get, convert):
+    return lambda instance: convert(get(instance) or None)
+
+
+def _cached_nested_getter(get, represent, cache):
+    def getter(instance):
+        obj = get(instance)
+        if obj is None:
+            return None
+        try:
+            return cache[obj.pk]
+        except KeyError:
+            cache[obj.pk] = data = represent(obj)
+            return data
+    return getter
+
+
+def _drf_getter(field):
+    def getter(instance):
+        attribute = field.get_attribute(instance)
+        check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        return None if check_for_none is None else field.to_representation(attribute)
+    return getter
+
+
+class FastListSerializer(serializers.ListSerializer):
+    """
+    Быстрый read-only режим списков: результат совпадает с обычным
+    ListSerializer, но строки собираются заранее скомпилированными
+    геттерами (см. compile_representation).
+    """
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        represent = compile_representation(self.child, {})
+        return [represent(item) for item in iterable]
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField, который сначала ищет объект среди загруженных
+    заранее (context['preloaded'][модель]): при массовых операциях все
+    связанные объекты читаются одним запросом, а не по одному на элемент.
+    """
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(self.get_queryset().model, {})
+        try:
+            return preloaded[int(data)]
+        except (KeyError, TypeError, ValueError):
+            return super().to_internal_value(data)
+
+
+class SparseFieldsMixin:
+    """
+    Выборочные поля ответа (tasks/fieldsets.py): fieldset задает поля и
+    раскрываемые вложенные объекты. Нераскрытая связь выводится своим id
+    (из колонки внешнего ключа, без загрузки объекта).
+    """
+    def __init__(self, *args, fieldset=None, **kwargs):
+        self.fieldset = fieldset
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.fieldset is None:
+            return fields
+        selected = {}
+        for name, field in fields.items():
+            if field.write_only or not self.fieldset.selects(name):
+                continue
+            if isinstance(field, serializers.ModelSerializer) and name not in self.fieldset.expand:
+                field = serializers.PrimaryKeyRelatedField(read_only=True, source=field.source)
+            selected[name] = field
+        return selected
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -10,9 +149,10 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name')
         read_only_fields = fields
+        list_serializer_class = FastListSerializer
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор комментария"""
     author = UserSerializer(read_only=True)
 
@@ -23,22 +163,24 @@ class CommentSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """Автоматически устанавливаем автора комментария"""
-        validated_data['author'] = self.context['request'].user
+        validated_data['author'] = load_deferred(self.context['request'].user)
         return super().create(validated_data)
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор задачи"""
     creator = UserSerializer(read_only=True)
     assignee = UserSerializer(read_only=True)
-    assignee_id = serializers.PrimaryKeyRelatedField(
+    assignee_id = PreloadedPrimaryKeyRelatedField(
         queryset=User.objects.all(),
         source='assignee',
         write_only=True,
         required=False,
         allow_null=True
     )
-    comments = CommentSerializer(many=True, read_only=True)
+    # Последние TASK_DETAIL_COMMENTS комментариев, остальные - в
+    # /tasks/{id}/comments/; общее число - comments_count
+    comments = CommentSerializer(many=True, read_only=True, source='latest_comments')
     comments_count = serializers.IntegerField(read_only=True)
 
     class Meta:
@@ -52,8 +194,11 @@ class TaskSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """Автоматически устанавливаем создателя задачи"""
-        validated_data['creator'] = self.context['request'].user
-        return super().create(validated_data)
+        validated_data['creator'] = load_deferred(self.context['request'].user)
+        task = super().create(validated_data)
+        # У новой задачи комментариев нет: ответ обходится без запроса
+        task.prefetched_latest_comments = []
+        return task
 
     def validate_deadline(self, value):
         """Проверка, что дедлайн не в прошлом"""
@@ -84,7 +229,7 @@ class TaskSerializer(serializers.ModelSerializer):
         return value
 
 
-class TaskListSerializer(serializers.ModelSerializer):
+class TaskListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Упрощенный сериализатор для списка задач"""
     creator = UserSerializer(read_only=True)
     assignee = UserSerializer(read_only=True)
@@ -96,3 +241,14 @@ class TaskListSerializer(serializers.ModelSerializer):
             'id', 'title', 'status', 'creator', 'assignee',
             'deadline', 'created_at', 'comments_count'
         )
+        list_serializer_class = FastListSerializer
+
+
+class TaskSyncSerializer(TaskListSerializer):
+    """Задача для дельта-синхронизации: все поля без вложенных комментариев"""
+
+    class Meta(TaskListSerializer.Meta):
+        fields = (
+            'id', 'title', 'description', 'status', 'creator', 'assignee',
+            'deadline', 'created_at', 'updated_at', 'comments_count'
+        )
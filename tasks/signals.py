@@ -0,0 +1,103 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import cache, counters, events, jobs, metrics
+from .authentication import versions
+from .models import EventAction, Task, Comment
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, **kwargs):
+    """Задачу видят создатель и исполнитель, в том числе прежний"""
+    previous_assignee_id = instance.loaded_values.get('assignee_id')
+    cache.invalidate_users(instance.creator_id, instance.assignee_id, previous_assignee_id)
+    counters.apply(counters.task_changes(instance, created=created))
+    jobs.schedule([instance], created=created)
+    events.publish(events.task_events(
+        instance,
+        EventAction.CREATED if created else EventAction.UPDATED,
+        previous_users=[previous_assignee_id],
+    ))
+    instance.loaded_values = dict(
+        instance.loaded_values,
+        **{field: getattr(instance, field) for field in counters.FIELDS}
+    )
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    cache.invalidate_users(instance.creator_id, instance.assignee_id)
+    counters.apply(counters.task_changes(instance, deleted=True))
+    events.publish(events.task_events(instance, EventAction.DELETED))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    """Комментарий меняет и список комментариев, и comments_count задачи"""
+    previous_task_id = instance.loaded_values.get('task_id')
+    Task.objects.comments_changed(instance.task_id, instance.updated_at)
+    task_ids = {instance.task_id, previous_task_id} - {None}
+    users = events.task_users(task_ids)
+    cache.invalidate_users(*set().union(*users.values()))
+    events.publish(events.comment_events(
+        instance,
+        EventAction.CREATED if created else EventAction.UPDATED,
+        users[instance.task_id],
+        previous_users=users.get(previous_task_id, ()),
+    ))
+    instance.loaded_values = dict(instance.loaded_values, task_id=instance.task_id)
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, update_fields=None, **kwargs):
+    """Запомнить, изменились ли поля пользователя, которые видны в ответах"""
+    fields = [
+        field for field in cache.USER_FIELDS if update_fields is None or field in update_fields
+    ]
+    instance.output_changed = bool(instance.pk and fields) and User.objects.filter(
+        pk=instance.pk
+    ).exclude(**{field: getattr(instance, field) for field in fields}).exists()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    """
+    Пользователь выводится в задачах и комментариях: сбросить кэш его
+    аудитории и отправить ей user.updated (лента и дельта-синхронизация)
+    """
+    if getattr(instance, 'output_changed', False):
+        audience = cache.user_audience(instance.pk)
+        cache.invalidate_user(instance.pk, audience)
+        events.publish(events.user_events(instance, audience))
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    """Удаление идет в транзакции: поколения увеличатся еще раз после коммита"""
+    cache.invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """
+    Смена пароля или флагов отзывает токены сразу во всех процессах. После
+    коммита версия сбрасывается еще раз: параллельный запрос мог прочитать
+    и закэшировать старую версию до коммита.
+    """
+    user_id = instance.pk
+    versions.delete(user_id)
+    transaction.on_commit(lambda: versions.delete(user_id))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    counters.user_deleted(instance.pk)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    metrics.install(connection)
@@ -0,0 +1,232 @@
+"""
+Дельта-синхронизация для офлайн-клиентов: задачи и комментарии, созданные,
+измененные или удаленные после курсора.
+
+Курсор хранит позицию (updated_at, id) отдельно для задач и комментариев и
+позицию (created_at, id) в событиях удаления TaskEvent, которые служат
+надгробиями. Каждый поток читается от своей позиции range scan'ом по
+индексу, поэтому стоимость синхронизации пропорциональна числу изменений, а
+не числу задач пользователя.
+
+Смена исполнителя: новый исполнитель получает задачу вместе со всеми ее
+комментариями, прежний - надгробия задачи и ее комментариев. Изменения
+имени и email участников читаются из тех же событий, что и удаления.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Comment, EventAction, EventKind, Task, TaskEvent
+
+STREAMS = ('tasks', 'comments', 'deleted')
+
+
+class CursorExpired(Exception):
+    """Надгробия после позиции курсора уже удалены (prune_events)"""
+
+
+def decode_cursor(value):
+    """Позиции потоков из курсора; ValueError, если курсор неверный"""
+    try:
+        tokens = json.loads(urlsafe_b64decode(value.encode('ascii')))
+        positions = {}
+        for stream in STREAMS:
+            key = tokens[stream]
+            if key is None:
+                positions[stream] = None
+                continue
+            timestamp, pk = key
+            timestamp = datetime.fromisoformat(timestamp)
+            if timestamp.tzinfo is None or not isinstance(pk, int):
+                raise ValueError
+            positions[stream] = (timestamp, pk)
+    except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+        raise ValueError('Неверный курсор синхронизации')
+
+    deleted = positions['deleted']
+    if deleted is None:
+        raise ValueError('Неверный курсор синхронизации')
+    if deleted[0] < timezone.now() - timedelta(days=settings.EVENTS_RETENTION_DAYS):
+        raise CursorExpired()
+    return positions
+
+
+def encode_cursor(positions):
+    tokens = {
+        stream: None if key is None else [key[0].isoformat(), key[1]]
+        for stream, key in positions.items()
+    }
+    return urlsafe_b64encode(json.dumps(tokens).encode('ascii')).decode('ascii')
+
+
+def initial_positions():
+    """
+    Первая синхронизация: все видимые задачи и комментарии, удаления -
+    начиная с этого момента.
+    """
+    return {'tasks': None, 'comments': None, 'deleted': (overlap_start(), 0)}
+
+
+def overlap_start():
+    # Транзакция могла записать более раннее время и закоммититься позже:
+    # последние секунды читаются повторно при следующей синхронизации
+    return timezone.now() - timedelta(seconds=settings.EVENTS_RESUME_OVERLAP)
+
+
+def after(field, key):
+    """
+    (field, id) строго больше key. Условие field >= x дает range scan по
+    ведущей колонке индекса, как в KeysetPagination.
+    """
+    value, pk = key
+    return Q(**{f'{field}__gte': value}) & (
+        Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk})
+    )
+
+
+def changed_tasks(user, key, limit):
+    """
+    Задачи пользователя, измененные после key.
+
+    Как в TaskQuerySet.visible_ids, две ветки UNION ALL (создатель и
+    исполнитель), каждая - range scan по (creator|assignee, updated_at, id)
+    не дальше limit строк.
+    """
+    branches = []
+    for field in ('creator', 'assignee'):
+        branch = Task.objects.order_by().filter(**{field: user})
+        if key is not None:
+            branch = branch.filter(after('updated_at', key))
+        branches.append(branch.order_by('updated_at', 'pk').values('pk')[:limit])
+    ids = branches[0].union(branches[1], all=True)
+    return Task.objects.filter(pk__in=ids).select_related('creator', 'assignee') \
+                       .order_by('updated_at', 'pk')[:limit]
+
+
+def changed_comments(user, key, limit):
+    """
+    Комментарии к видимым задачам, измененные после key.
+
+    Первая синхронизация читает комментарии всех видимых задач. Дальше -
+    только задачи пользователя, комментарии которых менялись после key:
+    ветки по (creator|assignee, comments_updated_at), а в каждой задаче -
+    range scan по (task, updated_at, id). Изменения комментариев других
+    пользователей не читаются.
+    """
+    if key is None:
+        comments = Comment.objects.visible_to(user)
+    else:
+        branches = [
+            Task.objects.order_by().filter(**{field: user, 'comments_updated_at__gte': key[0]}).values('pk')
+            for field in ('creator', 'assignee')
+        ]
+        comments = Comment.objects.filter(task__in=branches[0].union(branches[1], all=True)) \
+                                  .filter(after('updated_at', key))
+    return comments.select_related('author').order_by('updated_at', 'pk')[:limit]
+
+
+def assigned_comments(user, tasks, key):
+    """
+    Все комментарии задач, исполнителем которых пользователь стал после
+    key: эти комментарии изменились до курсора и в поток comments не
+    попадают.
+    """
+    if key is None:
+        return []
+    ids = [
+        task.pk for task in tasks
+        if task.assignee_id == user.pk != task.creator_id
+        and task.assigned_at is not None and task.assigned_at >= key[0]
+    ]
+    if not ids:
+        return []
+    return list(Comment.objects.filter(task__in=ids).select_related('author').order_by('created_at', 'pk'))
+
+
+def deletions(user, key, limit):
+    """
+    Удаления задач и комментариев, переносы задач в архив и изменения
+    пользователей (user.updated) для пользователя после key
+    """
+    kinds = Q(action__in=[EventAction.DELETED, EventAction.ARCHIVED]) | Q(kind=EventKind.USER)
+    return TaskEvent.objects.filter(kinds, users__contains=[user.pk]) \
+                            .filter(after('created_at', key)) \
+                            .order_by('created_at', 'pk')[:limit]
+
+
+def collect_changes(user, positions, limit):
+    """
+    Не более limit изменений каждого потока после позиций курсора.
+
+    Возвращает строки потоков, новые позиции и признак, что изменений
+    больше, чем поместилось (клиенту нужно повторить запрос).
+    """
+    floor = (overlap_start(), 0)
+    results, has_more = {}, False
+    for stream, fetch, field in (
+        ('tasks', changed_tasks, 'updated_at'),
+        ('comments', changed_comments, 'updated_at'),
+        ('deleted', deletions, 'created_at'),
+    ):
+        rows = list(fetch(user, positions[stream], limit + 1))
+        more = len(rows) > limit
+        rows = rows[:limit]
+        key = positions[stream]
+        if rows:
+            key = (getattr(rows[-1], field), rows[-1].pk)
+        if not more:
+            # Поток дочитан: следующая синхронизация повторит последние секунды
+            key = floor if key is None else min(key, floor)
+        results[stream] = rows
+        if stream == 'tasks':
+            shared = assigned_comments(user, rows, positions['tasks'])
+        positions = dict(positions, **{stream: key})
+        has_more = has_more or more
+    # Комментарии новых задач исполнителя - сверх limit, вместе с задачами
+    seen = {comment.pk for comment in results['comments']}
+    results['comments'] += [comment for comment in shared if comment.pk not in seen]
+    return results, positions, has_more
+
+
+def split_deletions(user, events):
+    """
+    Надгробия задач и комментариев в формате ответа. Задача, которую
+    пользователь перестал видеть (сменился исполнитель), существует, и
+    для ее комментариев добавляются надгробия с тем же deleted_at.
+    Перенесенная в архив задача отмечена archived: true - ее комментарии
+    ушли в архив вместе с ней.
+    """
+    deleted = {'tasks': [], 'comments': []}
+    lost = {}
+    for event in events:
+        item = dict(event.data, deleted_at=event.created_at)
+        if event.action == EventAction.ARCHIVED:
+            item['archived'] = True
+        if event.kind == EventKind.TASK:
+            deleted['tasks'].append(item)
+            lost[event.object_id] = max(event.created_at, lost.get(event.object_id, event.created_at))
+        elif event.kind == EventKind.COMMENT:
+            deleted['comments'].append(item)
+    if lost:
+        # Задачи, которые снова видны пользователю, остаются с комментариями
+        hidden = Task.objects.filter(pk__in=lost).exclude(Q(creator=user) | Q(assignee=user))
+        comments = Comment.objects.filter(task__in=hidden.values('pk')).order_by('task', 'created_at', 'pk')
+        deleted['comments'] += [
+            {'id': pk, 'task_id': task_id, 'deleted_at': lost[task_id]}
+            for pk, task_id in comments.values_list('pk', 'task_id')
+        ]
+    return deleted
+
+
+def changed_users(events):
+    """
+    Новые имя и email пользователей, которые выводятся в задачах и
+    комментариях: updated_at задач при этом не меняется, и клиент
+    обновляет вложенных пользователей сам. Для каждого - последнее изменение.
+    """
+    users = {event.object_id: event.data for event in events if event.kind == EventKind.USER}
+    return list(users.values())
@@ -1,10 +1,37 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import msgpack
+import os
+import threading
+from itertools import combinations
+from unittest import skipUnless
+from urllib.parse import urlencode
+from django.db import connection
+from django.db.models import Count, F, Max
+from io import StringIO
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
-from rest_framework.test import APITestCase
+from unittest.mock import patch
+from rest_framework.test import APITestCase, APITransactionTestCase
 from rest_framework import status
-from .models import Task, Comment, TaskStatus
+from .models import Task, Comment, ArchivedTask, TaskStatus, TaskEvent, TaskCounter, Job, JobBatch, JobKind
+from .filters import TaskFilter
+from .pagination import KeysetPagination
+from .serializers import TaskListSerializer
+from rest_framework.renderers import JSONRenderer
+from .renderers import ORJSONRenderer
+from rest_framework.serializers import ListSerializer
+from asgiref.sync import sync_to_async
+from . import cache, checks, counters, events, jobs, metrics, sync
+from .authentication import versions, StatelessTokenObtainPairSerializer
+from .views import TaskViewSet
+from rest_framework_simplejwt.authentication import JWTAuthentication
 
 
 class TaskModelTest(TestCase):
@@ -61,7 +88,7 @@ class TaskAPITest(APITestCase):
         self.client.force_authenticate(user=self.user1)
         response = self.client.get('/api/v1/tasks/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_list_tasks_unauthenticated(self):
         """Тест получения списка задач неавторизованным пользователем"""
@@ -97,7 +124,7 @@ class TaskAPITest(APITestCase):
         self.client.force_authenticate(user=self.user2)
         response = self.client.get('/api/v1/tasks/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0)
+        self.assertEqual(len(response.data['results']), 0)
 
     def test_assignee_can_view_task(self):
         """Тест: assignee может просматривать задачу"""
@@ -313,3 +340,1875 @@ class CommentAPITest(APITestCase):
         response = self.client.delete(f'/api/v1/comments/{comment.id}/')
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Comment.objects.count(), 0)
+
+
+class TaskPaginationTest(APITestCase):
+    """Тесты keyset-пагинации списка задач"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass123')
+        deadline = timezone.now() + timedelta(days=1)
+        self.tasks = [
+            Task.objects.create(
+                title=f'Задача {i}',
+                description='Описание',
+                creator=self.user,
+                status=TaskStatus.NEW if i % 2 else TaskStatus.REVIEW,
+                deadline=deadline + timedelta(hours=i)
+            )
+            for i in range(7)
+        ]
+        # Одинаковое время создания: порядок держится только на id
+        Task.objects.update(created_at=timezone.now())
+        self.client.force_authenticate(user=self.user)
+
+    def collect(self, url):
+        """Пройти все страницы по ссылкам next и вернуть id в порядке выдачи"""
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 3)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_pages_cover_all_tasks_without_duplicates(self):
+        """Тест: обход по курсорам возвращает каждую задачу ровно один раз"""
+        ids = self.collect('/api/v1/tasks/?page_size=3')
+        self.assertEqual(ids, sorted((task.id for task in self.tasks), reverse=True))
+
+    def test_ordering_by_status(self):
+        """Тест: пагинация работает с сортировкой по неуникальному полю"""
+        ids = self.collect('/api/v1/tasks/?page_size=3&ordering=status')
+        expected = Task.objects.order_by('status', 'id').values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
+
+    def test_previous_link_returns_previous_page(self):
+        """Тест: ссылка previous возвращает предыдущую страницу"""
+        first = self.client.get('/api/v1/tasks/?page_size=3&ordering=deadline')
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertIsNone(first.data['previous'])
+
+    def test_cursor_stable_after_insert(self):
+        """Тест: новая задача не сдвигает следующую страницу"""
+        first = self.client.get('/api/v1/tasks/?page_size=3')
+        Task.objects.create(
+            title='Новая',
+            description='Описание',
+            creator=self.user,
+            deadline=timezone.now() + timedelta(days=1)
+        )
+        second = self.client.get(first.data['next'])
+        expected = sorted((task.id for task in self.tasks), reverse=True)[3:6]
+        self.assertEqual([item['id'] for item in second.data['results']], expected)
+
+    def test_invalid_cursor(self):
+        """Тест: некорректный курсор возвращает 404"""
+        response = self.client.get('/api/v1/tasks/?cursor=broken')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_size_limited_by_max_page_size(self):
+        """Тест: размер страницы ограничен PAGINATION_MAX_PAGE_SIZE"""
+        with patch.object(KeysetPagination, 'max_page_size', 2):
+            response = self.client.get('/api/v1/tasks/?page_size=100')
+        self.assertEqual(len(response.data['results']), 2)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN-тест рассчитан на PostgreSQL')
+class VisibilityQueryPlanTest(TestCase):
+    """Тесты плана запросов видимости на большом наборе данных"""
+
+    @classmethod
+    def setUpTestData(cls):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO auth_user (password, is_superuser, username, first_name,
+                                       last_name, email, is_staff, is_active, date_joined)
+                SELECT '', false, 'plan' || n, '', '', '', false, true, now()
+                FROM generate_series(1, 2000) AS n
+            """)
+            cursor.execute("SELECT min(id), max(id) FROM auth_user WHERE username LIKE 'plan%%'")
+            first, last = cursor.fetchone()
+            cursor.execute("""
+                INSERT INTO tasks_task (title, description, status, creator_id, assignee_id,
+                                        deadline, created_at, updated_at, comments_count,
+                                        comments_updated_at)
+                SELECT 'Задача ' || n, 'Описание', 'new',
+                       %(first)s + n * 7919 %% %(users)s, %(first)s + n::bigint * 104729 %% %(users)s,
+                       now() + interval '1 day', now() - n * interval '1 second', now(), 1,
+                       now() - n * interval '1 second'
+                FROM generate_series(1, 200000) AS n
+            """, {'first': first, 'users': last - first + 1})
+            cursor.execute("""
+                INSERT INTO tasks_comment (task_id, author_id, text, created_at, updated_at)
+                SELECT id, creator_id, 'Комментарий', created_at, created_at FROM tasks_task
+            """)
+            cursor.execute('ANALYZE')
+        cls.user = User.objects.get(id=first)
+
+    def test_task_visibility_avoids_seq_scan(self):
+        """Тест: видимые задачи читаются по индексам, без seq scan"""
+        plan = Task.objects.visible_to(self.user).order_by('-created_at', '-id')[:51].explain()
+        self.assertNotIn('Seq Scan', plan)
+
+    def test_comment_visibility_avoids_seq_scan(self):
+        """Тест: видимые комментарии читаются по индексам, без seq scan"""
+        plan = Comment.objects.visible_to(self.user).order_by('created_at', 'id')[:51].explain()
+        self.assertNotIn('Seq Scan', plan)
+
+    def test_user_audience_avoids_seq_scan(self):
+        """Тест: участники задач пользователя (invalidate_user) читаются по индексам"""
+        plan = cache.tasks_showing_user(Task, Comment, self.user.pk).values_list('creator_id', 'assignee_id').explain()
+        self.assertNotIn('Seq Scan', plan)
+
+    def test_comment_sync_reads_only_user_tasks(self):
+        """Тест: поток комментариев синхронизации - по задачам пользователя, без seq scan"""
+        plan = sync.changed_comments(self.user, (timezone.now() - timedelta(hours=1), 0), 51).explain()
+        self.assertNotIn('Seq Scan', plan)
+        self.assertIn('comments_updated_at', plan)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN-тест рассчитан на PostgreSQL')
+class TaskFilterPlanTest(APITransactionTestCase):
+    """
+    План запроса страницы списка для каждой комбинации фильтров TaskFilter
+    и каждой сортировки: без seq scan по таблицам задач и без сортировки
+    больше sort_limit строк (индексы Task.Meta.indexes)
+    """
+    sort_limit = 2000
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO auth_user (password, is_superuser, username, first_name,
+                                       last_name, email, is_staff, is_active, date_joined)
+                SELECT '', false, 'plan' || n, '', '', '', false, true, now()
+                FROM generate_series(1, 500) AS n
+            """)
+            cursor.execute("SELECT min(id), max(id) FROM auth_user WHERE username LIKE 'plan%%'")
+            first, last = cursor.fetchone()
+            # Первый пользователь создал каждую пятую задачу и ничего не
+            # исполняет, второй исполняет каждую седьмую и ничего не создал;
+            # у остальных по сотне задач
+            cursor.execute("""
+                INSERT INTO tasks_task (title, description, status, creator_id, assignee_id,
+                                        deadline, created_at, updated_at, comments_count)
+                SELECT 'Задача ' || n, 'Описание',
+                       (ARRAY['new', 'in_progress', 'review', 'done'])[n %% 4 + 1],
+                       CASE WHEN n %% 5 = 0 THEN %(first)s ELSE %(first)s + 2 + n * 7919 %% %(others)s END,
+                       CASE WHEN n %% 7 = 0 THEN %(first)s + 1
+                            ELSE %(first)s + 2 + n::bigint * 104729 %% %(others)s END,
+                       now() + (n %% 365 - 180) * interval '1 day', now() - n * interval '1 minute',
+                       now(), 0
+                FROM generate_series(1, 60000) AS n
+            """, {'first': first, 'others': last - first - 1})
+            # Статистика по всем строкам, а не по случайной выборке: планы
+            # не меняются от запуска к запуску. VACUUM заполняет карту
+            # видимости, как autovacuum на рабочей базе (index-only scan)
+            cursor.execute('SET default_statistics_target = 1000')
+            cursor.execute('VACUUM ANALYZE tasks_task')
+            cursor.execute('RESET default_statistics_target')
+        self.users = User.objects.filter(id__in=[first, first + 1, last]).order_by('id')
+        self.filters = {
+            'status': TaskStatus.REVIEW,
+            'assignee': first + 1,
+            'creator': first,
+            'deadline_from': timezone.now().isoformat(),
+            'deadline_to': (timezone.now() + timedelta(days=7)).isoformat(),
+        }
+
+    def check_plan(self, node, url):
+        if node['Node Type'] == 'Seq Scan':
+            self.assertFalse(node['Relation Name'].startswith('tasks_'), f'Seq Scan: {url}')
+        if node['Node Type'] in ('Sort', 'Incremental Sort'):
+            sorted_rows = node['Plans'][0]['Actual Rows'] * node['Plans'][0]['Actual Loops']
+            self.assertLessEqual(sorted_rows, self.sort_limit, f'Sort: {url}')
+        for child in node.get('Plans', []):
+            self.check_plan(child, url)
+
+    def explain_page(self, url):
+        """Выполнить запрос списка и проверить план запроса страницы"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+        pages = [query['sql'] for query in queries if ' UNION ALL ' in query['sql'] and ' LIMIT ' in query['sql']]
+        self.assertEqual(len(pages), 1, url)
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (ANALYZE, FORMAT JSON) ' + pages[0])
+            plan = cursor.fetchone()[0]
+        self.check_plan((json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan'], url)
+        return response
+
+    def test_every_filter_and_ordering_uses_indexes(self):
+        """Тест: каждая комбинация фильтров и сортировок обходится без seq scan и больших сортировок"""
+        orderings = [
+            prefix + field for field in TaskViewSet.ordering_fields if field != 'search_rank'
+            for prefix in ('', '-')
+        ]
+        filters = [
+            names for count in range(len(TaskFilter.Meta.fields) + 1)
+            for names in combinations(TaskFilter.Meta.fields, count)
+        ]
+        # Создатель и исполнитель большой доли задач и пользователь с сотней задач
+        for user in self.users:
+            self.client.force_authenticate(user=user)
+            for names in filters:
+                for ordering in orderings:
+                    params = {name: self.filters[name] for name in names}
+                    response = self.explain_page(f'/api/v1/tasks/?{urlencode({**params, "ordering": ordering})}')
+                    # Вторая страница добавляет условие курсора
+                    if response.data['next']:
+                        self.explain_page(response.data['next'])
+
+
+class TaskQueryShapingTest(APITestCase):
+    """Тесты количества запросов для списка и детали задачи"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass123')
+        self.other = User.objects.create_user(username='other', password='pass123')
+        self.tasks = [
+            Task.objects.create(
+                title=f'Задача {i}',
+                description='Описание',
+                creator=self.user,
+                assignee=self.other,
+                deadline=timezone.now() + timedelta(days=1)
+            )
+            for i in range(3)
+        ]
+        Comment.objects.bulk_create(
+            Comment(task=task, author=author, text='Комментарий')
+            for task in self.tasks
+            for author in (self.user, self.other) * 5
+        )
+        Task.objects.update(comments_count=10)
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_does_not_load_comments(self):
+        """Тест: список задач - одна выборка, комментарии не загружаются"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/tasks/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['comments_count'] for item in response.data['results']],
+            [10, 10, 10]
+        )
+
+    def test_retrieve_loads_comments_with_authors(self):
+        """Тест: деталь задачи загружает комментарии с авторами без N+1"""
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/v1/tasks/{self.tasks[0].id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['comments_count'], 10)
+        self.assertEqual(len(response.data['comments']), 10)
+
+
+class SparseFieldsetTest(APITestCase):
+    """Тесты выборочных полей ?fields= и ?expand="""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.user = User.objects.create_user(username='user', password='pass123')
+        self.other = User.objects.create_user(username='other', password='pass123')
+        self.tasks = [
+            Task.objects.create(
+                title=f'Задача {i}', description='Описание', creator=self.user,
+                assignee=self.other, deadline=timezone.now() + timedelta(days=i + 1)
+            )
+            for i in range(3)
+        ]
+        Comment.objects.create(task=self.tasks[0], author=self.other, text='Комментарий')
+        self.client.force_authenticate(user=self.user)
+
+    def get_page_sql(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, queries[-1]['sql']
+
+    def test_list_loads_only_requested_columns(self):
+        """Тест: список отдает и читает только запрошенные поля, без пользователей"""
+        response, sql = self.get_page_sql('/api/v1/tasks/?fields=id,title,status,deadline&page_size=2')
+        self.assertEqual(
+            [set(item) for item in response.data['results']], [{'id', 'title', 'status', 'deadline'}] * 2
+        )
+        self.assertNotIn('auth_user', sql)
+        self.assertNotIn('"description"', sql)
+        # Курсор строится по полю сортировки, которого нет в ответе
+        response = self.client.get(response.data['next'])
+        self.assertEqual([item['id'] for item in response.data['results']], [self.tasks[0].id])
+
+    def test_relations_as_ids_unless_expanded(self):
+        """Тест: связь без expand - id, с expand - вложенный объект"""
+        response, sql = self.get_page_sql('/api/v1/tasks/?fields=id,creator&expand=assignee')
+        item = response.data['results'][0]
+        self.assertEqual(item['creator'], self.user.id)
+        self.assertEqual(item['assignee']['username'], 'other')
+        self.assertEqual(set(item), {'id', 'creator', 'assignee'})
+        self.assertNotIn('"password"', sql)
+
+    def test_detail_skips_comments(self):
+        """Тест: деталь без comments не читает комментарии"""
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/v1/tasks/{self.tasks[0].id}/?fields=id,title')
+        self.assertEqual(response.data, {'id': self.tasks[0].id, 'title': 'Задача 0'})
+        response = self.client.get(f'/api/v1/tasks/{self.tasks[0].id}/?fields=id&expand=comments')
+        self.assertEqual(response.data['comments'][0]['text'], 'Комментарий')
+
+    def test_comments(self):
+        """Тест: выборочные поля комментариев"""
+        response = self.client.get('/api/v1/comments/?fields=id,text,author')
+        self.assertEqual(response.data['results'][0], {
+            'id': Comment.objects.get().id, 'text': 'Комментарий', 'author': self.other.id
+        })
+
+    def test_unknown_fields(self):
+        """Тест: неизвестное поле или нераскрываемая связь - 400"""
+        response = self.client.get('/api/v1/tasks/?fields=id,secret&expand=title')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {'fields', 'expand'})
+        response = self.client.get('/api/v1/tasks/?fields=assignee_id')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(TASK_DETAIL_COMMENTS=3)
+class TaskCommentsTest(APITestCase):
+    """Тесты последних комментариев в детали задачи и /tasks/{id}/comments/"""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.user = User.objects.create_user(username='user', password='pass123')
+        self.other = User.objects.create_user(username='other', password='pass123')
+        self.task = Task.objects.create(
+            title='Задача',
+            description='Описание',
+            creator=self.user,
+            deadline=timezone.now() + timedelta(days=1)
+        )
+        created_at = timezone.now() - timedelta(hours=1)
+        self.comments = Comment.objects.bulk_create(
+            Comment(task=self.task, author=self.user, text=f'Комментарий {i}')
+            for i in range(7)
+        )
+        # Одинаковое время создания: порядок держится только на id
+        Comment.objects.update(created_at=created_at)
+        Task.objects.update(comments_count=7)
+        self.client.force_authenticate(user=self.user)
+        self.url = f'/api/v1/tasks/{self.task.id}/comments/'
+
+    def test_detail_embeds_latest_comments(self):
+        """Тест: деталь задачи содержит только последние комментарии и общее число"""
+        response = self.client.get(f'/api/v1/tasks/{self.task.id}/')
+        self.assertEqual(
+            [comment['id'] for comment in response.data['comments']],
+            [comment.id for comment in self.comments[-3:]]
+        )
+        self.assertEqual(response.data['comments_count'], 7)
+
+    def test_pages_cover_all_comments(self):
+        """Тест: обход страниц возвращает все комментарии в обоих направлениях"""
+        for ordering, expected in (
+            ('created_at', [comment.id for comment in self.comments]),
+            ('-created_at', [comment.id for comment in reversed(self.comments)]),
+        ):
+            ids, url = [], f'{self.url}?page_size=3&ordering={ordering}'
+            while url:
+                response = self.client.get(url)
+                self.assertLessEqual(len(response.data['results']), 3)
+                ids.extend(item['id'] for item in response.data['results'])
+                url = response.data['next']
+            self.assertEqual(ids, expected)
+
+    def test_page_queries_bounded(self):
+        """Тест: страница - проверка доступа к задаче и одна выборка с авторами"""
+        with self.assertNumQueries(2):
+            response = self.client.get(f'{self.url}?page_size=3')
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(response.data['results'][0]['author']['username'], 'user')
+
+    def test_foreign_task_not_found(self):
+        """Тест: комментарии чужой задачи недоступны"""
+        self.client.force_authenticate(user=self.other)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_etag_ignores_older_comments(self):
+        """Тест: ETag детали меняет правка последнего комментария, но не старого"""
+        url = f'/api/v1/tasks/{self.task.id}/'
+        etag = self.client.get(url)['ETag']
+        cache.get_cache().clear()
+        Comment.objects.filter(pk=self.comments[0].pk).update(updated_at=timezone.now())
+        self.assertEqual(self.client.get(url)['ETag'], etag)
+        cache.get_cache().clear()
+        Comment.objects.filter(pk=self.comments[-1].pk).update(updated_at=timezone.now())
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+
+class CommentsCountTest(APITestCase):
+    """Тесты счетчика комментариев задачи"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass123')
+        self.task = Task.objects.create(
+            title='Задача',
+            description='Описание',
+            creator=self.user,
+            deadline=timezone.now() + timedelta(days=1)
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_create_and_delete_comment_update_counter(self):
+        """Тест: создание и удаление комментария через API меняет счетчик"""
+        response = self.client.post(
+            '/api/v1/comments/', {'task': self.task.id, 'text': 'Комментарий'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.comments_count, 1)
+
+        self.client.delete(f'/api/v1/comments/{response.data["id"]}/')
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.comments_count, 0)
+
+    def test_moving_comment_moves_counter(self):
+        """Тест: перенос комментария в другую задачу переносит счетчик"""
+        other_task = Task.objects.create(
+            title='Другая задача',
+            description='Описание',
+            creator=self.user,
+            deadline=timezone.now() + timedelta(days=1)
+        )
+        response = self.client.post(
+            '/api/v1/comments/', {'task': self.task.id, 'text': 'Комментарий'}
+        )
+        self.client.patch(
+            f'/api/v1/comments/{response.data["id"]}/', {'task': other_task.id}
+        )
+        self.task.refresh_from_db()
+        other_task.refresh_from_db()
+        self.assertEqual(self.task.comments_count, 0)
+        self.assertEqual(other_task.comments_count, 1)
+
+    def test_task_save_does_not_overwrite_counter(self):
+        """Тест: сохранение задачи не затирает счетчик устаревшим значением"""
+        stale = Task.objects.get(pk=self.task.pk)
+        Task.objects.change_comments_count(self.task.pk, 3)
+        stale.title = 'Новое название'
+        stale.save()
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.comments_count, 3)
+        self.assertEqual(self.task.title, 'Новое название')
+
+    def test_repair_command_fixes_drift(self):
+        """Тест: команда repair_comments_count исправляет расхождения"""
+        Comment.objects.create(task=self.task, author=self.user, text='Текст')
+        Comment.objects.create(task=self.task, author=self.user, text='Текст')
+        out = StringIO()
+        call_command('repair_comments_count', '--dry-run', stdout=out)
+        self.assertIn('Найдено расхождений: 1', out.getvalue())
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.comments_count, 0)
+
+        call_command('repair_comments_count', '--batch-size', '1', stdout=out)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.comments_count, 2)
+
+
+class FullTextSearchTest(APITestCase):
+    """Тесты полнотекстового поиска задач и комментариев"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass123')
+        deadline = timezone.now() + timedelta(days=1)
+        self.report = Task.objects.create(
+            title='Подготовить отчеты',
+            description='Квартальные отчеты для руководства',
+            creator=self.user,
+            deadline=deadline
+        )
+        self.deploy = Task.objects.create(
+            title='Deploy billing services',
+            description='Roll out the billing service to production',
+            creator=self.user,
+            deadline=deadline
+        )
+        self.mention = Task.objects.create(
+            title='Созвон',
+            description='Обсудить отчет по billing',
+            creator=self.user,
+            deadline=deadline
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def search(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {item['id'] for item in response.data['results']}
+
+    def test_russian_stemming(self):
+        """Тест: поиск находит другие словоформы русских слов"""
+        ids = self.search('/api/v1/tasks/?search=отчет')
+        self.assertEqual(ids, {self.report.id, self.mention.id})
+
+    def test_english_stemming(self):
+        """Тест: поиск находит другие словоформы английских слов"""
+        ids = self.search('/api/v1/tasks/?search=service')
+        self.assertEqual(ids, {self.deploy.id})
+
+    def test_substring_in_title(self):
+        """Тест: подстрока названия находится без полного слова"""
+        ids = self.search('/api/v1/tasks/?search=ploy')
+        self.assertEqual(ids, {self.deploy.id})
+
+    def test_ordering_by_rank(self):
+        """Тест: сортировка по релевантности и обход страниц по курсору"""
+        url = '/api/v1/tasks/?search=billing&ordering=-search_rank&page_size=1'
+        first = self.client.get(url)
+        # Совпадение в названии (вес A) выше совпадения в описании (вес B)
+        self.assertEqual(first.data['results'][0]['id'], self.deploy.id)
+        second = self.client.get(first.data['next'])
+        self.assertEqual(second.data['results'][0]['id'], self.mention.id)
+        self.assertIsNone(second.data['next'])
+
+    def test_ordering_by_rank_without_search(self):
+        """Тест: сортировка по релевантности без поиска не ломает список"""
+        response = self.client.get('/api/v1/tasks/?ordering=-search_rank')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_comment_search(self):
+        """Тест: комментарии ищутся по тексту"""
+        comment = Comment.objects.create(task=self.report, author=self.user, text='Отчеты согласованы')
+        Comment.objects.create(task=self.report, author=self.user, text='Созвон перенесли')
+        response = self.client.get('/api/v1/comments/?search=отчет')
+        self.assertEqual([item['id'] for item in response.data['results']], [comment.id])
+
+
+class ResponseCacheTest(APITestCase):
+    """Тесты кэша ответов и его инвалидации"""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.creator = User.objects.create_user(username='creator', password='pass123')
+        self.assignee = User.objects.create_user(username='assignee', password='pass123')
+        self.task = Task.objects.create(
+            title='Задача',
+            description='Описание',
+            creator=self.creator,
+            assignee=self.assignee,
+            deadline=timezone.now() + timedelta(days=1)
+        )
+
+    def get(self, user, url):
+        self.client.force_authenticate(user=user)
+        return self.client.get(url)
+
+    def test_repeated_list_is_served_from_cache(self):
+        """Тест: повторный запрос списка отдается из кэша без запросов к БД"""
+        self.assertEqual(self.get(self.creator, '/api/v1/tasks/')['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.get(self.creator, '/api/v1/tasks/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['results'][0]['id'], self.task.id)
+
+    def test_cache_key_includes_query_params(self):
+        """Тест: разные фильтры кэшируются раздельно"""
+        self.get(self.creator, '/api/v1/tasks/')
+        response = self.get(self.creator, '/api/v1/tasks/?status=done')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'], [])
+
+    def test_task_update_invalidates_assignee(self):
+        """Тест: изменение задачи сбрасывает кэш исполнителя"""
+        url = f'/api/v1/tasks/{self.task.id}/'
+        self.get(self.assignee, url)
+        self.client.force_authenticate(user=self.creator)
+        self.client.patch(url, {'title': 'Новое название'})
+        response = self.get(self.assignee, url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['title'], 'Новое название')
+
+    def test_reassignment_invalidates_previous_assignee(self):
+        """Тест: прежний исполнитель перестает видеть задачу сразу"""
+        self.get(self.assignee, '/api/v1/tasks/')
+        task = Task.objects.get(pk=self.task.pk)
+        task.assignee = None
+        task.save()
+        response = self.get(self.assignee, '/api/v1/tasks/')
+        self.assertEqual(response.data['results'], [])
+
+    def test_user_rename_invalidates_task_users(self):
+        """Тест: переименование пользователя меняет кэш и ETag у участников его задач"""
+        etag = self.get(self.assignee, '/api/v1/tasks/')['ETag']
+        self.creator.username = 'renamed'
+        self.creator.save()
+        response = self.client.get('/api/v1/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['creator']['username'], 'renamed')
+
+    def test_comment_delete_invalidates_task_users(self):
+        """Тест: удаление комментария обновляет comments_count в кэше"""
+        self.client.force_authenticate(user=self.creator)
+        created = self.client.post('/api/v1/comments/', {'task': self.task.id, 'text': 'Текст'})
+        self.assertEqual(self.get(self.assignee, '/api/v1/tasks/').data['results'][0]['comments_count'], 1)
+        self.client.force_authenticate(user=self.creator)
+        self.client.delete(f'/api/v1/comments/{created.data["id"]}/')
+        self.assertEqual(self.get(self.assignee, '/api/v1/tasks/').data['results'][0]['comments_count'], 0)
+
+    def test_production_requires_shared_cache(self):
+        """Тест: при REQUIRE_SHARED_CACHE кэш в памяти процесса не проходит проверку"""
+        with override_settings(REQUIRE_SHARED_CACHE=True):
+            self.assertEqual([error.id for error in checks.shared_cache(None)], ['tasks.E001'])
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                             'LOCATION': 'redis://redis:6379/0'}}
+        with override_settings(REQUIRE_SHARED_CACHE=True, CACHES=redis):
+            self.assertEqual(checks.shared_cache(None), [])
+        self.assertEqual(checks.shared_cache(None), [])
+
+    def test_stats_endpoint(self):
+        """Тест: статистика кэша доступна только администратору"""
+        self.get(self.creator, '/api/v1/tasks/')
+        self.get(self.creator, '/api/v1/tasks/')
+        self.assertEqual(
+            self.get(self.creator, '/api/v1/cache/stats/').status_code,
+            status.HTTP_403_FORBIDDEN
+        )
+        admin = User.objects.create_superuser(username='admin', password='pass123')
+        stats = self.get(admin, '/api/v1/cache/stats/').data
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+
+class ConditionalGetTest(APITestCase):
+    """Тесты условных GET-запросов (ETag / Last-Modified)"""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.user = User.objects.create_user(username='user', password='pass123')
+        self.task = Task.objects.create(
+            title='Задача',
+            description='Описание',
+            creator=self.user,
+            deadline=timezone.now() + timedelta(days=1)
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = f'/api/v1/tasks/{self.task.id}/'
+
+    def test_list_and_detail_have_validators(self):
+        """Тест: список отдает ETag, деталь - ETag и Last-Modified"""
+        for url in ('/api/v1/tasks/', self.url):
+            response = self.client.get(url)
+            self.assertTrue(response['ETag'].startswith('"'))
+            self.assertIn('Authorization', response['Vary'])
+        self.assertIn('Last-Modified', response)
+
+    @override_settings(API_CACHE_TIMEOUT=0)
+    def test_not_modified_without_serialization(self):
+        """Тест: совпавший If-None-Match у списка - 304 без запросов к БД и без кэша ответа"""
+        etag = self.client.get('/api/v1/tasks/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_not_modified_from_cache(self):
+        """Тест: при попадании в кэш 304 отдается без запросов к БД"""
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_on_comment(self):
+        """Тест: новый комментарий меняет ETag задачи и списка"""
+        detail_etag = self.client.get(self.url)['ETag']
+        list_etag = self.client.get('/api/v1/tasks/')['ETag']
+        self.client.post('/api/v1/comments/', {'task': self.task.id, 'text': 'Текст'})
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], detail_etag)
+        response = self.client.get('/api/v1/tasks/', HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.data['results'][0]['comments_count'], 1)
+
+    def test_etag_changes_on_delete(self):
+        """Тест: удаление задачи меняет ETag списка"""
+        Task.objects.create(
+            title='Вторая', description='Описание', creator=self.user,
+            deadline=timezone.now() + timedelta(days=1)
+        )
+        etag = self.client.get('/api/v1/tasks/')['ETag']
+        self.client.delete(self.url)
+        response = self.client.get('/api/v1/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+
+
+class BulkTaskTest(APITestCase):
+    """Тесты массовых операций с задачами"""
+
+    def setUp(self):
+        self.creator = User.objects.create_user(username='creator', password='pass123')
+        self.assignee = User.objects.create_user(username='assignee', password='pass123')
+        self.other = User.objects.create_user(username='other', password='pass123')
+        self.deadline = (timezone.now() + timedelta(days=3)).isoformat()
+        self.client.force_authenticate(user=self.creator)
+
+    def make_task(self, creator, status=TaskStatus.NEW):
+        return Task.objects.create(
+            title='Задача', description='Описание', creator=creator, status=status,
+            assignee=self.assignee, deadline=timezone.now() + timedelta(days=1)
+        )
+
+    def test_bulk_create(self):
+        """Тест: массовое создание - число запросов не зависит от количества задач"""
+        items = [
+            {'title': f'Задача {i}', 'description': 'Описание',
+             'assignee_id': self.assignee.id, 'deadline': self.deadline}
+            for i in range(50)
+        ]
+        # Включая счетчики статистики, отложенные задачи, события ленты и NOTIFY
+        with self.assertNumQueries(9):
+            response = self.client.post('/api/v1/tasks/bulk/', items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 50)
+        self.assertEqual(response.data[0]['assignee']['id'], self.assignee.id)
+        self.assertEqual(Task.objects.filter(creator=self.creator).count(), 50)
+
+    def test_bulk_create_reports_errors_per_item(self):
+        """Тест: при ошибке в одном элементе ничего не сохраняется"""
+        past = (timezone.now() - timedelta(days=1)).isoformat()
+        items = [
+            {'title': 'Верная', 'description': 'Описание', 'deadline': self.deadline},
+            {'title': 'Просроченная', 'description': 'Описание', 'deadline': past},
+        ]
+        response = self.client.post('/api/v1/tasks/bulk/', items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('deadline', response.data[1])
+        self.assertFalse(Task.objects.exists())
+
+    def test_bulk_update(self):
+        """Тест: массовое обновление проверяет переходы статусов и права"""
+        new = self.make_task(self.creator)
+        in_progress = self.make_task(self.creator, TaskStatus.IN_PROGRESS)
+        foreign = self.make_task(self.other)
+        response = self.client.patch('/api/v1/tasks/bulk/', [
+            {'id': new.id, 'status': TaskStatus.DONE},
+            {'id': foreign.id, 'title': 'Чужая'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('status', response.data[0])
+        self.assertIn('id', response.data[1])
+
+        response = self.client.patch('/api/v1/tasks/bulk/', [
+            {'id': new.id, 'status': TaskStatus.IN_PROGRESS},
+            {'id': in_progress.id, 'status': TaskStatus.DONE, 'title': 'Готово'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        in_progress.refresh_from_db()
+        self.assertEqual(in_progress.status, TaskStatus.DONE)
+        self.assertEqual(in_progress.title, 'Готово')
+        self.assertGreater(in_progress.updated_at, new.updated_at)
+
+    def test_bulk_complete(self):
+        """Тест: массовое завершение - только задачи создателя"""
+        own = [self.make_task(self.creator) for _ in range(3)]
+        foreign = self.make_task(self.other)
+        ids = [task.id for task in own]
+        response = self.client.post(
+            '/api/v1/tasks/bulk/complete/', {'ids': ids + [foreign.id]}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[-1], {'id': ['Задача не найдена.']})
+
+        response = self.client.post('/api/v1/tasks/bulk/complete/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            Task.objects.filter(pk__in=ids, status=TaskStatus.DONE).count(), 3
+        )
+
+    def test_bulk_rejects_non_list(self):
+        """Тест: тело массового запроса должно быть списком"""
+        response = self.client.post('/api/v1/tasks/bulk/', {'title': 'Задача'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TaskExportTest(APITestCase):
+    """Тесты потоковой выгрузки задач"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass123')
+        self.other = User.objects.create_user(username='other', password='pass123')
+        for title, status_, creator in [
+            ('Первая, "с кавычками"', TaskStatus.NEW, self.user),
+            ('Вторая', TaskStatus.DONE, self.user),
+            ('Чужая', TaskStatus.NEW, self.other),
+        ]:
+            Task.objects.create(
+                title=title, description='Описание', status=status_, creator=creator,
+                deadline=timezone.now() + timedelta(days=1)
+            )
+        self.client.force_authenticate(user=self.user)
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_export(self):
+        """Тест: NDJSON - по объекту на строку, только видимые задачи"""
+        response = self.client.get('/api/v1/tasks/export/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['Вторая', 'Первая, "с кавычками"'])
+        self.assertEqual(rows[0]['creator_id'], self.user.id)
+
+    def test_csv_export_with_filter(self):
+        """Тест: CSV с заголовком учитывает фильтры списка"""
+        response = self.client.get('/api/v1/tasks/export/?format=csv&status=new')
+        self.assertIn('tasks.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(self.read(response).splitlines()))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Первая, "с кавычками"')
+
+    def test_export_requires_authentication(self):
+        """Тест: выгрузка недоступна без аутентификации"""
+        self.client.force_authenticate(user=None)
+        response = self.client.get('/api/v1/tasks/export/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+def current_rss():
+    """Текущий размер резидентной памяти процесса в байтах (Linux)"""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Серверный курсор есть только в PostgreSQL')
+@skipUnless(os.path.exists('/proc/self/statm'), 'Память процесса читается из /proc')
+class TaskExportMemoryTest(APITestCase):
+    """Профиль памяти выгрузки большого числа задач"""
+    rows = 1_000_000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='exporter', password='pass123')
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO tasks_task (title, description, status, creator_id,
+                                        deadline, created_at, updated_at, comments_count)
+                SELECT 'Задача ' || n, 'Описание задачи', 'new', %s,
+                       now() + interval '1 day', now() - n * interval '1 second', now(), 0
+                FROM generate_series(1, %s) AS n
+            """, [cls.user.id, cls.rows])
+            cursor.execute('ANALYZE tasks_task')
+
+    def test_export_memory_is_constant(self):
+        """Тест: память при выгрузке 1M задач не растет с числом строк"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/v1/tasks/export/?format=csv')
+        chunks = iter(response.streaming_content)
+        lines = next(chunks).count(b'\n')
+        # Замер после первой пачки: курсор открыт, буферы созданы
+        baseline = peak = current_rss()
+        for chunk in chunks:
+            lines += chunk.count(b'\n')
+            peak = max(peak, current_rss())
+        self.assertEqual(lines, self.rows + 1)
+        # Весь CSV занимает ~150 МБ; в памяти одновременно только одна пачка
+        self.assertLess(peak - baseline, 20 * 1024 * 1024)
+
+
+class FastSerializationTest(APITestCase):
+    """Тесты быстрого режима сериализации списков"""
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(
+                username=f'user{i}', password='pass123', email=f'user{i}@example.com',
+                first_name='Имя', last_name='Фамилия'
+            )
+            for i in range(3)
+        ]
+        for i in range(12):
+            Task.objects.create(
+                title=f'Задача "{i}"', description='Описание', status=TaskStatus.values[i % 4],
+                creator=self.users[i % 3], assignee=self.users[(i + 1) % 3] if i % 2 else None,
+                deadline=timezone.now() + timedelta(days=i, microseconds=i), comments_count=i
+            )
+
+    def test_output_is_byte_identical(self):
+        """Тест: быстрый режим дает тот же JSON, что и обычный ListSerializer"""
+        tasks = list(Task.objects.select_related('creator', 'assignee').order_by('id'))
+        fast = TaskListSerializer(tasks, many=True)
+        drf = ListSerializer(tasks, child=TaskListSerializer())
+        self.assertEqual(JSONRenderer().render(fast.data), JSONRenderer().render(drf.data))
+
+    def test_users_are_serialized_once(self):
+        """Тест: одинаковые пользователи берутся из кэша ответа"""
+        tasks = list(Task.objects.select_related('creator', 'assignee').order_by('id'))
+        data = TaskListSerializer(tasks, many=True).data
+        self.assertIs(data[0]['creator'], data[3]['creator'])
+
+
+class ResponseFormatTest(APITestCase):
+    """Тесты рендереров orjson и MessagePack"""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.user = User.objects.create_user(username='user', password='pass123', first_name='Имя')
+        self.task = Task.objects.create(
+            title='Развернуть сервис \u2028 "срочно"', description='Описание', creator=self.user,
+            assignee=self.user, deadline=timezone.now() + timedelta(days=1, microseconds=1)
+        )
+        Comment.objects.create(task=self.task, author=self.user, text='Комментарий')
+        self.client.force_authenticate(user=self.user)
+
+    def test_orjson_output_matches_json_renderer(self):
+        """Тест: ответы orjson совпадают с JSONRenderer DRF байт в байт"""
+        for url in (
+            '/api/v1/tasks/', f'/api/v1/tasks/{self.task.id}/', '/api/v1/tasks/?search=сервис',
+            '/api/v1/tasks/stats/', '/api/v1/comments/', '/api/v1/tasks/?deadline_from=вчера',
+        ):
+            response = self.client.get(url, HTTP_ACCEPT='application/json')
+            self.assertEqual(response['Content-Type'], 'application/json')
+            self.assertEqual(response.content, JSONRenderer().render(response.data), url)
+        # Даты вне сериализатора orjson кодирует сам, как JSONEncoder
+        data = {'at': timezone.now(), 'day': timezone.now().date(), 1: None}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_msgpack(self):
+        """Тест: MessagePack по Accept и ?format= с теми же данными, что JSON"""
+        expected = json.loads(self.client.get('/api/v1/tasks/', HTTP_ACCEPT='application/json').content)
+        response = self.client.get('/api/v1/tasks/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), expected)
+        response = self.client.get(f'/api/v1/tasks/{self.task.id}/?format=msgpack')
+        self.assertEqual(msgpack.unpackb(response.content)['comments'][0]['text'], 'Комментарий')
+
+    def test_etag_per_format(self):
+        """Тест: у JSON и MessagePack из одной записи кэша разные ETag"""
+        url = f'/api/v1/tasks/{self.task.id}/'
+        json_etag = self.client.get(url, HTTP_ACCEPT='application/json')['ETag']
+        response = self.client.get(url, HTTP_ACCEPT='application/msgpack', HTTP_IF_NONE_MATCH=json_etag)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], json_etag)
+        response = self.client.get(url, HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=json_etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_parsers(self):
+        """Тест: тело запроса в MessagePack и ошибка разбора JSON"""
+        deadline = (timezone.now() + timedelta(days=2)).isoformat()
+        response = self.client.post(
+            '/api/v1/tasks/', msgpack.packb({'title': 'Из MessagePack', 'description': 'Описание', 'deadline': deadline}),
+            content_type='application/msgpack'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['title'], 'Из MessagePack')
+        for body, content_type in (('{"title": ', 'application/json'), (b'\xc1', 'application/msgpack')):
+            response = self.client.post('/api/v1/tasks/', body, content_type=content_type)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('parse error', response.data['detail'])
+
+
+class StatelessAuthenticationTest(APITestCase):
+    """Тесты JWT-аутентификации без загрузки пользователя из БД"""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.user = User.objects.create_user(
+            username='user', password='pass123', email='user@example.com'
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.obtain_token()}')
+
+    def obtain_token(self, password='pass123'):
+        response = self.client.post(
+            '/api/v1/token/', {'username': 'user', 'password': password}, format='json'
+        )
+        return response.data['access']
+
+    def test_user_is_not_loaded_per_request(self):
+        """Тест: после первого запроса пользователь не читается из БД"""
+        self.client.get('/api/v1/tasks/?page_size=1')
+        # Только страница, без запроса пользователя
+        with self.assertNumQueries(1):
+            self.client.get('/api/v1/tasks/?page_size=2')
+        with patch.object(TaskViewSet, 'authentication_classes', [JWTAuthentication]):
+            with self.assertNumQueries(2):
+                self.client.get('/api/v1/tasks/?page_size=3')
+
+    def test_created_task_has_full_creator(self):
+        """Тест: создатель задачи - настоящий пользователь с отложенными полями"""
+        response = self.client.post('/api/v1/tasks/', {
+            'title': 'Задача', 'description': 'Описание',
+            'deadline': (timezone.now() + timedelta(days=1)).isoformat()
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['creator']['email'], 'user@example.com')
+        self.assertEqual(Task.objects.get().creator, self.user)
+
+    def test_rename_is_not_read_from_token(self):
+        """Тест: после переименования ответы показывают новое имя, а не claim токена"""
+        self.user.username = 'renamed'
+        self.user.save()
+        response = self.client.post('/api/v1/tasks/', {
+            'title': 'Задача', 'description': 'Описание',
+            'deadline': (timezone.now() + timedelta(days=1)).isoformat()
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['creator']['username'], 'renamed')
+
+    def test_password_change_revokes_token(self):
+        """Тест: смена пароля отзывает выданные токены"""
+        self.assertEqual(self.client.get('/api/v1/tasks/').status_code, status.HTTP_200_OK)
+        self.user.set_password('new-pass123')
+        self.user.save()
+        self.assertEqual(self.client.get('/api/v1/tasks/').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.obtain_token("new-pass123")}')
+        self.assertEqual(self.client.get('/api/v1/tasks/').status_code, status.HTTP_200_OK)
+
+    def test_revocation_through_shared_cache(self):
+        """Тест: версия токена - в общем кэше с TTL; изменение в обход сигналов видно после TTL"""
+        self.client.get('/api/v1/tasks/')
+        key = versions.key(self.user.pk)
+        self.assertIsNotNone(cache.get_cache().get(key))
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/api/v1/tasks/').status_code, status.HTTP_200_OK)
+        # Истечение TTL
+        cache.get_cache().delete(key)
+        self.assertEqual(self.client.get('/api/v1/tasks/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AsyncReadPathTest(APITestCase):
+    """Тесты асинхронного пути чтения"""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.user = User.objects.create_user(username='user', password='pass123')
+        self.other = User.objects.create_user(username='other', password='pass123')
+        self.task = Task.objects.create(
+            title='Развернуть сервис', description='Описание', creator=self.user,
+            assignee=self.other, deadline=timezone.now() + timedelta(days=1)
+        )
+        Task.objects.create(
+            title='Готовая', description='Описание', creator=self.user,
+            status=TaskStatus.DONE, deadline=timezone.now() + timedelta(days=2)
+        )
+        self.foreign = Task.objects.create(
+            title='Чужая', description='Описание', creator=self.other,
+            deadline=timezone.now() + timedelta(days=1)
+        )
+        Comment.objects.create(task=self.task, author=self.other, text='Комментарий')
+        token = self.client.post(
+            '/api/v1/token/', {'username': 'user', 'password': 'pass123'}, format='json'
+        ).data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_same_output_as_sync_path(self):
+        """Тест: async-путь отдает те же данные, что и ViewSet"""
+        for url in (
+            'tasks/', 'tasks/?status=done', 'tasks/?search=сервис',
+            'tasks/?ordering=deadline&page_size=1', f'tasks/{self.task.id}/', 'comments/',
+            'tasks/?fields=id,creator&expand=assignee', f'tasks/{self.task.id}/?fields=id,title',
+        ):
+            # Ссылки пагинации ведут на тот же путь, по которому пришел запрос
+            response = self.client.get(f'/api/v1/async/{url}')
+            self.assertEqual(
+                response.content.replace(b'/async/', b'/'),
+                self.client.get(f'/api/v1/{url}', HTTP_ACCEPT='application/json').content
+            )
+
+    def test_visibility_rules(self):
+        """Тест: чужая задача не видна и в async-пути"""
+        response = self.client.get(f'/api/v1/async/tasks/{self.foreign.id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_errors(self):
+        """Тест: ошибки фильтров и аутентификации"""
+        response = self.client.get('/api/v1/async/tasks/?deadline_from=вчера')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('deadline_from', response.json())
+        self.client.credentials()
+        response = self.client.get('/api/v1/async/tasks/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+
+
+class EventFeedTest(APITestCase):
+    """Тесты ленты изменений"""
+
+    def setUp(self):
+        self.creator = User.objects.create_user(username='creator', password='pass123')
+        self.first = User.objects.create_user(username='first', password='pass123')
+        self.second = User.objects.create_user(username='second', password='pass123')
+        self.client.force_authenticate(user=self.creator)
+        self.deadline = (timezone.now() + timedelta(days=1)).isoformat()
+
+    def event_list(self):
+        return list(TaskEvent.objects.values_list('kind', 'action', 'users'))
+
+    def test_reassignment_sends_delete_to_previous_assignee(self):
+        """Тест: прежний исполнитель получает удаление, новые участники - изменение"""
+        response = self.client.post('/api/v1/tasks/', {
+            'title': 'Задача', 'description': 'Описание',
+            'assignee_id': self.first.id, 'deadline': self.deadline
+        }, format='json')
+        self.client.patch(
+            f'/api/v1/tasks/{response.data["id"]}/', {'assignee_id': self.second.id}, format='json'
+        )
+        self.assertEqual(self.event_list(), [
+            ('task', 'created', sorted([self.creator.id, self.first.id])),
+            ('task', 'updated', sorted([self.creator.id, self.second.id])),
+            ('task', 'deleted', [self.first.id]),
+        ])
+        event = TaskEvent.objects.get(action='updated')
+        self.assertEqual(event.data['assignee_id'], self.second.id)
+        self.assertEqual(event.data['updated_at'], self.client.get(
+            f'/api/v1/tasks/{event.object_id}/'
+        ).data['updated_at'])
+
+    def test_comment_delete_event(self):
+        """Тест: удаление комментария попадает в ленту участников задачи"""
+        task = Task.objects.create(
+            title='Задача', description='Описание', creator=self.creator,
+            assignee=self.first, deadline=timezone.now() + timedelta(days=1)
+        )
+        comment = Comment.objects.create(task=task, author=self.creator, text='Текст')
+        self.client.delete(f'/api/v1/comments/{comment.id}/')
+        event = TaskEvent.objects.last()
+        self.assertEqual((event.kind, event.action), ('comment', 'deleted'))
+        self.assertEqual(event.users, sorted([self.creator.id, self.first.id]))
+        self.assertEqual(event.data, {'id': comment.id, 'task_id': task.id})
+
+    @override_settings(EVENTS_HEARTBEAT=1, EVENTS_RESUME_OVERLAP=0)
+    async def test_stream_resumes_after_last_event_id(self):
+        """Тест: после Last-Event-ID приходят только пропущенные видимые события"""
+        own = await Task.objects.acreate(
+            title='Своя', description='Описание', creator=self.creator,
+            deadline=timezone.now() + timedelta(days=1)
+        )
+        last_id = await TaskEvent.objects.values_list('pk', flat=True).alast()
+        own.title = 'Переименована'
+        await own.asave()
+        await Task.objects.acreate(
+            title='Чужая', description='Описание', creator=self.second,
+            deadline=timezone.now() + timedelta(days=1)
+        )
+        token = StatelessTokenObtainPairSerializer.get_token(self.creator).access_token
+
+        response = await self.async_client.get('/api/v1/events/', headers={
+            'Authorization': f'Bearer {token}', 'Last-Event-ID': str(last_id)
+        })
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = []
+        async for chunk in response.streaming_content:
+            if chunk.startswith(b': ping'):
+                break
+            chunks.append(chunk.decode())
+        await events.bus.stop()
+
+        self.assertEqual(chunks[0], 'retry: 3000\n\n')
+        self.assertEqual(len(chunks), 2)
+        self.assertIn('event: task.updated\n', chunks[1])
+        self.assertIn('"title": "Переименована"', chunks[1])
+
+    def test_stream_requires_asgi(self):
+        """Тест: под WSGI лента недоступна"""
+        response = self.client.get('/api/v1/events/')
+        self.assertEqual(response.status_code, 501)
+
+    def test_prune_events(self):
+        """Тест: prune_events удаляет события старше срока хранения"""
+        Task.objects.create(
+            title='Задача', description='Описание', creator=self.creator,
+            deadline=timezone.now() + timedelta(days=1)
+        )
+        TaskEvent.objects.update(created_at=timezone.now() - timedelta(days=30))
+        Task.objects.create(
+            title='Новая', description='Описание', creator=self.creator,
+            deadline=timezone.now() + timedelta(days=1)
+        )
+        call_command('prune_events', days=7, stdout=StringIO())
+        self.assertEqual(list(TaskEvent.objects.values_list('data__title', flat=True)), ['Новая'])
+
+
+class EventDeliveryTest(TransactionTestCase):
+    """Тест доставки событий через LISTEN/NOTIFY (нужны настоящие коммиты)"""
+
+    async def test_committed_change_is_pushed(self):
+        """Тест: закоммиченное изменение сразу приходит подписчику, чужое - нет"""
+        user = await User.objects.acreate(username='user')
+        other = await User.objects.acreate(username='other')
+        stream = events.stream(user.pk)
+        try:
+            self.assertTrue((await anext(stream)).startswith('retry:'))
+            self.assertIn('event: ready', await anext(stream))
+
+            deadline = timezone.now() + timedelta(days=1)
+            await sync_to_async(Task.objects.create)(
+                title='Чужая', description='Описание', creator=other, deadline=deadline
+            )
+            await sync_to_async(Task.objects.create)(
+                title='Своя', description='Описание', creator=other, assignee=user,
+                deadline=deadline
+            )
+            message = await asyncio.wait_for(anext(stream), 5)
+        finally:
+            await stream.aclose()
+            await events.bus.stop()
+        self.assertIn('event: task.created', message)
+        self.assertIn('"title": "Своя"', message)
+
+
+
+@override_settings(EVENTS_RESUME_OVERLAP=0)
+class DeltaSyncTest(APITestCase):
+    """Тесты дельта-синхронизации"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass123')
+        self.other = User.objects.create_user(username='other', password='pass123')
+        deadline = timezone.now() + timedelta(days=1)
+        self.tasks = [
+            Task.objects.create(
+                title=f'Задача {i}', description='Описание', creator=self.user,
+                assignee=self.other, deadline=deadline
+            )
+            for i in range(3)
+        ]
+        self.assigned = Task.objects.create(
+            title='Назначенная', description='Описание', creator=self.other,
+            assignee=self.user, deadline=deadline
+        )
+        Task.objects.create(
+            title='Чужая', description='Описание', creator=self.other, deadline=deadline
+        )
+        self.comment = Comment.objects.create(task=self.tasks[0], author=self.other, text='Текст')
+        self.client.force_authenticate(user=self.user)
+
+    def sync(self, since=None, **params):
+        if since is not None:
+            params['since'] = since
+        response = self.client.get('/api/v1/tasks/changes/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_initial_sync_returns_visible_objects(self):
+        """Тест: первая синхронизация - все видимые задачи и комментарии"""
+        data = self.sync()
+        self.assertEqual(
+            [task['id'] for task in data['tasks']],
+            [task.id for task in self.tasks] + [self.assigned.id]
+        )
+        self.assertEqual(data['tasks'][0]['description'], 'Описание')
+        self.assertEqual([comment['id'] for comment in data['comments']], [self.comment.id])
+        self.assertEqual(data['deleted'], {'tasks': [], 'comments': []})
+        self.assertFalse(data['has_more'])
+
+    def test_delta_contains_only_changes(self):
+        """Тест: после курсора - только изменения, удаления и потеря доступа"""
+        since = self.sync()['next']
+        self.client.patch(f'/api/v1/tasks/{self.tasks[1].id}/', {'title': 'Новое'}, format='json')
+        self.client.delete(f'/api/v1/tasks/{self.tasks[2].id}/')
+        self.assigned.assignee = None
+        self.assigned.save()
+
+        data = self.sync(since)
+        self.assertEqual([task['title'] for task in data['tasks']], ['Новое'])
+        self.assertEqual(data['comments'], [])
+        self.assertEqual(
+            [task['id'] for task in data['deleted']['tasks']],
+            [self.tasks[2].id, self.assigned.id]
+        )
+        self.assertIn('deleted_at', data['deleted']['tasks'][0])
+
+        data = self.sync(data['next'])
+        self.assertEqual((data['tasks'], data['deleted']['tasks']), ([], []))
+
+    def test_reassignment_moves_comments(self):
+        """Тест: новый исполнитель получает старые комментарии задачи, прежний - их надгробия"""
+        task, earlier = self.tasks[0], timezone.now() - timedelta(hours=1)
+        Comment.objects.filter(pk=self.comment.pk).update(created_at=earlier, updated_at=earlier)
+        Task.objects.filter(pk=task.pk).update(comments_updated_at=earlier)
+        third = User.objects.create_user(username='third', password='pass123')
+        self.client.force_authenticate(user=third)
+        since_third = self.sync()['next']
+        self.client.force_authenticate(user=self.other)
+        since_other = self.sync()['next']
+
+        task.assignee = third
+        task.save()
+
+        self.client.force_authenticate(user=third)
+        data = self.sync(since_third)
+        self.assertEqual([item['id'] for item in data['tasks']], [task.id])
+        self.assertEqual([item['id'] for item in data['comments']], [self.comment.id])
+
+        self.client.force_authenticate(user=self.other)
+        data = self.sync(since_other)
+        self.assertEqual([item['id'] for item in data['deleted']['tasks']], [task.id])
+        self.assertEqual(
+            [(item['id'], item['task_id']) for item in data['deleted']['comments']],
+            [(self.comment.id, task.id)]
+        )
+        self.assertEqual(data['deleted']['comments'][0]['deleted_at'], data['deleted']['tasks'][0]['deleted_at'])
+
+    def test_user_rename_is_synced(self):
+        """Тест: новое имя участника приходит в users без изменения задач"""
+        stranger = User.objects.create_user(username='stranger', password='pass123')
+        since = self.sync()['next']
+        self.other.first_name = 'Новое'
+        self.other.save()
+        stranger.first_name = 'Чужое'
+        stranger.save()
+
+        data = self.sync(since)
+        self.assertEqual((data['tasks'], data['comments']), ([], []))
+        self.assertEqual(
+            [(user['id'], user['username'], user['first_name']) for user in data['users']],
+            [(self.other.id, 'other', 'Новое')]
+        )
+        self.assertEqual(data['deleted'], {'tasks': [], 'comments': []})
+
+    def test_large_delta_is_paged(self):
+        """Тест: изменения отдаются частями по page_size"""
+        data = self.sync(page_size=3)
+        self.assertTrue(data['has_more'])
+        self.assertEqual(len(data['tasks']), 3)
+        data = self.sync(data['next'], page_size=3)
+        self.assertFalse(data['has_more'])
+        self.assertEqual([task['id'] for task in data['tasks']], [self.assigned.id])
+
+    def test_invalid_and_expired_cursor(self):
+        """Тест: неверный курсор - 400, устаревший - 410"""
+        response = self.client.get('/api/v1/tasks/changes/', {'since': 'мусор'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        expired = sync.encode_cursor({
+            'tasks': None, 'comments': None, 'deleted': (timezone.now() - timedelta(days=30), 0)
+        })
+        response = self.client.get('/api/v1/tasks/changes/', {'since': expired})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+
+class TaskArchiveTest(APITestCase):
+    """Тесты архива выполненных задач"""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.user = User.objects.create_user(username='user', password='pass123')
+        self.other = User.objects.create_user(username='other', password='pass123')
+        deadline = timezone.now() + timedelta(days=1)
+        self.old = Task.objects.create(
+            title='Старая задача', description='Описание', creator=self.user,
+            assignee=self.other, status=TaskStatus.DONE, deadline=deadline
+        )
+        self.recent = Task.objects.create(
+            title='Недавно закрытая', description='Описание', creator=self.user,
+            status=TaskStatus.DONE, deadline=deadline
+        )
+        self.open = Task.objects.create(
+            title='Открытая', description='Описание', creator=self.user, deadline=deadline
+        )
+        self.comment = Comment.objects.create(task=self.old, author=self.other, text='Комментарий')
+        Task.objects.change_comments_count(self.old.pk, 1)
+        Task.objects.filter(pk__in=[self.old.pk, self.open.pk]).update(
+            updated_at=timezone.now() - timedelta(days=settings.TASK_ARCHIVE_AFTER + 1)
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def archive(self):
+        call_command('archive_tasks', batch_size=1, stdout=StringIO())
+
+    def test_moves_old_done_tasks_with_comments(self):
+        """Тест: в архив переносятся только давно выполненные задачи, с комментариями"""
+        rows = set(TaskCounter.objects.values_list('creator_id', 'assignee_id', 'status', 'count'))
+        self.archive()
+        self.assertEqual(
+            set(Task.objects.values_list('pk', flat=True)), {self.recent.pk, self.open.pk}
+        )
+        archived = ArchivedTask.objects.get()
+        self.assertEqual((archived.pk, archived.title, archived.comments_count), (self.old.pk, self.old.title, 1))
+        self.assertEqual(list(archived.comments.values_list('pk', flat=True)), [self.comment.pk])
+        self.assertFalse(Comment.objects.exists())
+        # Статистика учитывает архив и при пересчете
+        call_command('rebuild_task_stats', stdout=StringIO())
+        self.assertEqual(
+            set(TaskCounter.objects.values_list('creator_id', 'assignee_id', 'status', 'count')), rows
+        )
+
+    def test_archived_task_leaves_delta_sync(self):
+        """Тест: перенос в архив приходит в синхронизацию надгробием с archived"""
+        since = self.client.get('/api/v1/tasks/changes/').data['next']
+        self.archive()
+        data = self.client.get('/api/v1/tasks/changes/', {'since': since}).data
+        self.assertEqual(
+            [(task['id'], task.get('archived')) for task in data['deleted']['tasks']], [(self.old.pk, True)]
+        )
+        self.assertEqual(data['deleted']['comments'], [])
+        self.assertEqual(
+            list(TaskEvent.objects.filter(action='archived').values_list('object_id', 'users')),
+            [(self.old.pk, [self.user.pk, self.other.pk])]
+        )
+
+    def test_archive_read_only_on_request(self):
+        """Тест: архив виден только по ?archived=true и с теми же правилами видимости"""
+        self.client.get('/api/v1/tasks/')
+        self.archive()
+        response = self.client.get('/api/v1/tasks/')
+        self.assertEqual({task['id'] for task in response.data['results']}, {self.recent.pk, self.open.pk})
+        self.assertEqual(self.client.get(f'/api/v1/tasks/{self.old.pk}/').status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.get('/api/v1/tasks/', {'archived': 'true', 'search': 'старая'})
+        self.assertEqual([task['id'] for task in response.data['results']], [self.old.pk])
+        response = self.client.get(f'/api/v1/tasks/{self.old.pk}/', {'archived': 'true'})
+        self.assertEqual([comment['id'] for comment in response.data['comments']], [self.comment.pk])
+        response = self.client.get(f'/api/v1/tasks/{self.old.pk}/comments/', {'archived': 'true'})
+        self.assertEqual([comment['id'] for comment in response.data['results']], [self.comment.pk])
+
+        stranger = User.objects.create_user(username='stranger', password='pass123')
+        self.client.force_authenticate(user=stranger)
+        response = self.client.get(f'/api/v1/tasks/{self.old.pk}/', {'archived': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TaskStatsTest(APITestCase):
+    """Тесты статистики задач для дашборда"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass123')
+        self.other = User.objects.create_user(username='other', password='pass123')
+        self.deadline = timezone.now() + timedelta(days=1)
+        self.client.force_authenticate(user=self.user)
+
+    def create_task(self, **fields):
+        fields = {'creator': self.user, 'deadline': self.deadline, **fields}
+        return Task.objects.create(title='Задача', description='Описание', **fields)
+
+    def stats(self):
+        response = self.client.get('/api/v1/tasks/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def counter_rows(self):
+        return set(TaskCounter.objects.filter(count__gt=0).values_list(
+            'creator_id', 'assignee_id', 'status', 'count', 'overdue'
+        ))
+
+    def test_counters_follow_task_changes(self):
+        """Тест: создание, изменение, complete, массовые операции и удаление"""
+        first = self.create_task(assignee=self.other)
+        second = self.create_task(assignee=self.other)
+        self.create_task(creator=self.other, assignee=self.user, status=TaskStatus.REVIEW)
+        self.create_task(creator=self.other)
+
+        self.client.patch(f'/api/v1/tasks/{first.id}/', {'status': TaskStatus.IN_PROGRESS})
+        self.client.post(f'/api/v1/tasks/{second.id}/complete/')
+        self.client.post('/api/v1/tasks/bulk/', [
+            {'title': 'Без исполнителя', 'description': 'Описание', 'deadline': self.deadline.isoformat()}
+        ] * 2, format='json')
+        created = list(Task.objects.filter(assignee=None, creator=self.user).values_list('pk', flat=True))
+        self.client.patch('/api/v1/tasks/bulk/', [
+            {'id': created[0], 'assignee_id': self.other.id}
+        ], format='json')
+        self.client.post('/api/v1/tasks/bulk/complete/', {'ids': [created[0]]}, format='json')
+        self.client.delete(f'/api/v1/tasks/{created[1]}/')
+
+        data = self.stats()
+        self.assertEqual(data['total'], 4)
+        self.assertEqual(
+            data['by_status'],
+            {'new': 0, 'in_progress': 1, 'review': 1, 'done': 2}
+        )
+        self.assertEqual(len(data['by_assignee']), 1)
+        self.assertEqual(data['by_assignee'][0]['assignee']['id'], self.other.id)
+        self.assertEqual(data['by_assignee'][0]['total'], 3)
+
+        # Полный пересчет дает те же счетчики
+        rows = self.counter_rows()
+        call_command('rebuild_task_stats', stdout=StringIO())
+        self.assertEqual(self.counter_rows(), rows)
+
+    def test_overdue_counted_on_read(self):
+        """Тест: задачи, срок которых истек после записи счетчиков, тоже просрочены"""
+        now = timezone.now()
+        self.create_task(deadline=now - timedelta(days=1))
+        later = self.create_task(deadline=now + timedelta(hours=1))
+        self.create_task(deadline=now - timedelta(days=1), status=TaskStatus.DONE)
+
+        self.assertEqual(self.stats()['overdue'], 1)
+        stats = counters.summary(self.user, now=now + timedelta(hours=2))
+        self.assertEqual(stats['overdue'], 2)
+        self.assertEqual(stats['by_assignee'][0]['overdue'], 2)
+
+        # После переноса в хранимый счетчик выполнение задачи его уменьшает
+        with override_settings(TASK_STATS_REFRESH=0):
+            counters.summary(self.user, now=now + timedelta(hours=2))
+        counter = TaskCounter.objects.get(status=TaskStatus.NEW)
+        self.assertEqual(counter.overdue, 2)
+        later.status = TaskStatus.DONE
+        later.save()
+        counter.refresh_from_db()
+        self.assertEqual((counter.count, counter.overdue), (1, 1))
+
+    def test_rebuild_repairs_drift(self):
+        """Тест: команда пересчета исправляет счетчики, удаление исполнителя учитывается"""
+        self.create_task(assignee=self.other)
+        TaskCounter.objects.update(count=10)
+        call_command('rebuild_task_stats', stdout=StringIO())
+        self.assertEqual(self.stats()['total'], 1)
+
+        self.other.delete()
+        data = self.stats()
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(data['by_assignee'][0]['assignee'], None)
+
+
+class DeadlineJobTest(APITestCase):
+    """Тесты отложенных задач по срокам"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass123')
+        self.other = User.objects.create_user(username='other', password='pass123')
+        self.client.force_authenticate(user=self.user)
+
+    def create_task(self, deadline, title='Задача'):
+        return Task.objects.create(
+            title=title, description='Описание', creator=self.user,
+            assignee=self.other, deadline=deadline
+        )
+
+    def planned(self, task):
+        return dict(Job.objects.filter(task=task).values_list('kind', 'run_at'))
+
+    @override_settings(TASK_REMINDER_BEFORE=86400)
+    def test_jobs_follow_deadline_and_status(self):
+        """Тест: задачи переносятся при смене срока и удаляются при выполнении"""
+        deadline = timezone.now() + timedelta(days=3)
+        task = self.create_task(deadline)
+        self.assertEqual(self.planned(task), {
+            JobKind.REMINDER: deadline - timedelta(days=1), JobKind.OVERDUE: deadline
+        })
+        ids = set(Job.objects.values_list('pk', flat=True))
+
+        # Смена названия и статуса между открытыми - без изменений
+        self.client.patch(f'/api/v1/tasks/{task.id}/', {'title': 'Новое', 'status': TaskStatus.IN_PROGRESS})
+        self.assertEqual(set(Job.objects.values_list('pk', flat=True)), ids)
+
+        new_deadline = deadline + timedelta(days=1)
+        self.client.patch(
+            f'/api/v1/tasks/{task.id}/', {'deadline': new_deadline.isoformat()}, format='json'
+        )
+        self.assertEqual(self.planned(task)[JobKind.OVERDUE], new_deadline)
+
+        self.client.post(f'/api/v1/tasks/{task.id}/complete/')
+        self.assertEqual(self.planned(task), {})
+
+    def test_worker_publishes_due_notifications(self):
+        """Тест: наступившие задачи публикуют уведомления и удаляются"""
+        soon = self.create_task(timezone.now() + timedelta(hours=1))
+        overdue = self.create_task(timezone.now() - timedelta(hours=1))
+        done = self.create_task(timezone.now() - timedelta(hours=1))
+        Job.objects.filter(task=done).update(run_at=timezone.now() - timedelta(hours=1))
+        Task.objects.filter(pk=done.pk).update(status=TaskStatus.DONE)
+
+        processed = jobs.run_batch(batch_size=10)
+        self.assertEqual(len(processed), 3)
+        self.assertEqual(
+            list(TaskEvent.objects.filter(action__in=['reminder', 'overdue'])
+                                  .order_by('object_id')
+                                  .values_list('object_id', 'action', 'users')),
+            [(soon.pk, 'reminder', [self.user.pk, self.other.pk]),
+             (overdue.pk, 'overdue', [self.user.pk, self.other.pk])]
+        )
+        self.assertEqual(
+            list(Job.objects.values_list('task', 'kind')), [(soon.pk, JobKind.OVERDUE)]
+        )
+        self.assertEqual(jobs.get_stats()['due'], 0)
+
+    def test_stats_do_not_depend_on_worker_process(self):
+        """Тест: метрики /jobs/stats/ читаются из БД, а не из памяти процесса воркера"""
+        self.create_task(timezone.now() - timedelta(hours=1))
+        self.assertEqual(len(jobs.run_batch(batch_size=10)), 1)
+        # Старая пачка вне окна JOBS_STATS_WINDOW не учитывается
+        JobBatch.objects.create(processed=5, failed=1, busy_us=1, lag_ms=1)
+        JobBatch.objects.filter(processed=5).update(finished_at=timezone.now() - timedelta(days=1))
+        # Веб-процесс не видит память процесса воркера
+        cache.get_cache().clear()
+        self.client.force_authenticate(user=User.objects.create_user('admin', is_staff=True))
+        response = self.client.get('/api/v1/jobs/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            (response.data['batches'], response.data['processed'], response.data['failed']), (1, 1, 0)
+        )
+        self.assertGreater(response.data['avg_lag_seconds'], 0)
+
+        out = StringIO()
+        call_command('prune_events', stdout=out)
+        self.assertIn('Удалено пачек метрик воркеров: 1', out.getvalue())
+        self.assertEqual(JobBatch.objects.count(), 1)
+
+    def test_failed_job_is_postponed(self):
+        """Тест: ошибка в одной задаче не задерживает остальные задачи пачки"""
+        good = self.create_task(timezone.now() - timedelta(hours=1))
+        bad = self.create_task(timezone.now() - timedelta(hours=1), title='Сбой')
+        handle = jobs.handle
+
+        def failing(batch):
+            if any(job.task.title == 'Сбой' for job in batch):
+                raise RuntimeError('сбой')
+            handle(batch)
+
+        with patch('tasks.jobs.handle', failing), self.assertLogs('tasks.jobs', 'ERROR'):
+            processed = jobs.run_batch(batch_size=10)
+        self.assertEqual([job.task_id for job in processed], [good.pk])
+        job = Job.objects.get()
+        self.assertEqual((job.task_id, job.attempts), (bad.pk, 1))
+        self.assertIn('сбой', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+
+
+class JobWorkerTest(TransactionTestCase):
+    """Тесты воркера фоновых задач с настоящими транзакциями"""
+
+    def test_parallel_workers_do_not_repeat_jobs(self):
+        """Тест: параллельные воркеры (SKIP LOCKED) обрабатывают каждую задачу один раз"""
+        user = User.objects.create_user(username='user', password='pass123')
+        Task.objects.bulk_create(
+            Task(title=f'Задача {i}', description='Описание', creator=user,
+                 deadline=timezone.now() - timedelta(hours=1))
+            for i in range(60)
+        )
+        jobs.schedule(Task.objects.all(), created=True)
+        processed = []
+
+        def worker():
+            try:
+                while batch := jobs.run_batch(batch_size=5):
+                    processed.extend(job.pk for job in batch)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(processed), 60)
+        self.assertEqual(len(set(processed)), 60)
+        self.assertEqual(TaskEvent.objects.filter(action='overdue').count(), 60)
+
+        out = StringIO()
+        call_command('run_jobs', '--once', stdout=out)
+        self.assertIn('Обработано задач: 0', out.getvalue())
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1.0, QUERY_BUDGET_STRICT=True)
+class RequestMetricsTest(APITestCase):
+    """Тесты метрик запросов и бюджетов SQL-запросов"""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        metrics.registry.reset()
+        self.user = User.objects.create_user(username='user', password='pass123')
+        self.other = User.objects.create_user(username='other', password='pass123')
+        self.tasks = [
+            Task.objects.create(
+                title=f'Задача {i}', description='Описание', creator=self.user,
+                assignee=self.other, deadline=timezone.now() + timedelta(days=i + 1)
+            )
+            for i in range(5)
+        ]
+        for task in self.tasks:
+            for i in range(3):
+                Comment.objects.create(task=task, author=self.other, text=f'Комментарий {i}')
+        self.client.force_authenticate(user=self.user)
+
+    def timing(self, response):
+        return dict(
+            (entry.split(';')[0], entry) for entry in response['Server-Timing'].split(', ')
+        )
+
+    def test_server_timing(self):
+        """Тест: Server-Timing с числом запросов, временем БД, рендеринга и общим"""
+        response = self.client.get('/api/v1/tasks/')
+        timing = self.timing(response)
+        self.assertEqual(set(timing), {'db', 'render', 'app', 'total'})
+        self.assertIn('desc="1 queries"', timing['db'])
+
+        # Запросы async-представлений выполняются в других потоках
+        token = self.client.post(
+            '/api/v1/token/', {'username': 'user', 'password': 'pass123'}, format='json'
+        ).data['access']
+        response = self.client.get('/api/v1/async/tasks/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('desc="0 queries"', self.timing(response)['db'])
+
+    def test_actions_within_budget(self):
+        """Тест: основные действия укладываются в бюджеты запросов (иначе исключение)"""
+        task, deadline = self.tasks[0], (timezone.now() + timedelta(days=9)).isoformat()
+        item = {'title': 'Новая', 'description': 'Описание', 'assignee': self.other.pk, 'deadline': deadline}
+        for method, url, data in (
+            ('get', '/api/v1/tasks/', None),
+            ('get', f'/api/v1/tasks/{task.pk}/', None),
+            ('post', '/api/v1/tasks/', item),
+            ('put', f'/api/v1/tasks/{task.pk}/', dict(item, status=TaskStatus.IN_PROGRESS)),
+            ('patch', f'/api/v1/tasks/{task.pk}/', {'deadline': deadline, 'status': TaskStatus.REVIEW}),
+            ('post', f'/api/v1/tasks/{task.pk}/complete/', None),
+            ('get', '/api/v1/tasks/stats/', None),
+            ('get', '/api/v1/tasks/changes/', None),
+            ('post', '/api/v1/tasks/bulk/', [item] * 20),
+            ('patch', '/api/v1/tasks/bulk/', [
+                {'id': task.pk, 'status': TaskStatus.IN_PROGRESS, 'deadline': deadline} for task in self.tasks[1:]
+            ]),
+            ('post', '/api/v1/tasks/bulk/complete/', {'ids': [task.pk for task in self.tasks]}),
+            ('get', '/api/v1/comments/', None),
+            ('post', '/api/v1/comments/', {'task': task.pk, 'text': 'Новый'}),
+            ('delete', f'/api/v1/tasks/{self.tasks[1].pk}/', None),
+        ):
+            response = getattr(self.client, method)(url, data, format='json')
+            self.assertLess(response.status_code, 300, url)
+
+        comment = Comment.objects.get(author=self.user)
+        for method, data in (('get', None), ('put', {'task': self.tasks[2].pk, 'text': 'Изменен'}), ('delete', None)):
+            response = getattr(self.client, method)(f'/api/v1/comments/{comment.pk}/', data, format='json')
+            self.assertLess(response.status_code, 300, method)
+
+    def test_budget_exceeded(self):
+        """Тест: превышение бюджета - исключение в строгом режиме, иначе предупреждение"""
+        with patch.object(TaskViewSet, 'query_budget', {'list': 0}):
+            with self.assertRaises(metrics.QueryBudgetExceeded):
+                self.client.get('/api/v1/tasks/?page_size=3')
+            with override_settings(QUERY_BUDGET_STRICT=False), \
+                    self.assertLogs('tasks.metrics', 'WARNING') as logs:
+                response = self.client.get('/api/v1/tasks/?page_size=4')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('task-list (list): 1', logs.output[0])
+        self.assertIn(
+            'http_request_query_budget_exceeded_total{view="task-list",method="GET"} 2',
+            metrics.registry.render()
+        )
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_prometheus_endpoint(self):
+        """Тест: /metrics в формате Prometheus и только с токеном"""
+        self.client.get('/api/v1/tasks/')
+        self.client.get('/api/v1/tasks/0/')
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_requests_total{view="task-list",method="GET",status="2xx"} 1', body)
+        self.assertIn('http_requests_total{view="task-detail",method="GET",status="4xx"} 1', body)
+        self.assertIn('http_request_duration_seconds_count{view="task-list",method="GET"} 1', body)
+        self.assertIn('http_request_db_queries_total{view="task-list",method="GET"} 1', body)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_sampling_off(self):
+        """Тест: запросы вне выборки не замеряются"""
+        response = self.client.get('/api/v1/tasks/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(metrics.registry.series, {})
+
+
+@skipUnless(connection.vendor == 'postgresql', 'COPY есть только в PostgreSQL')
+class GenerateDataTest(APITestCase):
+    """Тесты генератора наборов данных для нагрузочных тестов"""
+
+    def test_generated_dataset_is_consistent(self):
+        """Тест: COPY-данные согласованы со счетчиками, статистикой и доступны через API"""
+        existing = User.objects.create_user(username='user', password='pass123')
+        call_command(
+            'generate_data', users=20, tasks=300, comments=900, chunk_size=100, workers=1,
+            prefix='gen', stdout=StringIO()
+        )
+        users = User.objects.filter(username__startswith='gen')
+        self.assertEqual(users.count(), 20)
+        self.assertEqual(Task.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 900)
+        self.assertFalse(Task.objects.filter(creator=existing).exists())
+
+        # comments_count и авторы комментариев - участники задач
+        self.assertFalse(
+            Task.objects.annotate(real=Count('comments')).exclude(comments_count=F('real')).exists()
+        )
+        self.assertFalse(
+            Comment.objects.exclude(author=F('task__creator')).exclude(author=F('task__assignee')).exists()
+        )
+        self.assertTrue(Job.objects.exists())
+
+        # Перекос: у самого активного создателя заметно больше среднего
+        top = Task.objects.values('creator').annotate(n=Count('pk')).order_by('-n').first()
+        self.assertGreater(top['n'], 300 / 20 * 2)
+
+        user = users.get(pk=top['creator'])
+        self.assertEqual(counters.summary(user)['total'], Task.objects.visible_to(user).count())
+
+        # Новые задачи приложения получают id после зарезервированных
+        self.assertGreater(
+            Task.objects.create(title='Новая', description='Описание', creator=existing,
+                                deadline=timezone.now() + timedelta(days=1)).pk,
+            Task.objects.exclude(creator=existing).aggregate(last=Max('pk'))['last']
+        )
+        response = self.client.post(
+            '/api/v1/token/', {'username': user.username, 'password': 'load123'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+@override_settings(ADMIN_PERFORMANCE_MODE=True, TASK_DETAIL_COMMENTS=3)
+class AdminPerformanceTest(TestCase):
+    """Тесты режима больших таблиц в админке"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='pass123')
+        self.user = User.objects.create_user(username='user', password='pass123')
+        self.task = Task.objects.create(
+            title='Отчет за квартал', description='Описание', creator=self.user,
+            deadline=timezone.now() + timedelta(days=1)
+        )
+        Task.objects.create(
+            title='Другая задача', description='Описание', creator=self.admin,
+            deadline=timezone.now() + timedelta(days=1)
+        )
+        Comment.objects.bulk_create(
+            Comment(task=self.task, author=self.user, text=f'Комментарий {i}') for i in range(5)
+        )
+        self.client.force_login(self.admin)
+
+    def changelist(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.context['cl']
+
+    def test_index_backed_search_and_username_filters(self):
+        """Тест: поиск по словоформе и имени участника, фильтры по имени пользователя"""
+        for url in ('/admin/tasks/task/?q=отчеты', '/admin/tasks/task/?q=user',
+                    '/admin/tasks/task/?creator=user'):
+            changelist = self.changelist(url)
+            self.assertEqual([task.pk for task in changelist.result_list], [self.task.pk])
+            self.assertIsNone(changelist.full_result_count)
+        self.assertEqual(self.changelist('/admin/tasks/comment/?author=user').result_count, 5)
+        self.assertEqual(self.changelist('/admin/tasks/comment/?author=admin').result_count, 0)
+
+    def test_counts_capped(self):
+        """Тест: подсчет с фильтрами останавливается на ADMIN_COUNT_LIMIT"""
+        with override_settings(ADMIN_COUNT_LIMIT=2):
+            changelist = self.changelist('/admin/tasks/comment/?author=user')
+        self.assertEqual(changelist.result_count, 2)
+
+    def test_change_page_shows_latest_comments(self):
+        """Тест: на странице задачи только последние комментарии"""
+        response = self.client.get(f'/admin/tasks/task/{self.task.pk}/change/')
+        formset = response.context['inline_admin_formsets'][0].formset
+        self.assertEqual(
+            [form.instance.text for form in formset.initial_forms],
+            ['Комментарий 4', 'Комментарий 3', 'Комментарий 2']
+        )
@@ -1,11 +1,26 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TaskViewSet, CommentViewSet
+from .views import TaskViewSet, CommentViewSet, TaskCommentViewSet, CacheStatsView, JobStatsView
+from .async_views import AsyncTaskView, AsyncCommentView, EventStreamView
 
 router = DefaultRouter()
 router.register(r'tasks', TaskViewSet, basename='task')
 router.register(r'comments', CommentViewSet, basename='comment')
 
 urlpatterns = [
+    path(
+        'tasks/<int:task_pk>/comments/',
+        TaskCommentViewSet.as_view({'get': 'list'}),
+        name='task-comments'
+    ),
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('jobs/stats/', JobStatsView.as_view(), name='job-stats'),
+    # Асинхронный путь чтения для ASGI-сервера
+    path('async/tasks/', AsyncTaskView.as_view(), name='async-task-list'),
+    path('async/tasks/<int:pk>/', AsyncTaskView.as_view(), name='async-task-detail'),
+    path('async/comments/', AsyncCommentView.as_view(), name='async-comment-list'),
+    path('async/comments/<int:pk>/', AsyncCommentView.as_view(), name='async-comment-detail'),
+    # Лента изменений (Server-Sent Events)
+    path('events/', EventStreamView.as_view(), name='event-stream'),
     path('', include(router.urls)),
 ]
@@ -1,25 +1,77 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import APIException, NotFound, PermissionDenied, ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db.models import Q, Count
+from rest_framework.filters import OrderingFilter
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import StreamingHttpResponse
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
 
-from .models import Task, Comment, TaskStatus
+from .models import Task, Comment, ArchivedTask, ArchivedComment, TaskStatus, EventAction
 from .serializers import (
-    TaskSerializer, TaskListSerializer, CommentSerializer
+    TaskSerializer, TaskListSerializer, TaskSyncSerializer, CommentSerializer, UserSerializer
 )
-from .filters import TaskFilter
+from .filters import TaskFilter, ArchivedTaskFilter, FullTextSearchFilter
+from .renderers import NDJSONRenderer, CSVRenderer
+from . import cache, counters, events, jobs, sync
+from .authentication import load_deferred
+from .conditional import ConditionalGetMixin
+from .fieldsets import FieldsetMixin
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+def reads_archive(request):
+    """?archived=true: читать архив выполненных задач (tasks/archive.py)"""
+    return request.query_params.get('archived') in ('1', 'true')
+
+
+class SyncCursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'Курсор синхронизации устарел, нужна полная синхронизация.'
+    default_code = 'sync_cursor_expired'
+
+
+class TaskViewSet(cache.CachedResponseMixin, ConditionalGetMixin, FieldsetMixin, viewsets.ModelViewSet):
     """ViewSet для управления задачами"""
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_class = TaskFilter
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, OrderingFilter]
     search_fields = ['title', 'description']
-    ordering_fields = ['created_at', 'deadline', 'status']
+    search_vector_field = 'search_vector'
+    ordering_fields = ['created_at', 'deadline', 'status', 'search_rank']
     ordering = ['-created_at']
+    etag_related = ('comments',)
+    export_fields = (
+        'id', 'title', 'description', 'status', 'creator_id', 'assignee_id',
+        'deadline', 'created_at', 'updated_at', 'comments_count'
+    )
+    # Максимум SQL-запросов на действие (tasks/metrics.py), не зависит от
+    # числа задач. Включает проверку версии токена JWT (раз в
+    # JWT_VERSION_CACHE_TTL); export выполняет запросы при отдаче потока
+    query_budget = {
+        'list': 2, 'retrieve': 4, 'create': 9, 'update': 15, 'partial_update': 15,
+        'destroy': 8, 'complete': 9, 'changes': 4, 'stats': 6,
+        'bulk_create': 11, 'bulk_update': 13, 'bulk_complete': 11,
+    }
+
+    # Действия, которые по ?archived=true читают архив вместо рабочей таблицы
+    archive_actions = ('list', 'retrieve', 'export')
+
+    @property
+    def archived(self):
+        return self.action in self.archive_actions and reads_archive(self.request)
+
+    @property
+    def filterset_class(self):
+        return ArchivedTaskFilter if self.archived else TaskFilter
+
+    @property
+    def search_substring_fields(self):
+        # У архива нет триграммного индекса: только полнотекстовый поиск
+        return [] if self.archived else ['title']
 
     def get_queryset(self):
         """
@@ -27,17 +79,54 @@ class TaskViewSet(viewsets.ModelViewSet):
         Изменять/удалять может только создатель.
         """
         user = self.request.user
-        qs = Task.objects.filter(
-            Q(assignee=user) | Q(creator=user)
-        )
+        qs = self.get_tasks().visible_to(user)
 
         # Для изменения/удаления - только задачи, где user = creator
-        if self.action in ['update', 'partial_update', 'destroy']:
+        if self.action in ['update', 'partial_update', 'destroy', 'bulk_update']:
             qs = qs.filter(creator=user)
 
-        return qs.select_related('creator', 'assignee') \
-                 .prefetch_related('comments') \
-                 .annotate(comments_count=Count('comments'))
+        # Последние комментарии нужны только детальному сериализатору, для
+        # списка достаточно хранимого счетчика comments_count. Одной задаче
+        # (retrieve, update, complete) Task.latest_comments читает их сам
+        # запросом с LIMIT: оконный prefetch для одной задачи планировщик
+        # выполняет сортировкой всех ее комментариев
+        if self.action in ['bulk_update', 'bulk_complete']:
+            qs = qs.with_latest_comments()
+        return qs
+
+    def get_tasks(self):
+        """Задачи (или архив) без ограничения видимости, с полями ответа"""
+        tasks = (ArchivedTask if self.archived else Task).objects.select_related('creator', 'assignee')
+        return self.restrict_fields(tasks)
+
+    def get_page_queryset(self, keyset, ordering, limit):
+        """
+        Запрос страницы списка (KeysetPagination). Видимость, фильтры и
+        условие курсора применяются к каждой ветке создатель/исполнитель
+        (TaskQuerySet.visible_page_ids), а не к выборке всех задач
+        пользователя. Внешний запрос выбирает строки только по id: повтор
+        фильтров в нем занижает оценку числа строк, и планировщик выполняет
+        ветки заново для каждой строки.
+        """
+        tasks = self.filter_queryset(self.get_tasks()).filter(keyset).order_by(*ordering)
+        ids = tasks.visible_page_ids(self.request.user, limit)
+        rank = FullTextSearchFilter().get_rank(self.request, self)
+        return self.get_tasks().filter(pk__in=ids) \
+                               .annotate(**{FullTextSearchFilter.rank_annotation: rank}) \
+                               .order_by(*ordering)[:limit]
+
+    def get_related_last_modified(self, related):
+        """
+        Деталь содержит только последние комментарии, поэтому ETag зависит от
+        них, а не от всех комментариев задачи. Добавление и удаление
+        комментария меняют updated_at самой задачи.
+        """
+        comments = (ArchivedComment if self.archived else Comment).objects
+        latest = comments.filter(task=OuterRef(OuterRef('pk'))).order_by(
+            '-created_at', '-id'
+        )[:settings.TASK_DETAIL_COMMENTS]
+        modified = comments.filter(pk__in=Subquery(latest.values('pk'))).order_by('-updated_at')
+        return Max(Subquery(modified.values('updated_at')[:1]))
 
     def get_serializer_class(self):
         """Использовать разные сериализаторы для списка и детали"""
@@ -61,10 +150,277 @@ class TaskViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(task)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """
+        Потоковая выгрузка видимых задач в NDJSON (по умолчанию) или CSV
+        (?format=csv или Accept: text/csv) с учетом фильтров, поиска и
+        сортировки списка.
 
-class CommentViewSet(viewsets.ModelViewSet):
+        Строки читаются серверным курсором по EXPORT_CHUNK_SIZE и сразу
+        отдаются клиенту, поэтому память не зависит от размера выгрузки.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.values_list(*self.export_fields).iterator(
+            chunk_size=settings.EXPORT_CHUNK_SIZE
+        )
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.render_rows(rows, self.export_fields, settings.EXPORT_CHUNK_SIZE),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        response['Content-Disposition'] = f'attachment; filename="tasks.{renderer.format}"'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Дельта-синхронизация: задачи и комментарии, созданные, измененные
+        или удаленные после курсора ?since= (без него - все видимые).
+
+        В ответе не более page_size элементов каждого вида и курсор next для
+        следующего запроса; при has_more=true запрос нужно повторить сразу.
+        Удаления содержат deleted_at: объект удаляется у клиента, только если
+        его updated_at раньше. Задача, которую пользователь начал или
+        перестал видеть, приходит со всеми комментариями или их надгробиями.
+        users - участники, у которых изменились имя или email: их нужно
+        обновить во вложенных объектах задач и комментариев.
+        """
+        since = request.query_params.get('since')
+        try:
+            positions = sync.initial_positions() if since is None else sync.decode_cursor(since)
+        except sync.CursorExpired:
+            raise SyncCursorExpired()
+        except ValueError as exc:
+            raise ValidationError({'since': [str(exc)]})
+
+        limit = self.paginator.get_page_size(request)
+        changes, positions, has_more = sync.collect_changes(request.user, positions, limit)
+        context = self.get_serializer_context()
+        return Response({
+            'tasks': TaskSyncSerializer(changes['tasks'], many=True, context=context).data,
+            'comments': CommentSerializer(changes['comments'], many=True, context=context).data,
+            'deleted': sync.split_deletions(request.user, changes['deleted']),
+            'users': sync.changed_users(changes['deleted']),
+            'next': sync.encode_cursor(positions),
+            'has_more': has_more,
+        })
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        Статистика для дашборда: задачи пользователя (создатель или
+        исполнитель) по статусам и просроченные, а также задачи, которые
+        он создал, по исполнителям.
+
+        Читается из счетчиков TaskCounter, поэтому стоимость не зависит от
+        числа задач.
+        """
+        data = counters.summary(request.user)
+        users = User.objects.in_bulk(
+            [row['assignee_id'] for row in data['by_assignee'] if row['assignee_id'] is not None]
+        )
+        for row in data['by_assignee']:
+            assignee = users.get(row.pop('assignee_id'))
+            row['assignee'] = UserSerializer(assignee).data if assignee else None
+        return Response(data)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """
+        Массовое создание задач: список объектов в формате TaskSerializer.
+
+        Все элементы проверяются правилами TaskSerializer; если хотя бы один
+        невалиден, ничего не сохраняется и возвращается список ошибок по
+        позициям ({} для валидных элементов). Иначе задачи записываются
+        одним bulk_create в транзакции.
+        """
+        items = self.get_bulk_items(request.data)
+        serializers, errors = self.validate_bulk_items(items)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        creator = load_deferred(request.user)
+        tasks = [
+            Task(**serializer.validated_data, creator=creator)
+            for serializer in serializers
+        ]
+        with transaction.atomic():
+            Task.objects.bulk_create(tasks)
+            # bulk_create не отправляет post_save - сбрасываем кэш, обновляем
+            # счетчики и пишем события явно
+            cache.invalidate_users(request.user.pk, *(task.assignee_id for task in tasks))
+            counters.apply([
+                change for task in tasks for change in counters.task_changes(task, created=True)
+            ])
+            jobs.schedule(tasks, created=True)
+            events.publish([
+                event for task in tasks for event in events.task_events(task, EventAction.CREATED)
+            ])
+
+        for task in tasks:
+            task.prefetched_latest_comments = []
+        serializer = self.get_serializer(tasks, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @bulk_create.mapping.patch
+    def bulk_update(self, request):
+        """
+        Массовое частичное обновление задач создателя: список объектов с id
+        и изменяемыми полями. Ошибки возвращаются по позициям, как при
+        массовом создании; изменения записываются одним bulk_update.
+        """
+        items = self.get_bulk_items(request.data)
+        ids = [item.get('id') if isinstance(item, dict) else None for item in items]
+        instances = self.get_queryset().in_bulk(
+            [pk for pk in ids if isinstance(pk, int) and not isinstance(pk, bool)]
+        )
+        previous_assignees = {pk: task.assignee_id for pk, task in instances.items()}
+
+        serializers, errors = self.validate_bulk_items(items, ids=ids, instances=instances)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # bulk_update не заполняет auto_now - ставим updated_at явно
+        now = timezone.now()
+        fields = {'updated_at'}
+        tasks = []
+        for serializer in serializers:
+            for field, value in serializer.validated_data.items():
+                setattr(serializer.instance, field, value)
+                fields.add(field)
+            serializer.instance.updated_at = now
+            if serializer.instance.assignee_id != previous_assignees[serializer.instance.pk]:
+                serializer.instance.assigned_at = now
+                fields.add('assigned_at')
+            tasks.append(serializer.instance)
+
+        with transaction.atomic():
+            Task.objects.bulk_update(tasks, sorted(fields))
+            cache.invalidate_users(
+                request.user.pk, *previous_assignees.values(), *(task.assignee_id for task in tasks)
+            )
+            counters.apply([change for task in tasks for change in counters.task_changes(task)])
+            jobs.schedule(tasks)
+            events.publish([
+                event for task in tasks
+                for event in events.task_events(
+                    task, EventAction.UPDATED, previous_users=[previous_assignees[task.pk]]
+                )
+            ])
+
+        serializer = self.get_serializer(tasks, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['post'], url_path='bulk/complete')
+    def bulk_complete(self, request):
+        """
+        Отметить несколько задач как выполненные: {"ids": [...]}.
+
+        Правила те же, что у complete: задача должна быть видна
+        пользователю, отметить ее может только создатель. Статусы
+        меняются одним UPDATE.
+        """
+        ids = self.get_bulk_items(request.data.get('ids') if isinstance(request.data, dict) else None)
+        if not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+            raise ValidationError({'ids': ['Ожидался список идентификаторов задач.']})
+
+        tasks = self.get_queryset().in_bulk(ids)
+        errors = []
+        for pk in ids:
+            if pk not in tasks:
+                errors.append({'id': ['Задача не найдена.']})
+            elif tasks[pk].creator_id != request.user.pk:
+                errors.append({'id': ['Только создатель задачи может отметить её как выполненную']})
+            else:
+                errors.append({})
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        for task in tasks.values():
+            task.status = TaskStatus.DONE
+            task.updated_at = now
+        with transaction.atomic():
+            Task.objects.filter(pk__in=tasks.keys()).update(status=TaskStatus.DONE, updated_at=now)
+            cache.invalidate_users(request.user.pk, *(task.assignee_id for task in tasks.values()))
+            counters.apply([
+                change for task in tasks.values() for change in counters.task_changes(task)
+            ])
+            jobs.schedule(tasks.values())
+            events.publish([
+                event for task in tasks.values()
+                for event in events.task_events(task, EventAction.UPDATED)
+            ])
+
+        serializer = self.get_serializer([tasks[pk] for pk in dict.fromkeys(ids)], many=True)
+        return Response(serializer.data)
+
+    def get_bulk_items(self, data):
+        """Проверить, что тело запроса - непустой список допустимой длины"""
+        if not isinstance(data, list) or not data:
+            raise ValidationError({'non_field_errors': ['Ожидался непустой список элементов.']})
+        if len(data) > settings.BULK_MAX_ITEMS:
+            raise ValidationError({'non_field_errors': [
+                f'Не более {settings.BULK_MAX_ITEMS} элементов в одном запросе.'
+            ]})
+        return data
+
+    def validate_bulk_items(self, items, ids=None, instances=None):
+        """
+        Проверить элементы сериализатором задачи по одному.
+
+        Исполнители всех элементов загружаются заранее одним запросом.
+        Для обновления (instances) элемент должен ссылаться на существующую
+        задачу пользователя, и каждая задача может встречаться один раз.
+        """
+        assignee_ids = {
+            item.get('assignee_id') for item in items if isinstance(item, dict)
+        }
+        context = self.get_serializer_context()
+        context['preloaded'] = {
+            User: User.objects.in_bulk([pk for pk in assignee_ids if isinstance(pk, int)])
+        }
+
+        serializers, errors = [], []
+        seen = set()
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors.append({'non_field_errors': ['Ожидался объект задачи.']})
+                continue
+            instance = None
+            if instances is not None:
+                pk = ids[index]
+                if pk not in instances:
+                    errors.append({'id': ['Задача не найдена.']})
+                    continue
+                if pk in seen:
+                    errors.append({'id': ['Задача указана в запросе несколько раз.']})
+                    continue
+                seen.add(pk)
+                instance = instances[pk]
+
+            serializer = TaskSerializer(
+                instance, data=item, partial=instance is not None, context=context
+            )
+            if serializer.is_valid():
+                errors.append({})
+            else:
+                errors.append(serializer.errors)
+            serializers.append(serializer)
+        return serializers, errors
+
+
+class CommentViewSet(cache.CachedResponseMixin, ConditionalGetMixin, FieldsetMixin, viewsets.ModelViewSet):
     """ViewSet для управления комментариями"""
     serializer_class = CommentSerializer
+    search_fields = ['text']
+    search_vector_field = 'search_vector'
+    ordering_fields = ['created_at', 'search_rank']
+    ordering = ['created_at']
+    query_budget = {
+        'list': 2, 'retrieve': 3, 'create': 10, 'update': 11, 'partial_update': 11, 'destroy': 10,
+    }
 
     def get_queryset(self):
         """
@@ -72,25 +428,87 @@ class CommentViewSet(viewsets.ModelViewSet):
         Изменять/удалять может только автор комментария.
         """
         user = self.request.user
-        qs = Comment.objects.filter(
-            Q(task__assignee=user) | Q(task__creator=user)
-        )
+        qs = Comment.objects.visible_to(user)
 
         # Для изменения/удаления - только комментарии, где user = author
         if self.action in ['update', 'partial_update', 'destroy']:
             qs = qs.filter(author=user)
 
-        return qs.select_related('author', 'task')
+        return self.restrict_fields(qs.select_related('author', 'task'))
 
     def perform_create(self, serializer):
         """Проверка доступа к задаче перед созданием комментария"""
         task = serializer.validated_data['task']
         user = self.request.user
 
-        # Проверяем, что пользователь имеет доступ к задаче
-        if task.assignee != user and task.creator != user:
+        # Проверяем, что пользователь имеет доступ к задаче (по id, без загрузки пользователей)
+        if user.pk not in (task.assignee_id, task.creator_id):
             raise PermissionDenied(
                 "У вас нет доступа к этой задаче"
             )
 
-        serializer.save(author=user)
+        with transaction.atomic():
+            comment = serializer.save(author=user)
+            Task.objects.change_comments_count(comment.task_id, 1)
+
+    def perform_update(self, serializer):
+        """Перенос комментария в другую задачу переносит и счетчик"""
+        old_task_id = serializer.instance.task_id
+        with transaction.atomic():
+            comment = serializer.save()
+            if comment.task_id != old_task_id:
+                Task.objects.change_comments_count(old_task_id, -1)
+                Task.objects.change_comments_count(comment.task_id, 1)
+
+    def perform_destroy(self, instance):
+        """Удаление комментария уменьшает счетчик задачи"""
+        deleted_events = events.comments_deleted([instance])
+        with transaction.atomic():
+            instance.delete()
+            Task.objects.change_comments_count(instance.task_id, -1)
+            cache.invalidate_tasks([instance.task_id])
+            events.publish(deleted_events)
+
+
+class TaskCommentViewSet(cache.CachedResponseMixin, ConditionalGetMixin, FieldsetMixin,
+                         viewsets.ReadOnlyModelViewSet):
+    """
+    Все комментарии задачи (/tasks/{id}/comments/) с keyset-пагинацией по
+    (created_at, id): страница читается по индексу (task, created_at, id)
+    на любой глубине. Деталь задачи отдает только последние комментарии.
+    """
+    serializer_class = CommentSerializer
+    filter_backends = [OrderingFilter]
+    ordering_fields = ['created_at']
+    ordering = ['created_at']
+    query_budget = {'list': 3}
+
+    def get_queryset(self):
+        """
+        Комментарии задачи (архивной при ?archived=true); 404, если
+        пользователь не видит задачу.
+        """
+        task_model, comment_model = (ArchivedTask, ArchivedComment) if reads_archive(self.request) \
+            else (Task, Comment)
+        task_id = self.kwargs['task_pk']
+        if not getattr(self, 'task_checked', False):
+            if not task_model.objects.visible_to(self.request.user).filter(pk=task_id).exists():
+                raise NotFound('Задача не найдена.')
+            self.task_checked = True
+        return self.restrict_fields(comment_model.objects.filter(task_id=task_id).select_related('author'))
+
+
+class CacheStatsView(APIView):
+    """Счетчики кэша ответов: попадания, заполнение, инвалидации"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache.get_stats())
+
+
+class JobStatsView(APIView):
+    """Метрики фоновых задач: очередь, отставание, пропускная способность"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(jobs.get_stats())